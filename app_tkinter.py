@@ -15,7 +15,65 @@ import os
 from dotenv import load_dotenv
 
 from pdf_extractor import PDFExtractor
-from question_generator import create_generator
+from pdf_cache import PDFTextCache
+from generator_registry import get_generator, warm_up
+from response_cache import CachedQuestionGenerator, ResponseCache
+from retrieval import select_relevant_text
+from rate_limiter import RateLimitedGenerator
+from parallel_generation import FanOutQuestionGenerator, MapReduceQuestionGenerator
+from question_bank import QuestionBank, file_hash
+from dedup import DeduplicatingGenerator, NearDuplicateIndex
+from question_model import Question
+import telemetry
+
+
+class _Especulacion:
+    """
+    Generación anticipada de las preguntas de un documento y tema
+
+    Un hilo las va añadiendo y quien la consume las recibe según llegan
+    iterando sobre ella; si se cancela, el hilo deja de añadir preguntas.
+    """
+    
+    def __init__(self, clave):
+        self.clave = clave
+        self.preguntas = []
+        self.error = None
+        self.descartadas = 0
+        self.terminada = False
+        self.cancelada = False
+        self._condicion = threading.Condition()
+    
+    def agregar(self, pregunta):
+        with self._condicion:
+            self.preguntas.append(pregunta)
+            self._condicion.notify_all()
+    
+    def terminar(self, error=None):
+        with self._condicion:
+            self.error = error
+            self.terminada = True
+            self._condicion.notify_all()
+    
+    def cancelar(self):
+        with self._condicion:
+            self.cancelada = True
+            self._condicion.notify_all()
+    
+    def __iter__(self):
+        """Entrega las preguntas ya generadas y espera a las que faltan"""
+        idx = 0
+        while True:
+            with self._condicion:
+                while idx >= len(self.preguntas) and not (self.terminada or self.cancelada):
+                    self._condicion.wait()
+                if idx >= len(self.preguntas):
+                    if self.error is not None:
+                        raise self.error
+                    return
+                pregunta = self.preguntas[idx]
+            idx += 1
+            yield pregunta
 
 
 class AppTkinter:
@@ -29,6 +87,21 @@ class AppTkinter:
     COLOR_GRIS_SUAVE = "#f2f2f2"
     COLOR_TEXTO_OSCURO = "#1a1a1a"
     
+    # Caracteres del PDF que se conservan para buscar el tema; el resto de
+    # páginas no se analiza
+    MAX_CARACTERES_PDF = 100000
+    
+    # Caracteres de fragmentos relevantes que se seleccionan por tema; el
+    # PromptBuilder los ajusta después al presupuesto de tokens del modelo
+    MAX_CARACTERES_PROMPT = 20000
+    
+    # Preguntas por evaluación: las peticiones grandes se reparten en varias
+    # llamadas concurrentes (ver FanOutQuestionGenerator)
+    NUM_PREGUNTAS = 5
+    MAX_PREGUNTAS = 50
+    
+    PLACEHOLDER_TEMA = "Ej: Biología celular, Historia medieval, Matemáticas avanzada..."
+    
     def __init__(self, root):
         self.root = root
         self.root.title("📚 Generador de Preguntas desde PDF")
@@ -41,12 +114,36 @@ class AppTkinter:
         # Cargar variables de entorno
         load_dotenv()
         
+        # Medición por etapas si TELEMETRY_TRACE_FILE o TELEMETRY_METRICS_PORT están definidas
+        telemetry.configure_from_env()
+        
         # Atributos
         self.pdf_ruta = None
+        self.pdf_hash = None
         self.contenido_pdf = None
+        self.cache_pdf = PDFTextCache()
+        self.cache_respuestas = ResponseCache()
+        self.banco = QuestionBank()
+        self.indice_duplicados = None
+        
+        # Generación anticipada (opcional) en cuanto se carga el PDF
+        self.especulacion = None
         
         # Crear interfaz
         self._crear_interfaz()
+        
+        # Abrir la conexión con el proveedor mientras el usuario elige el PDF
+        warm_up(["google"])
+        
+        # Cargar las firmas del banco para descartar preguntas repetidas
+        threading.Thread(target=self._cargar_indice_duplicados, daemon=True).start()
+    
+    def _cargar_indice_duplicados(self):
+        """Pone al día el índice de duplicados con el banco (en segundo plano)"""
+        try:
+            self.indice_duplicados = NearDuplicateIndex().sync(self.banco)
+        except Exception as e:
+            print(f"⚠️  No se pudo cargar el índice de duplicados: {e}")
     
     def _crear_interfaz(self):
         """Crea la interfaz gráfica profesional"""
@@ -139,27 +236,55 @@ class AppTkinter:
             borderwidth=1
         )
         self.input_tema.pack(fill="x", padx=5, pady=5)
-        self.input_tema.insert(0, "Ej: Biología celular, Historia medieval, Matemáticas avanzada...")
+        self.input_tema.insert(0, self.PLACEHOLDER_TEMA)
         
         # Bind para limpiar placeholder
         def on_focus_in(event):
-            if self.input_tema.get() == "Ej: Biología celular, Historia medieval, Matemáticas avanzada...":
+            if self.input_tema.get() == self.PLACEHOLDER_TEMA:
                 self.input_tema.delete(0, "end")
                 self.input_tema.config(fg=self.COLOR_TEXTO_OSCURO)
         
         def on_focus_out(event):
             if self.input_tema.get() == "":
-                self.input_tema.insert(0, "Ej: Biología celular, Historia medieval, Matemáticas avanzada...")
+                self.input_tema.insert(0, self.PLACEHOLDER_TEMA)
                 self.input_tema.config(fg="#999999")
         
         self.input_tema.bind("<FocusIn>", on_focus_in)
         self.input_tema.bind("<FocusOut>", on_focus_out)
+        self.input_tema.bind("<KeyRelease>", lambda event: self._tema_cambiado())
         self.input_tema.config(fg="#999999")
         
         # ========== SECCIÓN 3: BOTÓN GENERAR ==========
         button_frame = tk.Frame(main_frame, bg=self.COLOR_BLANCO)
         button_frame.pack(fill="x", pady=(0, 15))
         
+        num_frame = tk.Frame(button_frame, bg=self.COLOR_BLANCO)
+        num_frame.pack(pady=(0, 8))
+        
+        tk.Label(
+            num_frame,
+            text="Número de preguntas:",
+            font=("Segoe UI", 10),
+            fg=self.COLOR_AZUL_OSCURO,
+            bg=self.COLOR_BLANCO
+        ).pack(side="left", padx=5)
+        
+        self.var_num_preguntas = tk.StringVar(value=str(self.NUM_PREGUNTAS))
+        self.input_num_preguntas = tk.Spinbox(
+            num_frame,
+            from_=1,
+            to=self.MAX_PREGUNTAS,
+            textvariable=self.var_num_preguntas,
+            command=self._tema_cambiado,
+            font=("Segoe UI", 10),
+            width=4,
+            bg=self.COLOR_GRIS_SUAVE,
+            relief="solid",
+            borderwidth=1
+        )
+        self.input_num_preguntas.pack(side="left")
+        self.input_num_preguntas.bind("<KeyRelease>", lambda event: self._tema_cambiado())
+        
         self.btn_generar = tk.Button(
             button_frame,
             text="🚀 GENERAR PREGUNTAS",
@@ -176,6 +301,19 @@ class AppTkinter:
         )
         self.btn_generar.pack()
         
+        # Generación anticipada: opcional porque gasta cuota aunque no se use
+        self.var_pregenerar = tk.BooleanVar(value=os.getenv("PREGENERAR_PREGUNTAS") == "1")
+        tk.Checkbutton(
+            button_frame,
+            text="⚡ Ir generando las preguntas en cuanto se cargue el PDF",
+            variable=self.var_pregenerar,
+            command=self._pregenerar_cambiado,
+            font=("Segoe UI", 9),
+            fg=self.COLOR_AZUL_OSCURO,
+            bg=self.COLOR_BLANCO,
+            activebackground=self.COLOR_BLANCO
+        ).pack(pady=(8, 0))
+        
         # ========== SECCIÓN 4: ÁREA DE SALIDA ==========
         output_section = tk.LabelFrame(
             main_frame,
@@ -212,7 +350,7 @@ class AppTkinter:
             "2. (Opcional) Especifica un tema o contexto para enfocar las preguntas\n"
             "3. Haz clic en el botón 'Generar Preguntas'\n\n"
             "⏱️  El proceso toma aproximadamente 15-30 segundos...\n\n"
-            "✨ La aplicación generará 5 preguntas de opción múltiple con explicaciones.\n"
+            "✨ La aplicación generará las preguntas de opción múltiple indicadas, con explicaciones.\n"
         )
         self.output.config(state="disabled")
     
@@ -227,6 +365,7 @@ class AppTkinter:
             return
         
         self.pdf_ruta = ruta
+        self._cancelar_especulacion()
         
         # Mostrar mensaje de carga
         self._actualizar_output("🔄 Extrayendo PDF...", clear=True)
@@ -239,8 +378,9 @@ class AppTkinter:
     def _extraer_pdf(self, ruta):
         """Extrae contenido del PDF en thread"""
         try:
-            extractor = PDFExtractor()
-            contenido = extractor.extract_text(ruta)
+            extractor = PDFExtractor(parallel=True, cache=self.cache_pdf)
+            # Se pide un carácter más del límite solo para saber si hay que truncar
+            contenido = extractor.extract_text(ruta, max_chars=self.MAX_CARACTERES_PDF + 1)
             
             if not contenido or len(contenido.strip()) < 50:
                 self._mostrar_error("❌ El PDF no contiene contenido válido")
@@ -248,10 +388,11 @@ class AppTkinter:
                 return
             
             # Limitar contenido
-            if len(contenido) > 4000:
-                contenido = contenido[:4000] + "\n[... truncado ...]"
+            if len(contenido) > self.MAX_CARACTERES_PDF:
+                contenido = contenido[:self.MAX_CARACTERES_PDF] + "\n[... truncado ...]"
             
             self.contenido_pdf = contenido
+            self.pdf_hash = file_hash(ruta)
             
             # Actualizar UI
             self.root.after(0, self._pdf_cargado)
@@ -276,50 +417,257 @@ class AppTkinter:
             f"¡Listo para generar preguntas!",
             clear=True
         )
+        
+        if self.var_pregenerar.get():
+            self._iniciar_especulacion()
+    
+    def _tema_actual(self):
+        tema = self.input_tema.get()
+        return "" if tema == self.PLACEHOLDER_TEMA else tema
+    
+    def _num_preguntas(self):
+        """Número de preguntas elegido, o None si no es un número entre 1 y MAX_PREGUNTAS"""
+        try:
+            num = int(self.var_num_preguntas.get())
+        except ValueError:
+            return None
+        return num if 1 <= num <= self.MAX_PREGUNTAS else None
+    
+    def _clave_actual(self):
+        """Documento, tema y número de preguntas de la petición que se haría ahora"""
+        return (self.pdf_hash, self._tema_actual(), self._num_preguntas())
+    
+    # ========== GENERACIÓN ANTICIPADA ==========
+    
+    def _iniciar_especulacion(self):
+        """Empieza a generar en segundo plano para el PDF y el tema actuales"""
+        self._cancelar_especulacion()
+        clave = self._clave_actual()
+        if clave[2] is None:
+            return
+        especulacion = _Especulacion(clave)
+        self.especulacion = especulacion
+        threading.Thread(
+            target=self._especular,
+            args=(especulacion, self.contenido_pdf),
+            daemon=True
+        ).start()
+    
+    def _cancelar_especulacion(self):
+        """Descarta la generación anticipada en curso o terminada"""
+        if self.especulacion is not None:
+            self.especulacion.cancelar()
+            self.especulacion = None
+    
+    def _especular(self, especulacion, contenido):
+        """Genera las preguntas anticipadas (en thread)"""
+        try:
+            # Las preguntas se registran en el índice de duplicados al
+            # entregarlas, así las descartadas no dejan rastro
+            generator, sin_duplicados = self._crear_generador(registrar=False)
+            _, tema, num_preguntas = especulacion.clave
+            texto_prompt = select_relevant_text(
+                contenido,
+                tema,
+                max_chars=self.MAX_CARACTERES_PROMPT
+            )
+            if especulacion.cancelada:
+                return
+            flujo = self._preguntas_nuevas(generator, sin_duplicados, texto_prompt, num_preguntas, especulacion)
+            try:
+                for pregunta in flujo:
+                    if especulacion.cancelada:
+                        # Al no terminar el flujo, la caché de respuestas no guarda nada
+                        return
+                    especulacion.agregar(pregunta)
+            finally:
+                # Cierra ya la respuesta en curso del proveedor si se abandona
+                flujo.close()
+            if sin_duplicados is not None:
+                especulacion.descartadas = sin_duplicados.rejected
+            especulacion.terminar()
+        except Exception as e:
+            especulacion.terminar(e)
+    
+    def _tema_cambiado(self):
+        """Descarta la generación anticipada si ya no corresponde al tema o al número de preguntas"""
+        especulacion = self.especulacion
+        if especulacion is not None and especulacion.clave != self._clave_actual():
+            self._cancelar_especulacion()
+    
+    def _pregenerar_cambiado(self):
+        if not self.var_pregenerar.get():
+            self._cancelar_especulacion()
+        elif self.contenido_pdf and self.especulacion is None:
+            self._iniciar_especulacion()
+    
+    def _tomar_especulacion(self, tema, num_preguntas):
+        """
+        Devuelve la generación anticipada si sirve para esta petición
+
+        Solo se aprovecha si es del mismo documento, tema y número de
+        preguntas y no ha fallado; en cualquier caso deja de estar
+        disponible para la siguiente.
+        """
+        especulacion, self.especulacion = self.especulacion, None
+        if especulacion is None:
+            return None
+        if especulacion.clave != (self.pdf_hash, tema, num_preguntas) or especulacion.error is not None:
+            especulacion.cancelar()
+            return None
+        return especulacion
     
     def generar_preguntas(self):
-        """Genera 5 preguntas"""
+        """Genera el número de preguntas indicado"""
         if not self.contenido_pdf:
             messagebox.showwarning("Error", "Carga un PDF primero")
             return
         
-        tema = self.input_tema.get()
+        num_preguntas = self._num_preguntas()
+        if num_preguntas is None:
+            messagebox.showwarning("Error", f"El número de preguntas debe estar entre 1 y {self.MAX_PREGUNTAS}")
+            return
+        
+        tema = self._tema_actual()
+        especulacion = self._tomar_especulacion(tema, num_preguntas)
         
         # Deshabilitar botones
         self.btn_cargar.config(state="disabled")
         self.btn_generar.config(state="disabled")
         
-        self._actualizar_output("⏳ Generando preguntas con IA...\n\n(Esto toma 15-30 segundos)", clear=True)
+        self._actualizar_output("⏳ Generando preguntas con IA...\n\n(Las preguntas aparecerán a medida que se generen)", clear=True)
         
         # Generar en thread
         thread = threading.Thread(
             target=self._generar_preguntas_thread,
-            args=(self.contenido_pdf, tema)
+            args=(self.contenido_pdf, tema, num_preguntas, especulacion)
         )
         thread.start()
     
-    def _generar_preguntas_thread(self, contenido, tema):
-        """Genera preguntas en thread separado"""
+    def _crear_generador(self, registrar=True):
+        """
+        Crea el generador (con caché de respuestas y reintentos ante 429)
+
+        Args:
+            registrar: Si es False, las preguntas aceptadas no se añaden al
+                índice de duplicados hasta que se entreguen
+
+        Returns:
+            (generador, filtro de duplicados o None si el índice aún no está cargado)
+        """
+        # Sin tema se envía el documento entero: si no cabe en un prompt se
+        # reparte en fragmentos en lugar de comprimirlo
+        generator = MapReduceQuestionGenerator(RateLimitedGenerator(get_generator(provider="google")))
+        generator = FanOutQuestionGenerator(generator)
+        
+        generator = CachedQuestionGenerator(generator, cache=self.cache_respuestas)
+        
+        # Descartar las preguntas casi iguales a otras del banco; va por
+        # fuera de la caché para filtrar también las respuestas guardadas
+        sin_duplicados = None
+        if self.indice_duplicados is not None:
+            sin_duplicados = DeduplicatingGenerator(generator, self.indice_duplicados, record=registrar)
+            generator = sin_duplicados
+        
+        return generator, sin_duplicados
+    
+    def _preguntas_nuevas(self, generator, sin_duplicados, texto_prompt, num_preguntas, especulacion=None):
+        """
+        Genera las preguntas que no están ya en el banco
+        
+        Si se descartan todas (normalmente porque la respuesta venía de la
+        caché y ya se guardó en el banco), se pide una vez una respuesta
+        nueva sin consultar la caché, salvo que la generación anticipada
+        para la que se piden se haya cancelado.
+        """
+        entregadas = 0
+        for pregunta in generator.generate_questions_stream(text=texto_prompt, num_questions=num_preguntas):
+            entregadas += 1
+            yield pregunta
+        
+        if entregadas or sin_duplicados is None or not sin_duplicados.rejected:
+            return
+        if especulacion is not None and especulacion.cancelada:
+            return
+        cacheado = sin_duplicados.generator
+        for pregunta in cacheado.generate_questions_stream(texto_prompt, num_preguntas, force_refresh=True):
+            if sin_duplicados.accept(pregunta):
+                yield pregunta
+    
+    def _desde_especulacion(self, especulacion, generator, sin_duplicados, contenido, tema, num_preguntas):
+        """
+        Entrega las preguntas generadas por anticipado
+        
+        Si la generación anticipada falla, incluso después de entregar
+        algunas, las que faltan se piden con una generación normal.
+        """
+        entregadas = 0
         try:
-            # Crear generador
-            generator = create_generator(provider="google")
+            for pregunta in especulacion:
+                # Las anticipadas no se registraron en el índice de duplicados
+                if sin_duplicados is not None:
+                    sin_duplicados.record_question(pregunta)
+                entregadas += 1
+                yield pregunta
+            return
+        except Exception as e:
+            print(f"⚠️  Falló la generación anticipada ({e}); se generan las preguntas que faltan")
+        
+        if entregadas >= num_preguntas:
+            return
+        texto_prompt = select_relevant_text(
+            contenido,
+            tema,
+            max_chars=self.MAX_CARACTERES_PROMPT
+        )
+        yield from self._preguntas_nuevas(generator, sin_duplicados, texto_prompt, num_preguntas - entregadas)
+    
+    def _generar_preguntas_thread(self, contenido, tema, num_preguntas, especulacion=None):
+        """Genera preguntas en thread separado, o entrega las generadas por anticipado"""
+        try:
+            generator, sin_duplicados = self._crear_generador()
             
-            # Generar preguntas
-            preguntas = generator.generate_questions(
-                text=contenido,
-                num_questions=5
-            )
+            if especulacion is not None:
+                # Preguntas ya generadas (o en camino) para este documento y tema
+                fuente = self._desde_especulacion(especulacion, generator, sin_duplicados,
+                                                  contenido, tema, num_preguntas)
+            else:
+                # Enviar solo los fragmentos relacionados con el tema
+                texto_prompt = select_relevant_text(
+                    contenido,
+                    tema,
+                    max_chars=self.MAX_CARACTERES_PROMPT
+                )
+                fuente = self._preguntas_nuevas(generator, sin_duplicados, texto_prompt, num_preguntas)
+            
+            # Mostrar cada pregunta en cuanto llega
+            preguntas = []
+            for pregunta in fuente:
+                # Se valida una sola vez; una pregunta mal formada se descarta
+                # en lugar de interrumpir la evaluación
+                try:
+                    validada = Question.from_dict(pregunta)
+                except ValueError as e:
+                    print(f"⚠️  Pregunta descartada: {e}")
+                    continue
+                preguntas.append(validada)
+                texto = self._formatear_pregunta(len(preguntas), validada)
+                if len(preguntas) == 1:
+                    texto = self._formatear_encabezado() + texto
+                self.root.after(0, lambda t=texto, c=len(preguntas) == 1: self._actualizar_output(t, clear=c))
             
             if not preguntas:
-                self._mostrar_error("❌ No se generaron preguntas")
+                descartadas = sin_duplicados.rejected if sin_duplicados is not None else 0
+                if especulacion is not None:
+                    descartadas += especulacion.descartadas
+                if descartadas:
+                    self._mostrar_error("❌ Todas las preguntas generadas ya estaban en el banco")
+                else:
+                    self._mostrar_error("❌ No se generaron preguntas")
                 return
             
-            # Formatear preguntas
-            texto = self._formatear_preguntas(preguntas)
-            self.root.after(0, lambda: self._actualizar_output(texto, clear=True))
-            
-            # Guardar en logs
-            self._guardar_log(preguntas)
+            # Guardar en el banco de preguntas
+            self._guardar_en_banco(preguntas, tema, generator)
         
         except Exception as e:
             self._mostrar_error(f"❌ Error: {str(e)}")
@@ -331,75 +679,58 @@ class AppTkinter:
                 self.btn_generar.config(state="normal")
             ])
     
-    def _formatear_preguntas(self, preguntas):
-        """Formatea preguntas para mostrar con estilos elegantes"""
-        texto = "📚 EVALUACIÓN GENERADA\n"
+    def _formatear_encabezado(self):
+        """Encabezado de la evaluación"""
+        return "📚 EVALUACIÓN GENERADA\n" + "=" * 80 + "\n\n"
+    
+    def _formatear_pregunta(self, idx, q):
+        """Formatea una pregunta (Question ya validada) para mostrarla en cuanto llega"""
+        texto = f"❓ PREGUNTA {idx}\n"
+        texto += f"{'─' * 80}\n"
+        texto += f"{q.pregunta}\n\n"
+        
+        for opt_idx, opcion in enumerate(q.opciones):
+            marcador = "✓" if opt_idx == q.respuesta_correcta else "○"
+            letra = chr(65 + opt_idx)
+            texto += f"  {marcador} {letra}) {opcion}\n"
+        
+        texto += f"\n✅ Respuesta correcta: {q.letra}\n"
+        texto += f"💡 Explicación: {q.explicacion}\n"
         texto += "=" * 80 + "\n\n"
         
-        for idx, q in enumerate(preguntas, 1):
-            texto += f"❓ PREGUNTA {idx}\n"
-            texto += f"{'─' * 80}\n"
-            texto += f"{q.get('pregunta', '')}\n\n"
-            
-            opciones = q.get('opciones', [])
-            respuesta_idx = q.get('respuesta_correcta', 0)
-            
-            for opt_idx, opcion in enumerate(opciones):
-                marcador = "✓" if opt_idx == respuesta_idx else "○"
-                letra = chr(65 + opt_idx)
-                texto += f"  {marcador} {letra}) {opcion}\n"
-            
-            texto += f"\n✅ Respuesta correcta: {chr(65 + respuesta_idx)}\n"
-            texto += f"💡 Explicación: {q.get('explicacion', '')}\n"
-            texto += "=" * 80 + "\n\n"
-        
         return texto
     
     def _actualizar_output(self, texto, clear=False):
         """Actualiza el área de salida"""
-        self.output.config(state="normal")
-        if clear:
-            self.output.delete("1.0", "end")
-        self.output.insert("end", texto)
-        self.output.config(state="disabled")
-        self.output.see("end")
+        with telemetry.span("ui.render") as span:
+            self.output.config(state="normal")
+            if clear:
+                self.output.delete("1.0", "end")
+            self.output.insert("end", texto)
+            self.output.config(state="disabled")
+            self.output.see("end")
+            if span:
+                span.set(chars=len(texto))
     
     def _mostrar_error(self, mensaje):
         """Muestra error en output y en messagebox"""
         self._actualizar_output(mensaje, clear=True)
         self.root.after(0, lambda: messagebox.showerror("Error", mensaje))
     
-    def _guardar_log(self, preguntas):
-        """Guarda resultado en logs/"""
+    def _guardar_en_banco(self, preguntas, tema, generator):
+        """Guarda el resultado en el banco de preguntas (ver question_bank.py)"""
         try:
-            from datetime import datetime
-            import json
-            
-            logs_dir = Path("logs")
-            logs_dir.mkdir(exist_ok=True)
-            
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            log_file = logs_dir / f"preguntas_{timestamp}.txt"
-            
-            with open(log_file, 'w', encoding='utf-8') as f:
-                f.write(f"PDF: {self.pdf_ruta}\n")
-                f.write(f"Fecha: {datetime.now()}\n")
-                f.write("="*70 + "\n\n")
-                
-                for idx, q in enumerate(preguntas, 1):
-                    f.write(f"PREGUNTA {idx}\n")
-                    f.write(f"{q.get('pregunta', '')}\n\n")
-                    
-                    opciones = q.get('opciones', [])
-                    for opt_idx, opcion in enumerate(opciones):
-                        f.write(f"  {chr(65 + opt_idx)}) {opcion}\n")
-                    
-                    f.write(f"\nRespuesta: {chr(65 + q.get('respuesta_correcta', 0))}\n")
-                    f.write(f"{q.get('explicacion', '')}\n\n")
-                    f.write("-"*70 + "\n\n")
+            self.banco.add(
+                preguntas,
+                pdf_hash=self.pdf_hash,
+                provider=generator.provider,
+                model=generator.model_name,
+                tema=tema,
+                pdf=Path(self.pdf_ruta).name
+            )
         
         except Exception as e:
-            print(f"⚠️  No se pudo guardar log: {e}")
+            print(f"⚠️  No se pudo guardar en el banco de preguntas: {e}")
 
 
 def main():
@@ -0,0 +1,553 @@
+"""
+Generación por lotes: cola de trabajos persistente en SQLite
+
+Encola todos los PDF de un directorio y los procesa con varios procesos
+trabajadores (cada uno con varios hilos, porque la mayor parte del tiempo
+se espera al proveedor). Cada PDF es un trabajo identificado por el lote y
+el hash de su contenido, así que volver a encolar un directorio no duplica
+nada y un resultado se escribe siempre en el mismo fichero.
+
+Mientras un trabajo está en curso, su trabajador renueva la concesión
+periódicamente. Si se interrumpe con Ctrl-C, los trabajos en curso vuelven
+a la cola sin gastar un intento; si un proceso muere, sus trabajos vuelven
+al reanudar en la misma máquina (en otra, al caducar la concesión). Los
+fallos se reintentan hasta un máximo de intentos.
+
+Uso:
+    python batch_jobs.py enqueue apuntes/ --batch semestre1 --provider google --num 10
+    python batch_jobs.py work --batch semestre1 --workers 8 --threads 4 --output resultados/
+    python batch_jobs.py status --batch semestre1
+    python batch_jobs.py retry --batch semestre1
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import closing
+from pathlib import Path
+
+from question_bank import file_hash
+
+
+PENDING = "pendiente"
+RUNNING = "en_curso"
+DONE = "hecho"
+FAILED = "error"
+
+MAX_CARACTERES_PDF = 100000
+MAX_CARACTERES_PROMPT = 20000
+
+
+class JobQueue:
+    """Cola de trabajos en SQLite, segura entre hilos y procesos"""
+
+    def __init__(self, path: str = ".cache/trabajos.sqlite3", max_attempts: int = 3,
+                 lease: float = 600.0):
+        """
+        Inicializa la cola
+
+        Args:
+            path: Ruta de la base de datos SQLite
+            max_attempts: Intentos de cada trabajo antes de darlo por fallido
+            lease: Segundos tras los que un trabajo en curso sin terminar se
+                considera abandonado (el trabajador murió) y se vuelve a repartir
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_attempts = max_attempts
+        self.lease = lease
+
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS trabajos ("
+                " id INTEGER PRIMARY KEY,"
+                " lote TEXT NOT NULL,"
+                " ruta TEXT NOT NULL,"
+                " hash TEXT NOT NULL,"
+                " proveedor TEXT NOT NULL,"
+                " num_preguntas INTEGER NOT NULL,"
+                " tema TEXT NOT NULL DEFAULT '',"
+                " estado TEXT NOT NULL,"
+                " intentos INTEGER NOT NULL DEFAULT 0,"
+                " trabajador TEXT,"
+                " creado REAL NOT NULL,"
+                " iniciado REAL,"
+                " renovado REAL,"
+                " terminado REAL,"
+                " duracion REAL,"
+                " resultado TEXT,"
+                " error TEXT,"
+                " UNIQUE (lote, hash))"
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(trabajos)")}
+            if "renovado" not in columns:
+                # Colas creadas antes de renovar las concesiones
+                conn.execute("ALTER TABLE trabajos ADD COLUMN renovado REAL")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_trabajos_estado ON trabajos(lote, estado)")
+
+    def enqueue(self, batch: str, paths, provider: str = "google", num_questions: int = 5,
+                tema: str = "") -> int:
+        """
+        Encola los PDF indicados; los que ya están en el lote se ignoran
+
+        Returns:
+            Número de trabajos nuevos
+        """
+        now = time.time()
+        rows = [
+            (batch, str(path), file_hash(path), provider, num_questions, tema, PENDING, now)
+            for path in paths
+        ]
+        with closing(self._connect()) as conn, conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO trabajos"
+                " (lote, ruta, hash, proveedor, num_preguntas, tema, estado, creado)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            return conn.total_changes - before
+
+    def claim(self, batch: str, worker: str):
+        """
+        Asigna al trabajador el siguiente trabajo pendiente o abandonado
+
+        Returns:
+            Diccionario con el trabajo, o None si no queda ninguno disponible
+        """
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.row_factory = sqlite3.Row
+            # BEGIN IMMEDIATE toma el bloqueo de escritura antes de leer: dos
+            # trabajadores no pueden elegir el mismo trabajo
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Los abandonados sin intentos restantes no volverán a repartirse
+                conn.execute(
+                    "UPDATE trabajos SET estado = ?, error = 'Concesión caducada'"
+                    " WHERE lote = ? AND estado = ? AND COALESCE(renovado, iniciado) < ?"
+                    " AND intentos >= ?",
+                    (FAILED, batch, RUNNING, now - self.lease, self.max_attempts)
+                )
+                row = conn.execute(
+                    "SELECT * FROM trabajos WHERE lote = ? AND intentos < ?"
+                    " AND (estado = ? OR (estado = ? AND COALESCE(renovado, iniciado) < ?))"
+                    " ORDER BY id LIMIT 1",
+                    (batch, self.max_attempts, PENDING, RUNNING, now - self.lease)
+                ).fetchone()
+                if row is not None:
+                    conn.execute(
+                        "UPDATE trabajos SET estado = ?, trabajador = ?, iniciado = ?, renovado = ?,"
+                        " intentos = intentos + 1 WHERE id = ?",
+                        (RUNNING, worker, now, now, row["id"])
+                    )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return dict(row) if row is not None else None
+
+    def renew(self, job_id: int, worker: str) -> bool:
+        """
+        Renueva la concesión de un trabajo en curso
+
+        Returns:
+            False si el trabajo ya no pertenece al trabajador (su concesión
+            caducó y se repartió a otro)
+        """
+        with closing(self._connect()) as conn, conn:
+            cursor = conn.execute(
+                "UPDATE trabajos SET renovado = ? WHERE id = ? AND estado = ? AND trabajador = ?",
+                (time.time(), job_id, RUNNING, worker)
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, job_id: int, worker: str, result_path: str, duration: float) -> bool:
+        """
+        Marca el trabajo como hecho
+
+        Returns:
+            False si el trabajo ya no pertenece al trabajador; entonces no se
+            modifica, para no pisar el estado de quien lo tiene ahora
+        """
+        with closing(self._connect()) as conn, conn:
+            cursor = conn.execute(
+                "UPDATE trabajos SET estado = ?, terminado = ?, duracion = ?, resultado = ?,"
+                " error = NULL WHERE id = ? AND estado = ? AND trabajador = ?",
+                (DONE, time.time(), duration, result_path, job_id, RUNNING, worker)
+            )
+            return cursor.rowcount == 1
+
+    def fail(self, job_id: int, worker: str, error: str) -> bool:
+        """
+        Devuelve el trabajo a la cola, o lo marca como fallido si agotó los intentos
+
+        Returns:
+            False si el trabajo ya no pertenece al trabajador (no se modifica)
+        """
+        with closing(self._connect()) as conn, conn:
+            cursor = conn.execute(
+                "UPDATE trabajos SET estado = CASE WHEN intentos >= ? THEN ? ELSE ? END,"
+                " error = ?, terminado = ? WHERE id = ? AND estado = ? AND trabajador = ?",
+                (self.max_attempts, FAILED, PENDING, error, time.time(), job_id, RUNNING, worker)
+            )
+            return cursor.rowcount == 1
+
+    def release(self, batch: str, processes) -> int:
+        """
+        Devuelve a la cola los trabajos en curso de los procesos indicados
+
+        Es para interrupciones ordenadas (Ctrl-C): el intento no cuenta.
+
+        Args:
+            processes: Identificadores "máquina:pid" de los procesos trabajadores
+
+        Returns:
+            Número de trabajos devueltos a la cola
+        """
+        released = 0
+        with closing(self._connect()) as conn, conn:
+            for process in processes:
+                cursor = conn.execute(
+                    "UPDATE trabajos SET estado = ?, trabajador = NULL, intentos = MAX(intentos - 1, 0)"
+                    " WHERE lote = ? AND estado = ? AND trabajador LIKE ? ESCAPE '\\'",
+                    (PENDING, batch, RUNNING, _like_prefix(f"{process}:"))
+                )
+                released += cursor.rowcount
+        return released
+
+    def requeue_abandoned(self, batch: str) -> int:
+        """
+        Devuelve a la cola los trabajos en curso de procesos de esta máquina
+        que ya no existen, sin esperar a que caduque su concesión
+
+        El intento sí cuenta (el proceso pudo morir por culpa del PDF): si
+        se agotaron, el trabajo queda como fallido.
+
+        Returns:
+            Número de trabajos recuperados
+        """
+        host = socket.gethostname()
+        with closing(self._connect()) as conn, conn:
+            rows = conn.execute(
+                "SELECT id, trabajador FROM trabajos WHERE lote = ? AND estado = ?",
+                (batch, RUNNING)
+            ).fetchall()
+            abandoned = [
+                (job_id, worker) for job_id, worker in rows
+                if _worker_host(worker) == host and not _pid_alive(_worker_pid(worker))
+            ]
+            conn.executemany(
+                "UPDATE trabajos SET estado = CASE WHEN intentos >= ? THEN ? ELSE ? END,"
+                " error = 'Trabajador terminado', terminado = ?"
+                " WHERE id = ? AND estado = ? AND trabajador = ?",
+                [(self.max_attempts, FAILED, PENDING, time.time(), job_id, RUNNING, worker)
+                 for job_id, worker in abandoned]
+            )
+        return len(abandoned)
+
+    def retry_failed(self, batch: str) -> int:
+        """Vuelve a encolar los trabajos fallidos del lote con los intentos a cero"""
+        with closing(self._connect()) as conn, conn:
+            cursor = conn.execute(
+                "UPDATE trabajos SET estado = ?, intentos = 0, error = NULL"
+                " WHERE lote = ? AND estado = ?",
+                (PENDING, batch, FAILED)
+            )
+            return cursor.rowcount
+
+    def progress(self, batch: str, since: float = None) -> dict:
+        """
+        Estado del lote
+
+        Args:
+            since: Instante desde el que medir el ritmo para la ETA (por
+                defecto, el primer trabajo terminado del lote)
+        """
+        with closing(self._connect()) as conn:
+            counts = dict(conn.execute(
+                "SELECT estado, COUNT(*) FROM trabajos WHERE lote = ? GROUP BY estado", (batch,)
+            ).fetchall())
+            done, first, last, avg = conn.execute(
+                "SELECT COUNT(*), MIN(iniciado), MAX(terminado), AVG(duracion) FROM trabajos"
+                " WHERE lote = ? AND estado = ? AND terminado >= ?",
+                (batch, DONE, since or 0)
+            ).fetchone()
+
+        total = sum(counts.values())
+        remaining = counts.get(PENDING, 0) + counts.get(RUNNING, 0)
+        # Ritmo real (no la duración media), que ya incluye el paralelismo
+        elapsed = time.time() - since if since else (last or 0) - (first or 0)
+        rate = done / elapsed if done and elapsed > 0 else None
+        return {
+            "total": total,
+            PENDING: counts.get(PENDING, 0),
+            RUNNING: counts.get(RUNNING, 0),
+            DONE: counts.get(DONE, 0),
+            FAILED: counts.get(FAILED, 0),
+            "avg_seconds": avg,
+            "rate_per_minute": rate * 60 if rate else None,
+            "eta_seconds": remaining / rate if rate else None,
+        }
+
+    def _connect(self):
+        # Una conexión por operación: la cola se usa desde varios hilos y procesos
+        return sqlite3.connect(self.path, timeout=60)
+
+
+def _like_prefix(prefix: str) -> str:
+    """Patrón LIKE que encuentra los valores que empiezan por prefix"""
+    return prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def _worker_host(worker) -> str:
+    """Máquina del identificador de trabajador (máquina:pid:hilo)"""
+    return (worker or "").rsplit(":", 2)[0]
+
+
+def _worker_pid(worker):
+    """PID del identificador de trabajador, o None si no tiene el formato esperado"""
+    try:
+        return int((worker or "").rsplit(":", 2)[1])
+    except (IndexError, ValueError):
+        return None
+
+
+def _pid_alive(pid) -> bool:
+    """
+    Indica si el proceso existe en esta máquina
+
+    Ante la duda (sin PID, o en Windows, donde os.kill lo terminaría) se
+    supone vivo y el trabajo se recupera al caducar la concesión.
+    """
+    if pid is None or os.name != "posix":
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _write_result(output_dir: Path, job: dict, questions: list) -> str:
+    """Escribe el resultado de forma atómica; el nombre depende solo del PDF"""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    path = output_dir / f"{Path(job['ruta']).stem}-{job['hash'][:12]}.json"
+    payload = {
+        "pdf": job["ruta"],
+        "hash": job["hash"],
+        "provider": job["proveedor"],
+        "tema": job["tema"],
+        "questions": questions,
+    }
+    fd, tmp = tempfile.mkstemp(dir=output_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+    return str(path)
+
+
+def _worker_process(queue_path, batch, output_dir, threads, worker_count, max_attempts, lease):
+    """Proceso trabajador: varios hilos que toman trabajos hasta vaciar la cola"""
+    from dotenv import load_dotenv
+
+    from generator_registry import get_generator
+    from parallel_generation import FanOutQuestionGenerator, MapReduceQuestionGenerator
+    from pdf_cache import PDFTextCache
+    from pdf_extractor import PDFExtractor
+    from rate_limiter import DEFAULT_LIMITS, RateLimitedGenerator, set_limits
+    from response_cache import CachedQuestionGenerator
+    from retrieval import select_relevant_text
+
+    load_dotenv()
+    jobs = JobQueue(queue_path, max_attempts, lease)
+    extractor = PDFExtractor(cache=PDFTextCache())
+    output_dir = Path(output_dir)
+    generators = {}
+    generators_lock = threading.Lock()
+
+    def generator_for(provider):
+        with generators_lock:
+            if provider not in generators:
+                # La cuota es por proceso: cada trabajador usa su parte
+                limits = DEFAULT_LIMITS.get(provider)
+                if limits:
+                    set_limits(provider, limits["requests_per_minute"] / worker_count,
+                               limits["tokens_per_minute"] / worker_count)
+                generators[provider] = CachedQuestionGenerator(
+                    FanOutQuestionGenerator(
+                        MapReduceQuestionGenerator(RateLimitedGenerator(get_generator(provider=provider)))
+                    )
+                )
+            return generators[provider]
+
+    # Trabajos en curso de este proceso, cuya concesión renueva el latido
+    running = {}
+    running_lock = threading.Lock()
+    stopped = threading.Event()
+
+    def heartbeat():
+        while not stopped.wait(lease / 3):
+            with running_lock:
+                current = list(running.items())
+            for job_id, name in current:
+                jobs.renew(job_id, name)
+
+    def run(name):
+        while True:
+            job = jobs.claim(batch, name)
+            if job is None:
+                return
+            with running_lock:
+                running[job["id"]] = name
+            try:
+                process(job, name)
+            finally:
+                with running_lock:
+                    del running[job["id"]]
+
+    def process(job, name):
+        started = time.monotonic()
+        try:
+            text = extractor.extract_text(job["ruta"], max_chars=MAX_CARACTERES_PDF)
+            if not text.strip():
+                raise ValueError("El PDF no tiene texto extraíble")
+            text = select_relevant_text(text, job["tema"], max_chars=MAX_CARACTERES_PROMPT)
+            questions = generator_for(job["proveedor"]).generate_questions(text, job["num_preguntas"])
+            if not questions:
+                raise ValueError("No se generaron preguntas")
+            result = _write_result(output_dir, job, questions)
+        except Exception as e:
+            jobs.fail(job["id"], name, str(e))
+            return
+        jobs.complete(job["id"], name, result, time.monotonic() - started)
+
+    prefix = f"{socket.gethostname()}:{os.getpid()}"
+    workers = [threading.Thread(target=run, args=(f"{prefix}:{i}",)) for i in range(threads)]
+    beat = threading.Thread(target=heartbeat, daemon=True)
+    beat.start()
+    for thread in workers:
+        thread.start()
+    try:
+        for thread in workers:
+            thread.join()
+    finally:
+        stopped.set()
+
+
+def format_duration(seconds) -> str:
+    if seconds is None:
+        return "—"
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}h {minutes:02d}m"
+    return f"{minutes}m {seconds:02d}s"
+
+
+def format_progress(progress: dict) -> str:
+    rate = progress["rate_per_minute"]
+    return (
+        f"📊 {progress[DONE]}/{progress['total']} hechos · {progress[RUNNING]} en curso · "
+        f"{progress[FAILED]} con error · "
+        f"{f'{rate:.1f} PDF/min' if rate else '— PDF/min'} · ETA {format_duration(progress['eta_seconds'])}"
+    )
+
+
+def work(queue: JobQueue, batch: str, output_dir: str, workers: int, threads: int,
+         report_every: float = 10.0):
+    """Lanza los procesos trabajadores e informa del progreso hasta que terminan"""
+    started = time.time()
+    recovered = queue.requeue_abandoned(batch)
+    if recovered:
+        print(f"♻️  {recovered} trabajos de procesos terminados vueltos a la cola")
+    processes = [
+        multiprocessing.Process(
+            target=_worker_process,
+            args=(str(queue.path), batch, output_dir, threads, workers, queue.max_attempts, queue.lease)
+        )
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+
+    try:
+        while any(p.is_alive() for p in processes):
+            for process in processes:
+                process.join(timeout=report_every / len(processes))
+            print(format_progress(queue.progress(batch, since=started)), flush=True)
+    except KeyboardInterrupt:
+        print("\n⏸️  Interrumpido; ejecuta de nuevo 'work' para continuar")
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
+        # Los trabajos que tenían en curso vuelven a la cola sin gastar un intento
+        host = socket.gethostname()
+        queue.release(batch, [f"{host}:{process.pid}" for process in processes])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generación de preguntas por lotes")
+    parser.add_argument("--db", default=os.path.join(".cache", "trabajos.sqlite3"),
+                        help="Base de datos de la cola")
+    parser.add_argument("--max-attempts", type=int, default=3)
+    parser.add_argument("--lease", type=float, default=600.0,
+                        help="Segundos tras los que un trabajo en curso se da por abandonado")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    enqueue = commands.add_parser("enqueue", help="Encolar los PDF de un directorio")
+    enqueue.add_argument("directory")
+    enqueue.add_argument("--batch", required=True)
+    enqueue.add_argument("--pattern", default="*.pdf")
+    enqueue.add_argument("--recursive", action="store_true")
+    enqueue.add_argument("--provider", default="google")
+    enqueue.add_argument("--num", type=int, default=5)
+    enqueue.add_argument("--tema", default="")
+
+    run = commands.add_parser("work", help="Procesar los trabajos pendientes del lote")
+    run.add_argument("--batch", required=True)
+    run.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    run.add_argument("--threads", type=int, default=4, help="Hilos por proceso")
+    run.add_argument("--output", default="resultados")
+    run.add_argument("--report-every", type=float, default=10.0)
+
+    status = commands.add_parser("status", help="Mostrar el progreso del lote")
+    status.add_argument("--batch", required=True)
+
+    retry = commands.add_parser("retry", help="Volver a encolar los trabajos con error")
+    retry.add_argument("--batch", required=True)
+
+    args = parser.parse_args()
+    queue = JobQueue(args.db, args.max_attempts, args.lease)
+
+    if args.command == "enqueue":
+        directory = Path(args.directory)
+        paths = sorted(directory.rglob(args.pattern) if args.recursive else directory.glob(args.pattern))
+        added = queue.enqueue(args.batch, paths, args.provider, args.num, args.tema)
+        print(f"✅ {added} trabajos nuevos ({len(paths) - added} ya estaban en el lote {args.batch})")
+    elif args.command == "work":
+        work(queue, args.batch, args.output, args.workers, args.threads, args.report_every)
+        print(format_progress(queue.progress(args.batch)))
+    elif args.command == "status":
+        print(format_progress(queue.progress(args.batch)))
+    elif args.command == "retry":
+        print(f"🔁 {queue.retry_failed(args.batch)} trabajos vueltos a encolar")
+
+
+if __name__ == "__main__":
+    main()
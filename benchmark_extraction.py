@@ -0,0 +1,346 @@
+"""
+Banco de pruebas de la extracción de texto de PDFs
+
+Genera con reportlab un corpus sintético (PDF pequeño, PDF de 1000 páginas,
+PDF con muchas imágenes y PDF con muchas fuentes) y mide cada modo de
+PDFExtractor: serie, paralelo, streaming (iter_pages) y con caché. Cada
+medición se hace en un proceso nuevo para que el pico de memoria (RSS) de
+una no contamine la siguiente.
+
+Los resultados se guardan en JSON y se pueden comparar con una línea base:
+si algún tiempo o pico de memoria empeora más del umbral, el programa
+termina con código 1, de modo que sirve como control en CI.
+
+Uso:
+    python benchmark_extraction.py --output resultados.json
+    python benchmark_extraction.py --baseline linea_base.json --threshold 0.20
+    python benchmark_extraction.py --baseline linea_base.json --update-baseline
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from pdf_cache import PDFTextCache
+from pdf_extractor import PDFExtractor
+
+
+CORPUS_VERSION = 1
+
+# Nombre -> (páginas, tipo de contenido)
+CORPUS = {
+    "small": (5, "text"),
+    "large": (1000, "text"),
+    "images": (60, "images"),
+    "fonts": (120, "fonts"),
+}
+
+MODES = ("serial", "parallel", "streaming", "cached")
+
+_WORDS = (
+    "célula mitocondria ribosoma membrana núcleo proteína energía respiración "
+    "fotosíntesis cloroplasto organismo tejido órgano sistema función estructura "
+    "genético cromosoma enzima metabolismo glucosa oxígeno transporte síntesis"
+).split()
+
+
+def _paragraph(rng: random.Random, words: int = 60) -> str:
+    text = " ".join(rng.choice(_WORDS) for _ in range(words))
+    return text[0].upper() + text[1:] + "."
+
+
+def _write_lines(canvas, rng, font, size, top=740, bottom=60):
+    """Llena la página de líneas de texto con la fuente indicada"""
+    y = top
+    text = canvas.beginText(50, y)
+    text.setFont(font, size)
+    while y > bottom:
+        text.textLine(_paragraph(rng, 12))
+        y -= size * 1.3
+    canvas.drawText(text)
+
+
+def _random_image(rng: random.Random, width: int, height: int):
+    """Imagen de ruido (incompresible) o None si no está Pillow"""
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    from reportlab.lib.utils import ImageReader
+    return ImageReader(Image.frombytes("RGB", (width, height), rng.randbytes(width * height * 3)))
+
+
+def _register_fonts() -> list:
+    """Fuentes estándar más las TrueType incluidas en reportlab (se incrustan en el PDF)"""
+    import reportlab
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+
+    fonts = [
+        "Helvetica", "Helvetica-Bold", "Helvetica-Oblique", "Times-Roman", "Times-Bold",
+        "Times-Italic", "Courier", "Courier-Bold", "Courier-Oblique",
+    ]
+    font_dir = os.path.join(os.path.dirname(reportlab.__file__), "fonts")
+    for name in ("Vera", "VeraBd", "VeraIt", "VeraBI"):
+        path = os.path.join(font_dir, f"{name}.ttf")
+        if os.path.exists(path):
+            pdfmetrics.registerFont(TTFont(name, path))
+            fonts.append(name)
+    return fonts
+
+
+def build_pdf(path: str, pages: int, kind: str, seed: int = 0):
+    """Genera un PDF sintético determinista del tipo indicado"""
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas as pdf_canvas
+
+    rng = random.Random(seed)
+    canvas = pdf_canvas.Canvas(path, pagesize=letter)
+    fonts = _register_fonts() if kind == "fonts" else ["Helvetica"]
+
+    for page in range(pages):
+        if kind == "text":
+            _write_lines(canvas, rng, "Helvetica", 10)
+        elif kind == "fonts":
+            # Varias fuentes por página, como en un documento maquetado
+            for block in range(4):
+                font = fonts[(page * 4 + block) % len(fonts)]
+                _write_lines(canvas, rng, font, 9 + block, top=740 - block * 170, bottom=740 - (block + 1) * 170)
+        elif kind == "images":
+            canvas.setFont("Helvetica", 10)
+            canvas.drawString(50, 750, _paragraph(rng, 10))
+            for i in range(4):
+                x, y = 50 + (i % 2) * 260, 420 - (i // 2) * 300
+                image = _random_image(rng, 320, 240)
+                if image is not None:
+                    canvas.drawImage(image, x, y, width=250, height=190)
+                else:
+                    # Sin Pillow: rejilla de rectángulos, igual de pesada de dibujar
+                    for cell in range(400):
+                        canvas.setFillColorRGB(rng.random(), rng.random(), rng.random())
+                        canvas.rect(x + (cell % 20) * 12.5, y + (cell // 20) * 9.5, 12.5, 9.5,
+                                    stroke=0, fill=1)
+                canvas.setFillColorRGB(0, 0, 0)
+                canvas.drawString(x, y - 14, _paragraph(rng, 6))
+        canvas.showPage()
+    canvas.save()
+
+
+def ensure_corpus(directory: str, names=None) -> dict:
+    """Genera los PDF que falten en directory y devuelve sus rutas"""
+    os.makedirs(directory, exist_ok=True)
+    paths = {}
+    for name in names or CORPUS:
+        pages, kind = CORPUS[name]
+        path = os.path.join(directory, f"{name}_v{CORPUS_VERSION}.pdf")
+        if not os.path.exists(path):
+            print(f"📄 Generando {name} ({pages} páginas)...")
+            tmp = path + ".tmp"
+            build_pdf(tmp, pages, kind)
+            os.replace(tmp, path)
+        paths[name] = path
+    return paths
+
+
+def _peak_rss_mb(who):
+    """
+    Pico de memoria residente en MB
+
+    En Linux se lee VmHWM, que empieza de cero en cada proceso nuevo;
+    ru_maxrss se hereda del proceso padre a través de fork y exec.
+    """
+    if who == getattr(resource, "RUSAGE_SELF", None):
+        try:
+            with open("/proc/self/status") as f:
+                for line in f:
+                    if line.startswith("VmHWM:"):
+                        return int(line.split()[1]) / 1024
+        except OSError:
+            pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(who).ru_maxrss
+    # Linux lo da en KB y macOS en bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _measure(pdf_path: str, mode: str, repeat: int) -> dict:
+    """Mide un modo de extracción sobre un PDF (se ejecuta en un proceso nuevo)"""
+    cache_dir = tempfile.mkdtemp(prefix="bench_extraction_cache_")
+    if mode == "parallel":
+        extractor = PDFExtractor(parallel=True)
+    elif mode == "cached":
+        extractor = PDFExtractor(cache=PDFTextCache(cache_dir))
+        # Primera pasada para llenar la caché; se mide la lectura
+        extractor.extract_text(pdf_path)
+    else:
+        extractor = PDFExtractor()
+
+    times = []
+    first_page = []
+    chars = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        if mode == "streaming":
+            chars = 0
+            for i, page in enumerate(extractor.iter_pages(pdf_path)):
+                if i == 0:
+                    first_page.append(time.perf_counter() - started)
+                chars += len(page)
+        else:
+            chars = len(extractor.extract_text(pdf_path))
+        times.append(time.perf_counter() - started)
+
+    result = {
+        "seconds": statistics.median(times),
+        "min_seconds": min(times),
+        "chars": chars,
+        "peak_rss_mb": _peak_rss_mb(resource.RUSAGE_SELF) if resource else None,
+    }
+    if first_page:
+        result["first_page_seconds"] = statistics.median(first_page)
+    if mode == "parallel" and resource is not None:
+        result["workers_peak_rss_mb"] = _peak_rss_mb(resource.RUSAGE_CHILDREN)
+    return result
+
+
+def _measure_child(queue, pdf_path, mode, repeat):
+    try:
+        queue.put(_measure(pdf_path, mode, repeat))
+    except Exception as e:
+        queue.put({"error": str(e)})
+
+
+def run(corpus: dict, modes=MODES, repeat: int = 3) -> dict:
+    """Ejecuta todas las combinaciones de PDF y modo, cada una en un proceso limpio"""
+    import PyPDF2
+
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    for name, path in corpus.items():
+        pages = CORPUS[name][0]
+        for mode in modes:
+            queue = context.Queue()
+            process = context.Process(target=_measure_child, args=(queue, path, mode, repeat))
+            process.start()
+            result = queue.get()
+            process.join()
+            if "seconds" in result:
+                result["pages_per_second"] = pages / result["seconds"] if result["seconds"] else None
+            results[f"{name}/{mode}"] = result
+            print(f"   {name + '/' + mode:<20}" + (
+                f"{result['seconds'] * 1000:>10.1f} ms  {result.get('peak_rss_mb') or 0:>8.1f} MB"
+                if "seconds" in result else f"  ⚠️  {result['error']}"
+            ))
+
+    return {
+        "meta": {
+            "corpus_version": CORPUS_VERSION,
+            "repeat": repeat,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "pypdf2": PyPDF2.__version__,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+# Diferencias absolutas por debajo de las cuales no se considera empeoramiento
+# (las mediciones de pocos milisegundos son sobre todo ruido)
+MIN_DELTA = {"min_seconds": 0.005, "peak_rss_mb": 5.0}
+
+
+def compare(current: dict, baseline: dict, threshold: float = 0.20) -> list:
+    """
+    Compara los resultados con la línea base
+
+    Para el tiempo se usa el mínimo de las repeticiones, más estable que la
+    mediana frente a interferencias de otros procesos.
+
+    Returns:
+        Lista de textos, uno por cada tiempo o pico de memoria que empeora
+        más de threshold (fracción) respecto a la línea base
+    """
+    regressions = []
+    for key, result in current["results"].items():
+        base = baseline.get("results", {}).get(key)
+        if not base or "seconds" not in result or "seconds" not in base:
+            continue
+        for metric, min_delta in MIN_DELTA.items():
+            old, new = base.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if change > threshold and new - old > min_delta:
+                regressions.append(f"{key} {metric}: {old:.3f} -> {new:.3f} (+{change:.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Banco de pruebas de la extracción de PDFs")
+    parser.add_argument("--corpus-dir", default=os.path.join(".cache", "bench_corpus"))
+    parser.add_argument("--cases", default=",".join(CORPUS),
+                        help=f"PDFs a medir, separados por comas ({', '.join(CORPUS)})")
+    parser.add_argument("--modes", default=",".join(MODES),
+                        help=f"Modos a medir, separados por comas ({', '.join(MODES)})")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Guardar los resultados en este fichero JSON")
+    parser.add_argument("--baseline", help="Línea base JSON con la que comparar")
+    parser.add_argument("--threshold", type=float, default=0.20,
+                        help="Empeoramiento máximo admitido (0.20 = 20 %%)")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="Sobrescribir la línea base con estos resultados")
+    args = parser.parse_args()
+
+    cases = [c.strip() for c in args.cases.split(",") if c.strip()]
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    unknown = [c for c in cases if c not in CORPUS] + [m for m in modes if m not in MODES]
+    if unknown:
+        parser.error(f"Valores no soportados: {', '.join(unknown)}")
+
+    corpus = ensure_corpus(args.corpus_dir, cases)
+    print(f"\n⏱️  Extracción ({args.repeat} repeticiones, mediana)")
+    current = run(corpus, modes, args.repeat)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2)
+        print(f"\n💾 Resultados guardados en {args.output}")
+
+    if not args.baseline:
+        return 0
+
+    if args.update_baseline or not os.path.exists(args.baseline):
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2)
+        print(f"💾 Línea base guardada en {args.baseline}")
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare(current, baseline, args.threshold)
+    if regressions:
+        print(f"\n❌ Empeoramientos de más del {args.threshold:.0%}:")
+        for line in regressions:
+            print(f"   {line}")
+        return 1
+    print(f"\n✅ Sin empeoramientos de más del {args.threshold:.0%} respecto a {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
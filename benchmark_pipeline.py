@@ -0,0 +1,334 @@
+"""
+Banco de pruebas de extremo a extremo: PDF -> generador -> preguntas
+
+Lanza el servidor simulado de mock_llm_server.py en otro proceso, apunta
+los SDK a él y ejecuta la cadena completa (PDFExtractor, create_generator
+y el análisis de la respuesta) con la concurrencia indicada. Informa del
+rendimiento, de los percentiles de latencia de cada etapa y de la memoria.
+
+Con --async las peticiones se lanzan con generate_questions_async en un
+bucle de eventos, con a lo sumo --concurrency a la vez, en lugar de con
+un hilo por petición.
+
+Con --latency fixed:0 el servidor responde al instante, de modo que lo
+medido es el coste propio de la aplicación. No necesita red.
+
+Uso:
+    python benchmark_pipeline.py --provider openai --requests 200 --concurrency 16
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from mock_llm_server import MockLLMServer, configure_environment
+from pdf_cache import PDFTextCache
+from pdf_extractor import PDFExtractor
+from question_generator import create_generator
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+SAMPLE_PARAGRAPH = (
+    "La célula es la unidad estructural y funcional de los seres vivos. "
+    "La mitocondria es un orgánulo que produce la energía de la célula mediante la respiración celular. "
+    "El ribosoma es una estructura que sintetiza proteínas a partir del ARN mensajero. "
+    "La membrana plasmática regula el paso de sustancias entre la célula y su entorno. "
+    "El núcleo contiene el material genético y controla la actividad celular."
+)
+
+
+def write_sample_pdf(path: str, pages: int = 20, lines_per_page: int = 40):
+    """
+    Escribe un PDF de texto sencillo sin dependencias externas
+
+    Cada página repite SAMPLE_PARAGRAPH en líneas de Helvetica con
+    codificación WinAnsi, suficiente para que PyPDF2 extraiga el texto.
+    """
+    words = SAMPLE_PARAGRAPH.split()
+    lines = []
+    current = ""
+    for word in words:
+        if len(current) + len(word) > 85:
+            lines.append(current)
+            current = ""
+        current = f"{current} {word}".strip()
+    lines.append(current)
+
+    def escape(text):
+        return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # Páginas, se rellena al final
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+    page_ids = []
+    for page in range(pages):
+        body = [f"BT /F1 10 Tf 50 760 Td 14 TL (Página {page + 1}) Tj T*"]
+        for i in range(lines_per_page):
+            body.append(f"({escape(lines[(page + i) % len(lines)])}) Tj T*")
+        body.append("ET")
+        stream = "\n".join(body).encode("cp1252")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(len(objects))
+
+    kids = " ".join(f"{i} 0 R" for i in page_ids).encode("ascii")
+    objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % pages
+
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+        for number, obj in enumerate(objects, start=1):
+            offsets.append(f.tell())
+            f.write(b"%d 0 obj\n" % number + obj + b"\nendobj\n")
+        xref = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        for offset in offsets:
+            f.write(b"%010d 00000 n \n" % offset)
+        f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+
+
+def peak_rss_mb():
+    """Pico de memoria residente del proceso en MB, o None si no se puede medir"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux lo da en KB y macOS en bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def percentiles(values) -> dict:
+    """Media y percentiles 50, 95 y 99 en milisegundos"""
+    if not values:
+        return {}
+    data = np.array(values) * 1000
+    p50, p95, p99 = np.percentile(data, [50, 95, 99])
+    return {"mean": float(data.mean()), "p50": float(p50), "p95": float(p95),
+            "p99": float(p99), "max": float(data.max())}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _run_server(port, options):
+    MockLLMServer(port=port, **options).serve_forever()
+
+
+def _wait_for_port(port, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"El servidor simulado no arrancó en el puerto {port}")
+
+
+def run_benchmark(pdf_path: str, provider: str = "openai", requests: int = 100,
+                  concurrency: int = 8, num_questions: int = 5, stream: bool = False,
+                  max_chars: int = 20000, use_cache: bool = False, use_async: bool = False) -> dict:
+    """
+    Ejecuta la cadena completa requests veces con concurrency hilos
+
+    El generador se crea una sola vez y se comparte, como en la aplicación.
+    Con use_async, las peticiones van por generate_questions_async en un
+    único bucle de eventos y la extracción del PDF, en hilos.
+
+    Returns:
+        Diccionario con rendimiento, latencias por etapa, errores y memoria
+    """
+    cache = PDFTextCache(tempfile.mkdtemp(prefix="bench_cache_")) if use_cache else None
+    extractor = PDFExtractor(cache=cache)
+    generator = create_generator(provider)
+    generator.warm_up()
+
+    timings = {"extract": [], "generate": [], "first_question": [], "total": []}
+    errors = []
+    questions = 0
+    lock = threading.Lock()
+
+    def record(started, extracted, finished, first, result):
+        nonlocal questions
+        with lock:
+            questions += len(result)
+            timings["extract"].append(extracted - started)
+            timings["generate"].append(finished - extracted)
+            timings["total"].append(finished - started)
+            if first is not None:
+                timings["first_question"].append(first)
+
+    def one_request(_):
+        started = time.perf_counter()
+        try:
+            text = extractor.extract_text(pdf_path, max_chars=max_chars)
+            extracted = time.perf_counter()
+            first = None
+            if stream:
+                result = []
+                for question in generator.generate_questions_stream(text, num_questions):
+                    if first is None:
+                        first = time.perf_counter() - extracted
+                    result.append(question)
+            else:
+                result = generator.generate_questions(text, num_questions)
+            finished = time.perf_counter()
+        except Exception as e:
+            with lock:
+                errors.append(str(e))
+            return
+        record(started, extracted, finished, first, result)
+
+    async def one_request_async(semaphore):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                text = await asyncio.to_thread(extractor.extract_text, pdf_path, max_chars=max_chars)
+                extracted = time.perf_counter()
+                result = await generator.generate_questions_async(text, num_questions)
+                finished = time.perf_counter()
+            except Exception as e:
+                errors.append(str(e))
+                return
+        record(started, extracted, finished, None, result)
+
+    async def all_requests_async():
+        semaphore = asyncio.Semaphore(concurrency)
+        await asyncio.gather(*(one_request_async(semaphore) for _ in range(requests)))
+
+    rss_before = peak_rss_mb()
+    started = time.perf_counter()
+    if use_async:
+        asyncio.run(all_requests_async())
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(one_request, range(requests)))
+    elapsed = time.perf_counter() - started
+
+    completed = len(timings["total"])
+    return {
+        "provider": provider,
+        "requests": requests,
+        "concurrency": concurrency,
+        "stream": stream,
+        "async": use_async,
+        "completed": completed,
+        "errors": len(errors),
+        "error_samples": sorted(set(errors))[:3],
+        "elapsed_s": elapsed,
+        "throughput_rps": completed / elapsed if elapsed else 0.0,
+        "questions_per_s": questions / elapsed if elapsed else 0.0,
+        "latency_ms": {stage: percentiles(values) for stage, values in timings.items() if values},
+        "peak_rss_mb": peak_rss_mb(),
+        "rss_growth_mb": (peak_rss_mb() - rss_before) if rss_before is not None else None,
+    }
+
+
+def print_report(report: dict):
+    print(f"\n📊 {report['provider']} · {report['requests']} peticiones · "
+          f"concurrencia {report['concurrency']}{' · streaming' if report['stream'] else ''}"
+          f"{' · asíncrono' if report['async'] else ''}")
+    print(f"   Completadas: {report['completed']}  Errores: {report['errors']}  "
+          f"Tiempo: {report['elapsed_s']:.2f} s")
+    print(f"   Rendimiento: {report['throughput_rps']:.1f} pet/s  "
+          f"{report['questions_per_s']:.1f} preguntas/s")
+    print(f"   {'Etapa':<16}{'media':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'máx':>10}  (ms)")
+    for stage, stats in report["latency_ms"].items():
+        print(f"   {stage:<16}" + "".join(
+            f"{stats[k]:>10.1f}" for k in ("mean", "p50", "p95", "p99", "max")))
+    if report["peak_rss_mb"] is not None:
+        print(f"   Memoria: pico {report['peak_rss_mb']:.1f} MB "
+              f"(+{report['rss_growth_mb']:.1f} MB durante la prueba)")
+    for sample in report["error_samples"]:
+        print(f"   ⚠️  {sample}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Banco de pruebas de la cadena PDF -> preguntas")
+    parser.add_argument("--provider", default="openai",
+                        help="google, openai, anthropic, local, hedged o failover")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--questions", type=int, default=5)
+    parser.add_argument("--stream", action="store_true", help="Usar generate_questions_stream")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="Usar generate_questions_async en un bucle de eventos")
+    parser.add_argument("--pdf", help="PDF a usar (por defecto, uno sintético)")
+    parser.add_argument("--pages", type=int, default=20, help="Páginas del PDF sintético")
+    parser.add_argument("--max-chars", type=int, default=20000)
+    parser.add_argument("--cache", action="store_true", help="Usar la caché de texto de PDFs")
+    parser.add_argument("--latency", default="fixed:0", help="Latencia del servidor simulado")
+    parser.add_argument("--chunk-delay", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=429)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Guardar el informe en este fichero JSON")
+    args = parser.parse_args()
+    if args.stream and args.use_async:
+        parser.error("--stream y --async no se pueden combinar")
+
+    warnings.filterwarnings("ignore", category=FutureWarning)
+
+    port = _free_port()
+    server = multiprocessing.Process(target=_run_server, daemon=True, args=(port, {
+        "latency": args.latency,
+        "chunk_delay": args.chunk_delay,
+        "error_rate": args.error_rate,
+        "error_status": args.error_status,
+        "retry_after": 0.1,
+        "seed": args.seed,
+    }))
+    server.start()
+
+    workdir = tempfile.mkdtemp(prefix="bench_pipeline_")
+    try:
+        _wait_for_port(port)
+        configure_environment(f"http://127.0.0.1:{port}")
+
+        pdf_path = args.pdf
+        if pdf_path is None:
+            pdf_path = os.path.join(workdir, "muestra.pdf")
+            write_sample_pdf(pdf_path, args.pages)
+
+        report = run_benchmark(
+            pdf_path, args.provider, args.requests, args.concurrency,
+            args.questions, args.stream, args.max_chars, args.cache, args.use_async
+        )
+        report["server"] = {"latency": args.latency, "chunk_delay": args.chunk_delay,
+                            "error_rate": args.error_rate}
+        print_report(report)
+
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            print(f"\n💾 Informe guardado en {args.json}")
+    finally:
+        server.terminate()
+        server.join()
+
+
+if __name__ == "__main__":
+    main()
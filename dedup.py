@@ -0,0 +1,439 @@
+"""
+Módulo de detección de preguntas casi duplicadas
+
+Cada pregunta (enunciado más respuesta correcta) se reduce a sus palabras
+normalizadas con retrieval.tokenize y se resume en una firma MinHash: la
+fracción de posiciones en que coinciden dos firmas estima la similitud de
+Jaccard entre sus conjuntos de palabras. Las firmas se indexan con LSH
+(bandas de la firma en arrays ordenados), así que una consulta solo compara
+con los pocos candidatos que comparten alguna banda y tarda lo mismo con
+cien preguntas guardadas que con cien mil.
+
+DeduplicatingGenerator envuelve cualquier QuestionGenerator y descarta las
+preguntas demasiado parecidas a otras del banco o de la misma tanda, y
+remove_near_duplicates hace lo mismo dentro de una lista.
+
+Uso:
+    python dedup.py sync                     Actualiza las firmas del banco
+    python dedup.py scan --threshold 0.7     Lista los grupos de duplicados del banco
+"""
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Iterator, List
+
+import numpy as np
+
+from question_generator import QuestionGenerator
+from question_model import Question
+from retrieval import tokenize
+
+
+DEFAULT_THRESHOLD = 0.5
+
+# Primo de Mersenne 2^31 - 1: (a * x + b) cabe en uint64 para x < 2^32
+_PRIME = np.uint64((1 << 31) - 1)
+_EMPTY = np.uint32(0xFFFFFFFF)
+
+
+def question_text(question) -> str:
+    """
+    Texto que identifica una pregunta: enunciado y respuesta correcta
+
+    Acepta una Question o el diccionario de los generadores y del banco;
+    este no se valida, para no rechazar preguntas antiguas incompletas.
+    """
+    if isinstance(question, Question):
+        return f"{question.pregunta} {question.respuesta}"
+    options = question.get("opciones") or []
+    answer = question.get("respuesta_correcta", 0)
+    correct = options[answer] if isinstance(answer, int) and 0 <= answer < len(options) else ""
+    return f"{question.get('pregunta', '')} {correct}"
+
+
+class MinHasher:
+    """Calcula firmas MinHash de textos, estables entre procesos y ejecuciones"""
+
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        """
+        Args:
+            num_perm: Número de funciones hash (longitud de la firma)
+            seed: Semilla de los coeficientes; las firmas solo son
+                comparables si se calcularon con los mismos parámetros
+        """
+        self.num_perm = num_perm
+        self.seed = seed
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, int(_PRIME), size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, int(_PRIME), size=num_perm, dtype=np.uint64)
+
+    @staticmethod
+    def _token_hashes(text: str) -> np.ndarray:
+        # crc32 y no hash(): este varía entre procesos y las firmas se guardan en disco
+        tokens = set(tokenize(text))
+        return np.fromiter((zlib.crc32(t.encode("utf-8")) for t in tokens),
+                           dtype=np.uint64, count=len(tokens))
+
+    def signature(self, text: str) -> np.ndarray:
+        """Firma de un texto; un texto sin palabras da una firma que no coincide con nada"""
+        hashes = self._token_hashes(text)
+        if hashes.size == 0:
+            return np.full(self.num_perm, _EMPTY, dtype=np.uint32)
+        values = (self._a[:, None] * hashes[None, :] + self._b[:, None]) % _PRIME
+        return values.min(axis=1).astype(np.uint32)
+
+    def signatures(self, texts: List[str], chunk: int = 2048) -> np.ndarray:
+        """Firmas de muchos textos, calculadas por bloques con una sola operación por bloque"""
+        result = np.full((len(texts), self.num_perm), _EMPTY, dtype=np.uint32)
+        for start in range(0, len(texts), chunk):
+            groups = [self._token_hashes(t) for t in texts[start:start + chunk]]
+            sizes = np.array([g.size for g in groups])
+            rows = np.flatnonzero(sizes)
+            if rows.size == 0:
+                continue
+            hashes = np.concatenate([groups[i] for i in rows])
+            values = (self._a[:, None] * hashes[None, :] + self._b[:, None]) % _PRIME
+            offsets = np.concatenate(([0], np.cumsum(sizes[rows])[:-1]))
+            result[start + rows] = np.minimum.reduceat(values, offsets, axis=1).T.astype(np.uint32)
+        return result
+
+
+class NearDuplicateIndex:
+    """
+    Índice LSH de firmas MinHash, seguro entre hilos
+
+    Las firmas se dividen en bandas; dos preguntas son candidatas si
+    coinciden en todas las filas de alguna banda, y se confirma el
+    duplicado comparando la firma completa. Las altas recientes se guardan
+    aparte y se comparan por fuerza bruta hasta que se fusionan.
+    """
+
+    MERGE_EVERY = 1024
+
+    def __init__(self, hasher: MinHasher = None, bands: int = 32, threshold: float = DEFAULT_THRESHOLD):
+        """
+        Args:
+            hasher: MinHasher de las firmas (por defecto, 128 funciones)
+            bands: Bandas en que se divide la firma; con 32 bandas de 4 filas
+                se detectan casi todos los pares con similitud superior a 0.5
+            threshold: Similitud de Jaccard estimada a partir de la cual dos
+                preguntas se consideran duplicadas
+        """
+        self.hasher = hasher or MinHasher()
+        if self.hasher.num_perm % bands:
+            raise ValueError("El número de funciones hash debe ser múltiplo del de bandas")
+        self.bands = bands
+        self.rows = self.hasher.num_perm // bands
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        rng = np.random.default_rng(self.hasher.seed + 1)
+        self._mix = rng.integers(1, 1 << 62, size=self.rows, dtype=np.uint64) | np.uint64(1)
+
+        self._clear()
+
+    def __len__(self):
+        return len(self.keys) + self._pending_count
+
+    def _clear(self):
+        self.keys = np.empty(0, dtype=np.int64)
+        self.signatures = np.empty((0, self.hasher.num_perm), dtype=np.uint32)
+        self._band_hashes = np.empty((self.bands, 0), dtype=np.uint64)
+        self._band_rows = np.empty((self.bands, 0), dtype=np.int64)
+        self._pending_keys = np.empty(self.MERGE_EVERY, dtype=np.int64)
+        self._pending_signatures = np.empty((self.MERGE_EVERY, self.hasher.num_perm), dtype=np.uint32)
+        self._pending_count = 0
+
+    def _band_keys(self, signatures: np.ndarray) -> np.ndarray:
+        """Hash de cada banda: matriz (bandas, firmas)"""
+        bands = signatures.reshape(len(signatures), self.bands, self.rows).astype(np.uint64)
+        # Los desbordamientos de uint64 dan la vuelta, que es lo que se busca
+        return (bands * self._mix).sum(axis=2).T
+
+    def add(self, key: int, signature: np.ndarray):
+        """Añade una firma; key identifica la pregunta (id del banco, o -1 si aún no está)"""
+        with self._lock:
+            self._add(key, signature)
+
+    def add_many(self, keys, signatures: np.ndarray):
+        with self._lock:
+            self._merge(np.asarray(keys, dtype=np.int64), signatures)
+
+    def query(self, signature: np.ndarray):
+        """
+        Busca la firma guardada más parecida por encima del umbral
+
+        Returns:
+            (key, similitud) o None si no hay ningún duplicado
+        """
+        with self._lock:
+            return self._query(signature)
+
+    def check_and_add(self, signature: np.ndarray, key: int = -1):
+        """
+        Consulta y, si no es un duplicado, añade la firma en la misma operación
+
+        Returns:
+            (key, similitud) del duplicado encontrado, o None si se añadió
+        """
+        with self._lock:
+            match = self._query(signature)
+            if match is None:
+                self._add(key, signature)
+            return match
+
+    def retain(self, mask: np.ndarray):
+        """Conserva solo las firmas fusionadas marcadas en mask (descarta las pendientes)"""
+        with self._lock:
+            keys, signatures = self.keys[mask], self.signatures[mask]
+            self._clear()
+            self._merge(keys, signatures)
+
+    def _add(self, key, signature):
+        self._pending_keys[self._pending_count] = key
+        self._pending_signatures[self._pending_count] = signature
+        self._pending_count += 1
+        if self._pending_count == self.MERGE_EVERY:
+            self._merge(np.empty(0, dtype=np.int64), np.empty((0, self.hasher.num_perm), dtype=np.uint32))
+
+    def _merge(self, keys, signatures):
+        """Fusiona las firmas indicadas y las pendientes en las bandas ordenadas"""
+        if self._pending_count:
+            keys = np.concatenate((keys, self._pending_keys[:self._pending_count]))
+            signatures = np.vstack((signatures, self._pending_signatures[:self._pending_count]))
+            self._pending_count = 0
+        if len(keys) == 0:
+            return
+
+        first_row = len(self.keys)
+        self.keys = np.concatenate((self.keys, keys))
+        self.signatures = np.vstack((self.signatures, signatures.astype(np.uint32)))
+
+        # Se ordenan solo las bandas nuevas y se intercalan en las ya ordenadas
+        band_keys = self._band_keys(signatures)
+        order = np.argsort(band_keys, axis=1)
+        new_hashes = np.take_along_axis(band_keys, order, axis=1)
+        new_rows = order + first_row
+        hashes = np.empty((self.bands, len(self.keys)), dtype=np.uint64)
+        rows = np.empty((self.bands, len(self.keys)), dtype=np.int64)
+        for band in range(self.bands):
+            positions = np.searchsorted(self._band_hashes[band], new_hashes[band])
+            hashes[band] = np.insert(self._band_hashes[band], positions, new_hashes[band])
+            rows[band] = np.insert(self._band_rows[band], positions, new_rows[band])
+        self._band_hashes, self._band_rows = hashes, rows
+
+    def _query(self, signature):
+        if signature[0] == _EMPTY and (signature == _EMPTY).all():
+            return None
+
+        best = None
+        if len(self.keys):
+            band_keys = self._band_keys(signature[None, :])[:, 0]
+            candidates = []
+            for band in range(self.bands):
+                hashes = self._band_hashes[band]
+                lo = np.searchsorted(hashes, band_keys[band], "left")
+                hi = np.searchsorted(hashes, band_keys[band], "right")
+                if hi > lo:
+                    candidates.append(self._band_rows[band, lo:hi])
+            if candidates:
+                rows = np.unique(np.concatenate(candidates))
+                similarity = (self.signatures[rows] == signature).mean(axis=1)
+                i = int(similarity.argmax())
+                if similarity[i] >= self.threshold:
+                    best = (int(self.keys[rows[i]]), float(similarity[i]))
+
+        if self._pending_count:
+            similarity = (self._pending_signatures[:self._pending_count] == signature).mean(axis=1)
+            i = int(similarity.argmax())
+            if similarity[i] >= self.threshold and (best is None or similarity[i] > best[1]):
+                best = (int(self._pending_keys[i]), float(similarity[i]))
+
+        return best
+
+    # --- Persistencia ---
+
+    def save(self, path):
+        """Guarda las firmas en un .npz de forma atómica"""
+        with self._lock:
+            self._merge(np.empty(0, dtype=np.int64), np.empty((0, self.hasher.num_perm), dtype=np.uint32))
+            keys, signatures = self.keys, self.signatures
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".npz")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, keys=keys, signatures=signatures,
+                         params=np.array([self.hasher.num_perm, self.hasher.seed]))
+            os.replace(tmp, path)
+        except BaseException:
+            os.remove(tmp)
+            raise
+
+    def load(self, path) -> bool:
+        """
+        Carga las firmas guardadas con save()
+
+        Returns:
+            False si el fichero no existe o se calculó con otros parámetros
+        """
+        try:
+            with np.load(path) as data:
+                params = data["params"].tolist()
+                keys, signatures = data["keys"], data["signatures"]
+        except (OSError, KeyError, ValueError):
+            return False
+        if params != [self.hasher.num_perm, self.hasher.seed]:
+            return False
+        with self._lock:
+            self._clear()
+            self._merge(keys, signatures)
+        return True
+
+    def sync(self, bank, cache_path=".cache/firmas_minhash.npz"):
+        """
+        Pone el índice al día con el banco de preguntas
+
+        Carga las firmas guardadas en cache_path, olvida las de preguntas
+        borradas, calcula solo las de preguntas nuevas y guarda el resultado.
+        """
+        loaded = self.load(cache_path) if cache_path else False
+        changed = not loaded
+
+        if len(self.keys):
+            present = np.isin(self.keys, np.array(bank.question_ids(), dtype=np.int64))
+            if not present.all():
+                self.retain(present)
+                changed = True
+
+        last_id = int(self.keys.max()) if len(self.keys) else 0
+        new = bank.questions_after(last_id)
+        if new:
+            keys = [key for key, _ in new]
+            self.add_many(keys, self.hasher.signatures([question_text(q) for _, q in new]))
+            changed = True
+
+        if changed and cache_path:
+            self.save(cache_path)
+        return self
+
+
+def remove_near_duplicates(questions: List, threshold: float = DEFAULT_THRESHOLD,
+                           index: NearDuplicateIndex = None) -> List[dict]:
+    """
+    Elimina las preguntas casi iguales a otra anterior de la lista
+
+    Args:
+        questions: Preguntas (Question o diccionarios) en orden de preferencia
+        threshold: Similitud de Jaccard estimada a partir de la cual dos
+            preguntas se consideran duplicadas (si no se pasa index)
+        index: Índice con preguntas ya aceptadas, para comparar también con
+            ellas; las que se conservan se añaden a él
+
+    Returns:
+        Las preguntas que no repiten ninguna anterior, en el mismo orden
+    """
+    if not questions:
+        return []
+    if index is None:
+        index = NearDuplicateIndex(threshold=threshold)
+    signatures = index.hasher.signatures([question_text(q) for q in questions])
+    return [q for q, signature in zip(questions, signatures) if index.check_and_add(signature) is None]
+
+
+class DeduplicatingGenerator(QuestionGenerator):
+    """Envuelve cualquier QuestionGenerator y descarta las preguntas casi duplicadas"""
+
+    def __init__(self, generator: QuestionGenerator, index: NearDuplicateIndex, record: bool = True):
+        """
+        Inicializa el generador
+
+        Args:
+            generator: Generador que realiza las llamadas reales
+            index: Índice con las preguntas ya existentes (ver NearDuplicateIndex.sync)
+            record: Si es True, las preguntas aceptadas se añaden al índice; si
+                es False solo se consulta, y record_question() las añade después
+                (para resultados que quizá se descarten)
+        """
+        self.generator = generator
+        self.index = index
+        self.record = record
+        self.provider = generator.provider
+        self.model_name = generator.model_name
+        self.rejected = 0
+
+    def build_prompt(self, text: str, num_questions: int = 5, avoid: List[str] = None) -> str:
+        return self.generator.build_prompt(text, num_questions, avoid)
+
+    def accept(self, question) -> bool:
+        """True si la pregunta es nueva; en ese caso queda registrada en el índice"""
+        signature = self.index.hasher.signature(question_text(question))
+        if self.record:
+            match = self.index.check_and_add(signature)
+        else:
+            match = self.index.query(signature)
+        if match is None:
+            return True
+        self.rejected += 1
+        return False
+
+    def record_question(self, question):
+        """Añade al índice una pregunta aceptada sin registrar (ver record)"""
+        self.index.add(-1, self.index.hasher.signature(question_text(question)))
+
+    def generate_questions(self, text: str, num_questions: int = 5) -> List[dict]:
+        return [q for q in self.generator.generate_questions(text, num_questions) if self.accept(q)]
+
+    def generate_questions_stream(self, text: str, num_questions: int = 5) -> Iterator[dict]:
+        for question in self.generator.generate_questions_stream(text, num_questions):
+            if self.accept(question):
+                yield question
+
+    async def generate_questions_async(self, text: str, num_questions: int = 5) -> List[dict]:
+        questions = await self.generator.generate_questions_async(text, num_questions)
+        return [q for q in questions if self.accept(q)]
+
+    def warm_up(self):
+        self.generator.warm_up()
+
+
+def main():
+    from question_bank import QuestionBank
+
+    parser = argparse.ArgumentParser(description="Detección de preguntas casi duplicadas")
+    parser.add_argument("--db", default=".cache/preguntas.sqlite3", help="Base de datos del banco")
+    parser.add_argument("--signatures", default=".cache/firmas_minhash.npz")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("sync", help="Calcular las firmas de las preguntas nuevas del banco")
+    scan = commands.add_parser("scan", help="Listar los grupos de duplicados del banco")
+    scan.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    bank = QuestionBank(args.db)
+    index = NearDuplicateIndex(threshold=args.threshold)
+    started = time.perf_counter()
+    index.sync(bank, args.signatures)
+    print(f"✅ {len(index)} firmas al día en {time.perf_counter() - started:.2f} s")
+
+    if args.command == "scan":
+        texts = {key: question_text(q) for key, q in bank.questions_after(0)}
+        scanned = NearDuplicateIndex(index.hasher, index.bands, args.threshold)
+        groups = {}
+        for key, signature in zip(index.keys.tolist(), index.signatures):
+            match = scanned.check_and_add(signature, key)
+            if match is not None:
+                groups.setdefault(match[0], []).append((key, match[1]))
+        for original, duplicates in list(groups.items())[:args.limit]:
+            print(f"\n❓ {texts.get(original, original)}")
+            for key, similarity in duplicates:
+                print(f"   ≈ {similarity:.2f}  {texts.get(key, key)}")
+        print(f"\n🔎 {sum(len(d) for d in groups.values())} duplicados en {len(groups)} grupos")
+
+
+if __name__ == "__main__":
+    main()
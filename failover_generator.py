@@ -0,0 +1,233 @@
+"""
+Generador de preguntas con cortacircuitos y conmutación entre proveedores
+
+Cada proveedor tiene un cortacircuitos que registra errores y latencias.
+Tras varios fallos seguidos (o una tasa de error alta) el circuito se abre
+y el tráfico pasa al siguiente proveedor sano. Pasado un tiempo, la
+siguiente petición real hace de prueba (semiabierto): si sale bien el
+circuito se cierra y si falla vuelve a abrirse. No se sondea con
+warm_up(), que en el generador local y en los envoltorios no hace nada.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import List
+
+import telemetry
+from question_generator import QuestionGenerator
+
+
+CLOSED = "cerrado"
+OPEN = "abierto"
+HALF_OPEN = "semiabierto"
+
+
+class CircuitBreaker:
+    """Cortacircuitos con ventana de llamadas recientes"""
+
+    def __init__(self, failure_threshold: int = 3, error_rate_threshold: float = 0.5,
+                 window: int = 20, reset_timeout: float = 30.0,
+                 slow_call_threshold: float = None):
+        """
+        Inicializa el cortacircuitos
+
+        Args:
+            failure_threshold: Fallos consecutivos que abren el circuito
+            error_rate_threshold: Tasa de error en la ventana que abre el circuito
+            window: Número de llamadas recientes que se consideran
+            reset_timeout: Segundos abierto antes de sondear el proveedor
+            slow_call_threshold: Segundos a partir de los cuales una llamada
+                correcta cuenta como fallo (None para desactivarlo)
+        """
+        self.failure_threshold = failure_threshold
+        self.error_rate_threshold = error_rate_threshold
+        self.reset_timeout = reset_timeout
+        self.slow_call_threshold = slow_call_threshold
+
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.reason = None
+        self.last_error = None
+        self._calls = deque(maxlen=window)
+        self._opened_monotonic = None
+        self._trial_started = None
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        """
+        Indica si se puede enviar tráfico real al proveedor
+
+        Con el circuito abierto, pasados reset_timeout segundos se deja pasar
+        una única petición de prueba; mientras está en curso las demás siguen
+        desviadas. Si la prueba no informa de su resultado en reset_timeout
+        (p. ej. se canceló), se permite otra.
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            now = time.monotonic()
+            if self.state == OPEN and now - self._opened_monotonic < self.reset_timeout:
+                return False
+            if self.state == HALF_OPEN and now - self._trial_started < self.reset_timeout:
+                return False
+            self.state = HALF_OPEN
+            self._trial_started = now
+            return True
+
+    def record_success(self, latency: float):
+        """Registra una llamada correcta; si era la de prueba, cierra el circuito"""
+        if self.slow_call_threshold is not None and latency > self.slow_call_threshold:
+            self.record_failure(f"llamada lenta ({latency:.1f} s)", latency)
+            return
+
+        with self._lock:
+            if self.state != CLOSED:
+                self._close()
+            self._calls.append((True, latency))
+            self.consecutive_failures = 0
+
+    def record_failure(self, error, latency: float):
+        """Registra una llamada fallida y abre el circuito si se superan los umbrales"""
+        with self._lock:
+            self._calls.append((False, latency))
+            self.consecutive_failures += 1
+            self.last_error = str(error)
+
+            if self.state == HALF_OPEN:
+                self._open("la petición de prueba falló")
+            elif self.state == OPEN:
+                # Resultado tardío de una llamada anterior a la apertura
+                return
+            elif self.consecutive_failures >= self.failure_threshold:
+                self._open(f"{self.consecutive_failures} fallos consecutivos")
+            elif len(self._calls) == self._calls.maxlen and self._error_rate() >= self.error_rate_threshold:
+                self._open(f"tasa de error del {self._error_rate():.0%}")
+
+    def snapshot(self) -> dict:
+        """Estado actual, para que los operadores vean por qué se movió el tráfico"""
+        with self._lock:
+            latencies = sorted(latency for ok, latency in self._calls if ok)
+            return {
+                "estado": self.state,
+                "motivo": self.reason,
+                "abierto_desde": self.opened_at,
+                "fallos_consecutivos": self.consecutive_failures,
+                "tasa_error": self._error_rate(),
+                "latencia_p50": latencies[len(latencies) // 2] if latencies else None,
+                "ultimo_error": self.last_error,
+            }
+
+    def _error_rate(self):
+        if not self._calls:
+            return 0.0
+        return sum(1 for ok, _ in self._calls if not ok) / len(self._calls)
+
+    def _open(self, reason):
+        self.state = OPEN
+        self.opened_at = time.time()
+        self._opened_monotonic = time.monotonic()
+        self._trial_started = None
+        self.reason = reason
+
+    def _close(self):
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._opened_monotonic = None
+        self._trial_started = None
+        self.reason = None
+        self._calls.clear()
+
+
+# Valor de la métrica de estado de cada circuito
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class FailoverQuestionGenerator(QuestionGenerator):
+    """Encadena proveedores y desvía el tráfico de los que tienen el circuito abierto"""
+
+    provider = "failover"
+
+    def __init__(self, generators: List[QuestionGenerator], **breaker_options):
+        """
+        Inicializa el generador
+
+        Args:
+            generators: Proveedores en orden de preferencia
+            **breaker_options: Parámetros de CircuitBreaker para cada proveedor
+        """
+        if not generators:
+            raise ValueError("Se necesita al menos un generador")
+
+        self.generators = generators
+        self.breakers = [CircuitBreaker(**breaker_options) for _ in generators]
+        self.model_name = "+".join(str(g.model_name) for g in generators)
+        telemetry.register_gauge(
+            "circuit_state",
+            "Estado del cortacircuitos de cada proveedor (0 cerrado, 1 semiabierto, 2 abierto)",
+            self._state_gauge
+        )
+
+    def build_prompt(self, text: str, num_questions: int = 5, avoid: List[str] = None) -> str:
+        return self.generators[0].build_prompt(text, num_questions, avoid)
+
+    def health(self) -> dict:
+        """Estado del circuito de cada proveedor de la cadena"""
+        return {
+            f"{i}:{generator.provider}": breaker.snapshot()
+            for i, (generator, breaker) in enumerate(zip(self.generators, self.breakers))
+        }
+
+    def _state_gauge(self):
+        return [
+            ({"provider": generator.provider, "position": i}, _STATE_VALUES[breaker.snapshot()["estado"]])
+            for i, (generator, breaker) in enumerate(zip(self.generators, self.breakers))
+        ]
+
+    def generate_questions(self, text: str, num_questions: int = 5) -> List[dict]:
+        """Genera preguntas con el primer proveedor sano de la cadena"""
+        last_error = None
+        for i, generator in self._available():
+            started = time.monotonic()
+            try:
+                questions = generator.generate_questions(text, num_questions)
+            except Exception as e:
+                self._failed(i, e, time.monotonic() - started)
+                last_error = e
+                continue
+            self.breakers[i].record_success(time.monotonic() - started)
+            return questions
+
+        raise self._unavailable(last_error)
+
+    async def generate_questions_async(self, text: str, num_questions: int = 5) -> List[dict]:
+        """Versión asíncrona de generate_questions"""
+        last_error = None
+        for i, generator in self._available():
+            started = time.monotonic()
+            try:
+                questions = await generator.generate_questions_async(text, num_questions)
+            except Exception as e:
+                self._failed(i, e, time.monotonic() - started)
+                last_error = e
+                continue
+            self.breakers[i].record_success(time.monotonic() - started)
+            return questions
+
+        raise self._unavailable(last_error)
+
+    def _available(self):
+        """Proveedores que admiten tráfico (cerrados o en prueba), en orden de preferencia"""
+        for i, generator in enumerate(self.generators):
+            if self.breakers[i].allow_request():
+                yield i, generator
+
+    def _failed(self, i, error, latency):
+        self.breakers[i].record_failure(error, latency)
+
+    def _unavailable(self, last_error):
+        if last_error is None:
+            return Exception("Error al generar preguntas: todos los proveedores tienen el circuito abierto")
+        return Exception(f"Error al generar preguntas con todos los proveedores: {last_error}")
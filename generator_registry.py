@@ -0,0 +1,68 @@
+"""
+Registro de generadores de preguntas compartidos por todo el proceso
+
+Cada combinación de proveedor, clave de API y modelo se configura una sola
+vez; las siguientes peticiones reutilizan el mismo cliente y, con él, sus
+conexiones HTTP abiertas.
+"""
+
+import threading
+from typing import Iterable
+
+from question_generator import QuestionGenerator, create_generator
+
+
+_generators = {}
+_lock = threading.Lock()
+
+
+def get_generator(provider: str = "google", api_key: str = None, model: str = None) -> QuestionGenerator:
+    """
+    Devuelve el generador configurado para (provider, api_key, model)
+
+    La primera llamada lo crea con create_generator; las siguientes
+    devuelven la misma instancia. Es seguro llamarla desde varios hilos.
+    """
+    key = (provider.lower(), api_key, model)
+
+    with _lock:
+        generator = _generators.get(key)
+        if generator is None:
+            generator = create_generator(provider, api_key, model)
+            _generators[key] = generator
+        return generator
+
+
+def warm_up(providers: Iterable[str] = ("google",), api_key: str = None,
+            background: bool = True):
+    """
+    Crea los generadores y abre sus conexiones antes de la primera petición
+
+    Args:
+        providers: Proveedores a preparar
+        api_key: Clave de API (opcional, se lee del entorno si no se proporciona)
+        background: Si es True, se hace en un hilo en segundo plano
+
+    Returns:
+        El hilo lanzado, o None si se ejecutó en primer plano
+    """
+    def run():
+        for provider in providers:
+            try:
+                get_generator(provider, api_key).warm_up()
+            except Exception as e:
+                print(f"⚠️  No se pudo precalentar {provider}: {e}")
+
+    if not background:
+        run()
+        return None
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+def clear():
+    """Olvida todos los generadores registrados"""
+    with _lock:
+        _generators.clear()
@@ -0,0 +1,122 @@
+"""
+Generador de preguntas con peticiones cubiertas entre varios proveedores
+
+Si el proveedor principal tarda más que su percentil de latencia habitual,
+se lanza la misma petición al siguiente proveedor y se usa la primera
+respuesta válida; las demás se cancelan.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import List
+
+from question_generator import QuestionGenerator, run_sync
+
+
+class HedgedQuestionGenerator(QuestionGenerator):
+    """Compite varias peticiones entre proveedores para recortar la latencia de cola"""
+
+    provider = "hedged"
+
+    def __init__(self, generators: List[QuestionGenerator], percentile: float = 95,
+                 default_delay: float = 8.0, min_samples: int = 10, window: int = 200):
+        """
+        Inicializa el generador
+
+        Args:
+            generators: Proveedores en orden de preferencia
+            percentile: Percentil de latencia del principal tras el que se
+                lanza la petición al siguiente proveedor
+            default_delay: Espera en segundos mientras no hay suficientes
+                muestras para calcular el percentil
+            min_samples: Muestras necesarias para usar el percentil
+            window: Número de latencias recientes que se conservan
+        """
+        if not generators:
+            raise ValueError("Se necesita al menos un generador")
+
+        self.generators = generators
+        self.percentile = percentile
+        self.default_delay = default_delay
+        self.min_samples = min_samples
+        self.model_name = "+".join(str(g.model_name) for g in generators)
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def build_prompt(self, text: str, num_questions: int = 5, avoid: List[str] = None) -> str:
+        return self.generators[0].build_prompt(text, num_questions, avoid)
+
+    def hedge_delay(self) -> float:
+        """Segundos que se espera al proveedor principal antes de cubrir la petición"""
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < self.min_samples:
+            return self.default_delay
+        index = min(len(samples) - 1, int(len(samples) * self.percentile / 100))
+        return samples[index]
+
+    def generate_questions(self, text: str, num_questions: int = 5) -> List[dict]:
+        """Genera preguntas con cobertura entre proveedores (no usar desde un bucle de eventos)"""
+        return run_sync(self.generate_questions_async, text, num_questions)
+
+    async def generate_questions_async(self, text: str, num_questions: int = 5) -> List[dict]:
+        """
+        Lanza la petición al principal y, si no responde a tiempo o falla,
+        al siguiente proveedor; devuelve la primera respuesta válida
+        """
+        delay = self.hedge_delay()
+        pending = {}
+        errors = []
+        next_index = 0
+
+        def launch():
+            nonlocal next_index
+            generator = self.generators[next_index]
+            task = asyncio.ensure_future(generator.generate_questions_async(text, num_questions))
+            pending[task] = (next_index, time.monotonic())
+            next_index += 1
+
+        launch()
+        try:
+            while pending:
+                timeout = delay if next_index < len(self.generators) else None
+                done, _ = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+
+                if not done:
+                    # El principal va lento: cubrir con el siguiente proveedor
+                    launch()
+                    continue
+
+                for task in done:
+                    index, started = pending.pop(task)
+                    try:
+                        questions = task.result()
+                    except Exception as e:
+                        errors.append(e)
+                        continue
+
+                    if not questions:
+                        errors.append(Exception(f"{self.generators[index].provider} no devolvió preguntas"))
+                        continue
+
+                    if index == 0:
+                        with self._lock:
+                            self._latencies.append(time.monotonic() - started)
+                    return questions
+
+                # Todas las terminadas fallaron: probar ya el siguiente
+                if not pending and next_index < len(self.generators):
+                    launch()
+        finally:
+            for task, (index, started) in pending.items():
+                task.cancel()
+                if index == 0:
+                    # Su latencia real es al menos la transcurrida hasta ahora
+                    with self._lock:
+                        self._latencies.append(time.monotonic() - started)
+
+        raise Exception(f"Error al generar preguntas con todos los proveedores: {errors[-1]}") from errors[-1]
@@ -0,0 +1,429 @@
+"""
+Servicio HTTP sin interfaz gráfica para generar preguntas desde PDFs
+
+Expone la misma cadena que app_tkinter.py (PDFExtractor, selección por
+tema y create_generator a través del registro de generadores) para que
+muchos usuarios la usen a la vez desde un único servidor:
+
+    GET  /health              Estado y ocupación del servicio
+    GET  /metrics             Métricas en formato Prometheus (ver telemetry.py)
+    POST /extract             PDF en el cuerpo -> texto extraído
+    POST /questions           PDF (o JSON {"text": ...}) -> preguntas
+    POST /questions/stream    Igual, pero devuelve una pregunta por línea (NDJSON)
+
+Parámetros de consulta: provider, num (número de preguntas), tema y
+max_chars. La extracción se hace en un pool de procesos acotado y la
+generación en un pool de hilos; las peticiones que no caben en los pools
+ni en la cola se rechazan con 503 y Retry-After.
+
+Uso:
+    python http_service.py --port 8080 --extract-workers 4 --generate-workers 16
+"""
+
+import argparse
+import json
+import os
+import queue
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from dotenv import load_dotenv
+
+import telemetry
+from generator_registry import get_generator
+from parallel_generation import FanOutQuestionGenerator, MapReduceQuestionGenerator
+from pdf_cache import PDFTextCache
+from pdf_extractor import PDFExtractor
+from rate_limiter import RateLimitedGenerator
+from response_cache import CachedQuestionGenerator, ResponseCache
+from retrieval import select_relevant_text
+
+
+MAX_CARACTERES_PDF = 100000
+MAX_CARACTERES_PROMPT = 20000
+MAX_PREGUNTAS = 50
+
+# Preguntas que pueden esperar a que el cliente lea la respuesta en streaming
+STREAM_QUEUE_SIZE = 8
+
+_extractor = None
+
+
+def _extract_worker(pdf_path: str, max_chars: int) -> str:
+    """Extrae el texto dentro de un proceso del pool (un extractor con caché por proceso)"""
+    global _extractor
+    if _extractor is None:
+        _extractor = PDFExtractor(cache=PDFTextCache())
+    return _extractor.extract_text(pdf_path, max_chars=max_chars)
+
+
+class ServiceBusy(Exception):
+    """El servicio tiene ocupados todos los huecos de trabajo y de cola"""
+
+
+class ClientDisconnected(Exception):
+    """El cliente cerró la conexión antes de recibir la respuesta completa"""
+
+
+class QuestionService:
+    """Pools de trabajo y control de admisión compartidos por todas las peticiones"""
+
+    def __init__(self, extract_workers: int = None, generate_workers: int = 16,
+                 queue_size: int = 64, response_cache: ResponseCache = None):
+        """
+        Inicializa el servicio
+
+        Args:
+            extract_workers: Procesos para extraer PDFs (por defecto, el número de CPUs)
+            generate_workers: Hilos para llamar a los proveedores
+            queue_size: Peticiones que pueden esperar a que se libere un hilo;
+                por encima se responde 503
+            response_cache: Caché de respuestas (por defecto, la de la aplicación)
+        """
+        self.extract_workers = max(1, extract_workers or os.cpu_count() or 1)
+        self.generate_workers = generate_workers
+        self.capacity = generate_workers + queue_size
+        self.extract_pool = ProcessPoolExecutor(max_workers=self.extract_workers)
+        self.generate_pool = ThreadPoolExecutor(max_workers=generate_workers,
+                                                thread_name_prefix="generacion")
+        self.response_cache = response_cache or ResponseCache()
+        self._generators = {}
+        self._inflight = 0
+        self._lock = threading.Lock()
+
+    # --- Control de admisión ---
+
+    def admit(self):
+        """Reserva un hueco para una petición o lanza ServiceBusy"""
+        with self._lock:
+            if self._inflight >= self.capacity:
+                raise ServiceBusy()
+            self._inflight += 1
+
+    def release(self):
+        with self._lock:
+            self._inflight -= 1
+
+    def health(self) -> dict:
+        with self._lock:
+            inflight = self._inflight
+            generators = dict(self._generators)
+        result = {
+            "status": "ok",
+            "inflight": inflight,
+            "capacity": self.capacity,
+            "extract_workers": self.extract_workers,
+            "generate_workers": self.generate_workers,
+        }
+
+        # Estado de los cortacircuitos de los proveedores "failover" ya usados
+        circuits = {}
+        for provider, generator in generators.items():
+            while generator is not None and not hasattr(generator, "health"):
+                generator = getattr(generator, "generator", None)
+            if generator is not None:
+                circuits[provider] = generator.health()
+        if circuits:
+            result["circuitos"] = circuits
+        return result
+
+    # --- Trabajo ---
+
+    def generator(self, provider: str):
+        """Generador del proveedor con cuota y caché, compartido entre peticiones"""
+        with self._lock:
+            generator = self._generators.get(provider)
+        if generator is None:
+            # Sin tema llega el documento entero: si no cabe en un prompt se
+            # reparte en fragmentos en lugar de comprimirlo. Las peticiones de
+            # muchas preguntas se dividen en varias pequeñas y concurrentes.
+            generator = CachedQuestionGenerator(
+                FanOutQuestionGenerator(
+                    MapReduceQuestionGenerator(RateLimitedGenerator(get_generator(provider=provider)))
+                ),
+                cache=self.response_cache
+            )
+            with self._lock:
+                generator = self._generators.setdefault(provider, generator)
+        return generator
+
+    def extract(self, pdf_bytes: bytes, max_chars: int = MAX_CARACTERES_PDF) -> str:
+        """Extrae el texto del PDF en el pool de procesos"""
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+            f.write(pdf_bytes)
+            path = f.name
+        try:
+            return self.extract_pool.submit(_extract_worker, path, max_chars).result()
+        finally:
+            os.remove(path)
+
+    def prepare_text(self, text: str, tema: str) -> str:
+        return select_relevant_text(text, tema, max_chars=MAX_CARACTERES_PROMPT)
+
+    def generate(self, provider: str, text: str, num_questions: int) -> list:
+        """Genera las preguntas en el pool de hilos"""
+        generator = self.generator(provider)
+        return self.generate_pool.submit(generator.generate_questions, text, num_questions).result()
+
+    def generate_stream(self, provider: str, text: str, num_questions: int):
+        """
+        Genera las preguntas en el pool de hilos y las entrega según llegan
+
+        La cola entre el hilo de generación y el que escribe la respuesta
+        está acotada; si se deja de consumir (close(), p. ej. porque el
+        cliente se desconectó), el hilo de generación se detiene en la
+        siguiente pregunta en lugar de seguir gastando cuota.
+
+        Yields:
+            Cada pregunta; si la generación falla, relanza el error
+        """
+        generator = self.generator(provider)
+        items = queue.Queue(maxsize=STREAM_QUEUE_SIZE)
+        stop = threading.Event()
+        done = object()
+
+        def put(item):
+            while not stop.is_set():
+                try:
+                    items.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def run():
+            stream = generator.generate_questions_stream(text, num_questions)
+            try:
+                for question in stream:
+                    if not put(question):
+                        return
+            except Exception as e:
+                put(e)
+            finally:
+                stream.close()
+                put(done)
+
+        self.generate_pool.submit(run)
+        try:
+            while True:
+                item = items.get()
+                if item is done:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+
+    def shutdown(self):
+        self.generate_pool.shutdown(wait=False, cancel_futures=True)
+        self.extract_pool.shutdown(wait=False, cancel_futures=True)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "GeneradorPreguntas/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def service(self) -> QuestionService:
+        return self.server.service
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == "/health":
+            self._send_json(200, self.service.health())
+        elif path == "/metrics":
+            data = telemetry.render_prometheus().encode("utf-8")
+            self._send(200, data, "text/plain; version=0.0.4; charset=utf-8")
+        else:
+            self._send_json(404, {"error": f"Ruta desconocida: {path}"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path not in ("/extract", "/questions", "/questions/stream"):
+            self._send_json(404, {"error": f"Ruta desconocida: {url.path}"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self._send_json(400, {"error": "Content-Length no válido"}, close=True)
+            return
+        if length > self.server.max_upload_bytes:
+            self._send_json(413, {"error": f"El archivo supera {self.server.max_upload_bytes} bytes"},
+                            close=True)
+            return
+
+        # Se admite antes de leer el cuerpo: con el servicio lleno no se
+        # aceptan más subidas de hasta max_upload_bytes
+        try:
+            self.service.admit()
+        except ServiceBusy:
+            self._send_json(503, {"error": "Servicio ocupado, inténtalo más tarde"},
+                            headers={"Retry-After": str(self.server.retry_after)}, close=True)
+            return
+
+        try:
+            body = self.rfile.read(length)
+            if len(body) < length:
+                raise ClientDisconnected()
+            params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            self._route(url.path, params, body)
+        except (ClientDisconnected, ConnectionError):
+            # No hay a quién responder
+            self.close_connection = True
+        except ValueError as e:
+            self._send_json(400, {"error": str(e)})
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+        finally:
+            self.service.release()
+
+    def _route(self, path, params, body):
+        max_chars = int(params.get("max_chars", MAX_CARACTERES_PDF))
+        if not 1 <= max_chars <= MAX_CARACTERES_PDF:
+            raise ValueError(f"max_chars debe estar entre 1 y {MAX_CARACTERES_PDF}")
+        started = time.perf_counter()
+
+        if self.headers.get("Content-Type", "").startswith("application/json"):
+            if path == "/extract":
+                raise ValueError("/extract espera un PDF en el cuerpo")
+            try:
+                text = json.loads(body or b"{}").get("text", "")
+            except (ValueError, AttributeError):
+                raise ValueError("Cuerpo JSON no válido; se espera {\"text\": \"...\"}")
+            if not isinstance(text, str):
+                raise ValueError("El campo \"text\" debe ser una cadena")
+            text = text[:max_chars]
+        else:
+            if not body.startswith(b"%PDF"):
+                raise ValueError("El cuerpo no es un PDF")
+            text = self.service.extract(body, max_chars)
+
+        extracted = time.perf_counter()
+        if path == "/extract":
+            self._send_json(200, {"text": text, "chars": len(text),
+                                  "extract_ms": (extracted - started) * 1000})
+            return
+
+        if not text.strip():
+            raise ValueError("El documento no tiene texto extraíble")
+
+        provider = params.get("provider", "google").lower()
+        num_questions = int(params.get("num", 5))
+        if not 1 <= num_questions <= MAX_PREGUNTAS:
+            raise ValueError(f"num debe estar entre 1 y {MAX_PREGUNTAS}")
+        text = self.service.prepare_text(text, params.get("tema", ""))
+
+        if path == "/questions":
+            questions = self.service.generate(provider, text, num_questions)
+            self._send_json(200, {
+                "provider": provider,
+                "questions": questions,
+                "extract_ms": (extracted - started) * 1000,
+                "generate_ms": (time.perf_counter() - extracted) * 1000,
+            })
+            return
+
+        # Streaming: una línea JSON por pregunta y una línea final de cierre
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        count = 0
+        stream = self.service.generate_stream(provider, text, num_questions)
+        try:
+            try:
+                for question in stream:
+                    self._write_line(question)
+                    count += 1
+                trailer = {"done": True, "count": count,
+                           "total_ms": (time.perf_counter() - started) * 1000}
+            except ClientDisconnected:
+                raise
+            except Exception as e:
+                # Las cabeceras ya se enviaron: el error va como última línea
+                trailer = {"done": False, "count": count, "error": str(e)}
+            self._write_line(trailer)
+            self._write_chunk(b"")
+        finally:
+            # Si el cliente se fue, detiene la generación
+            stream.close()
+
+    def _write_line(self, payload):
+        self._write_chunk((json.dumps(payload, ensure_ascii=False) + "\n").encode("utf-8"))
+
+    def _write_chunk(self, data: bytes):
+        """Escribe un fragmento de la respuesta chunked (vacío para terminarla)"""
+        try:
+            self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+        except OSError as e:
+            raise ClientDisconnected() from e
+
+    def _send(self, status, data: bytes, content_type: str, headers=None, close=False):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if close:
+            # El cuerpo no se ha leído: la conexión no se puede reutilizar
+            self.send_header("Connection", "close")
+            self.close_connection = True
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_json(self, status, payload, headers=None, close=False):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self._send(status, data, "application/json; charset=utf-8", headers, close)
+
+
+def create_server(host: str = "127.0.0.1", port: int = 8080, service: QuestionService = None,
+                  max_upload_mb: int = 50, retry_after: int = 2) -> ThreadingHTTPServer:
+    """Crea el servidor HTTP (sin arrancarlo) con el servicio indicado"""
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.service = service or QuestionService()
+    server.max_upload_bytes = max_upload_mb * 1024 * 1024
+    server.retry_after = retry_after
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servicio HTTP de generación de preguntas desde PDFs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--extract-workers", type=int, default=None,
+                        help="Procesos de extracción (por defecto, el número de CPUs)")
+    parser.add_argument("--generate-workers", type=int, default=16)
+    parser.add_argument("--queue-size", type=int, default=64)
+    parser.add_argument("--max-upload-mb", type=int, default=50)
+    args = parser.parse_args()
+
+    load_dotenv()
+    telemetry.configure_from_env()
+
+    service = QuestionService(args.extract_workers, args.generate_workers, args.queue_size)
+    server = create_server(args.host, args.port, service, args.max_upload_mb)
+    print(f"🚀 Servicio escuchando en http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Módulo para leer preguntas de una respuesta JSON que llega por partes
+
+Permite mostrar cada pregunta en cuanto el modelo termina de escribirla,
+sin esperar al final de la respuesta, y rescatar las preguntas válidas de
+una respuesta mal formada o cortada.
+"""
+
+import json
+from typing import List
+
+from question_model import Question
+
+
+class QuestionStreamParser:
+    """
+    Analizador incremental del array "questions" de la respuesta
+
+    Recorre solo los caracteres nuevos de cada fragmento y, cada vez que se
+    cierra un objeto del array, lo decodifica con json.loads.
+    """
+
+    def __init__(self, key: str = "questions"):
+        self._marker = f'"{key}"'
+        self._buffer = ""
+        self._pos = 0
+        self._in_array = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._start = None
+        self.finished = False
+
+    def feed(self, fragment: str) -> List[dict]:
+        """
+        Añade un fragmento de la respuesta
+
+        Returns:
+            Las preguntas que se han completado con este fragmento
+        """
+        self._buffer += fragment
+        questions = []
+
+        if not self._in_array:
+            marker = self._buffer.find(self._marker)
+            if marker < 0:
+                return questions
+            bracket = self._buffer.find("[", marker + len(self._marker))
+            if bracket < 0:
+                return questions
+            self._in_array = True
+            self._pos = bracket + 1
+
+        buffer = self._buffer
+        i = self._pos
+        while i < len(buffer) and not self.finished:
+            char = buffer[i]
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                if self._depth == 0:
+                    self._start = i
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0 and self._start is not None:
+                    try:
+                        questions.append(json.loads(buffer[self._start:i + 1]))
+                    except ValueError:
+                        # Objeto mal formado: se descarta y se sigue con el resto
+                        pass
+                    self._start = None
+            elif char == "]" and self._depth == 0:
+                self.finished = True
+
+            i += 1
+
+        self._pos = i
+
+        # Lo anterior al objeto en curso ya no hace falta
+        keep = self._start if self._start is not None else self._pos
+        self._buffer = buffer[keep:]
+        if self._start is not None:
+            self._start = 0
+        self._pos -= keep
+
+        return questions
+
+
+def validate_question(raw) -> dict:
+    """
+    Comprueba y normaliza una pregunta recibida del modelo
+
+    Acepta la respuesta correcta como índice, como número en texto o como
+    letra ("B"), y descarta los campos desconocidos (ver Question.from_dict).
+
+    Returns:
+        La pregunta normalizada, o None si no es válida
+    """
+    try:
+        return Question.from_dict(raw).to_dict()
+    except ValueError:
+        return None
+
+
+def salvage_questions(content: str) -> List[dict]:
+    """
+    Rescata las preguntas válidas de una respuesta que json.loads rechaza
+
+    Sirve para texto alrededor del JSON, objetos sueltos mal formados o
+    respuestas cortadas por el límite de tokens.
+    """
+    parser = QuestionStreamParser()
+    return [q for q in map(validate_question, parser.feed(content)) if q is not None]
@@ -0,0 +1,222 @@
+"""
+Generador de preguntas local, sin red ni modelo de IA
+
+Construye preguntas de completar la frase y de definición a partir de las
+frases más representativas del texto, con distractores tomados del propio
+vocabulario del documento. Responde en milisegundos, por lo que sirve como
+último recurso cuando no hay conexión y para pruebas de carga sin coste.
+"""
+
+import hashlib
+import math
+import random
+import re
+from collections import Counter
+from typing import List
+
+from question_generator import QuestionGenerator
+from retrieval import STOPWORDS, tokenize
+from text_chunks import split_sentences
+
+
+_WORD = re.compile(r"[^\W\d_]+")
+
+# "La mitocondria es un orgánulo que...", "Los virus son agentes..."
+_DEFINITION = re.compile(
+    r"^(?:(?:el|la|los|las|un|una)\s+)?(?P<term>[^\W\d_]+(?:\s+[^\W\d_]+){0,3}?)\s+"
+    r"(?P<verb>es|son|se define como|se denomina|consiste en)\s+(?P<definition>.{20,})$",
+    re.IGNORECASE
+)
+
+# Palabras largas pero sin contenido, que no sirven como respuesta
+_FUNCTION_WORDS = frozenset("""
+mediante durante dentro fuera entre sobre hacia hasta desde cuando donde
+aunque porque tambien también mientras siempre nunca ademas además puede
+pueden tiene tienen otros otras cada todos todas estos estas esos esas
+""".split())
+
+MIN_SENTENCE_CHARS = 40
+MAX_SENTENCE_CHARS = 300
+MIN_ANSWER_CHARS = 5
+
+
+class LocalQuestionGenerator(QuestionGenerator):
+    """Generador de preguntas extractivo que no necesita red"""
+
+    provider = "local"
+    model_name = "local"
+
+    def __init__(self, seed: int = None):
+        """
+        Inicializa el generador
+
+        Args:
+            seed: Semilla para ordenar opciones y elegir distractores (por
+                defecto, derivada del texto, de modo que el mismo texto da
+                siempre las mismas preguntas)
+        """
+        self.seed = seed
+
+    def generate_questions(self, text: str, num_questions: int = 5) -> List[dict]:
+        """
+        Genera hasta num_questions preguntas a partir del texto
+
+        Puede devolver menos si el texto no tiene suficientes frases útiles.
+        """
+        if num_questions <= 0:
+            return []
+
+        seed = self.seed
+        if seed is None:
+            seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+        rng = random.Random(seed)
+
+        sentences = [
+            s for s in split_sentences(text)
+            if MIN_SENTENCE_CHARS <= len(s) <= MAX_SENTENCE_CHARS
+        ]
+        vocabulary = self._vocabulary(text)
+        if not sentences or len(vocabulary) < 4:
+            return []
+
+        questions = []
+        used_answers = set()
+        used_sentences = set()
+        definitions = self._definitions(sentences)
+        terms = [term for _, term, _, _ in definitions]
+
+        # Primero las definiciones, que dan las preguntas más claras
+        for sentence, term, verb, definition in definitions:
+            if len(questions) >= num_questions:
+                break
+            distractors = self._distractors(term, terms + list(vocabulary), vocabulary, rng,
+                                            exclude=set(w.lower() for w in _WORD.findall(definition)))
+            if len(distractors) < 3:
+                continue
+            used_answers.add(term.lower())
+            used_sentences.add(sentence)
+            questions.append(self._question(
+                f"¿Qué término del texto corresponde a esta descripción?: «{definition}»",
+                term, distractors, f"Según el texto, {term} {verb} {definition}.",
+                rng
+            ))
+
+        for sentence in self._rank_sentences(sentences, vocabulary):
+            if len(questions) >= num_questions:
+                break
+            if sentence in used_sentences:
+                continue
+            answer = self._answer_word(sentence, vocabulary, used_answers)
+            if answer is None:
+                continue
+            distractors = self._distractors(answer, list(vocabulary), vocabulary, rng,
+                                            exclude=set(w.lower() for w in _WORD.findall(sentence)))
+            if len(distractors) < 3:
+                continue
+            used_answers.add(answer.lower())
+            used_sentences.add(sentence)
+            cloze = re.sub(rf"\b{re.escape(answer)}\b", "_____", sentence, count=1)
+            questions.append(self._question(
+                f"Completa la frase del texto: «{cloze}»",
+                answer, distractors, f"El texto dice: «{sentence}»", rng
+            ))
+
+        return questions
+
+    @staticmethod
+    def _vocabulary(text: str) -> Counter:
+        """Frecuencia de las palabras con contenido, en su forma original"""
+        return Counter(
+            word for word in _WORD.findall(text)
+            if len(word) >= MIN_ANSWER_CHARS
+            and word.lower() not in STOPWORDS and word.lower() not in _FUNCTION_WORDS
+        )
+
+    @staticmethod
+    def _definitions(sentences: List[str]) -> List[tuple]:
+        """Tuplas (frase, término, verbo, definición) de las frases con forma de definición"""
+        definitions = []
+        seen = set()
+        for sentence in sentences:
+            match = _DEFINITION.match(sentence)
+            if not match:
+                continue
+            term = match.group("term").strip()
+            if term.lower() in seen or term.lower() in STOPWORDS or len(term) < 3:
+                continue
+            seen.add(term.lower())
+            definitions.append((sentence, term, match.group("verb"), match.group("definition").rstrip(".")))
+        return definitions
+
+    @staticmethod
+    def _rank_sentences(sentences: List[str], vocabulary: Counter) -> List[str]:
+        """
+        Ordena las frases por lo representativas que son del documento
+
+        Cada palabra aporta log(1 + frecuencia en el documento); la suma se
+        normaliza por la raíz del número de palabras para no premiar solo
+        las frases largas.
+        """
+        frequencies = Counter(tokenize(" ".join(vocabulary.elements())))
+
+        def score(sentence):
+            tokens = tokenize(sentence)
+            if not tokens:
+                return 0.0
+            return sum(math.log1p(frequencies[t]) for t in tokens) / math.sqrt(len(tokens))
+
+        return sorted(sentences, key=score, reverse=True)
+
+    @staticmethod
+    def _answer_word(sentence: str, vocabulary: Counter, used: set):
+        """La palabra de la frase más importante en el documento que aún no se ha preguntado"""
+        candidates = [
+            word for word in _WORD.findall(sentence)
+            if word in vocabulary and word.lower() not in used
+        ]
+        if not candidates:
+            return None
+        # Frecuente en el documento, pero larga: evita palabras de relleno
+        return max(candidates, key=lambda w: (vocabulary[w] > 1, len(w), vocabulary[w]))
+
+    @staticmethod
+    def _distractors(answer: str, candidates: List[str], vocabulary: Counter,
+                     rng: random.Random, exclude: set = None) -> List[str]:
+        """
+        Tres palabras del documento parecidas a la respuesta
+
+        Se prefieren las de la misma terminación (mismo género y número) y
+        longitud parecida, para que no se descarten a simple vista.
+        """
+        exclude = (exclude or set()) | {answer.lower()}
+        pool = []
+        seen = set()
+        for word in candidates:
+            key = word.lower()
+            if key in exclude or key in seen:
+                continue
+            seen.add(key)
+            pool.append(word)
+
+        def closeness(word):
+            return (
+                word[-2:].lower() != answer[-2:].lower(),
+                abs(len(word) - len(answer)),
+                -vocabulary.get(word, 0),
+            )
+
+        best = sorted(pool, key=closeness)[:10]
+        rng.shuffle(best)
+        return best[:3]
+
+    @staticmethod
+    def _question(pregunta: str, answer: str, distractors: List[str],
+                  explicacion: str, rng: random.Random) -> dict:
+        opciones = [answer] + distractors[:3]
+        rng.shuffle(opciones)
+        return {
+            "pregunta": pregunta,
+            "opciones": opciones,
+            "respuesta_correcta": opciones.index(answer),
+            "explicacion": explicacion,
+        }
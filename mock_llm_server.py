@@ -0,0 +1,461 @@
+"""
+Servidor HTTP local que imita las APIs de OpenAI, Anthropic y Gemini
+
+Responde con preguntas de prueba en el formato de cada proveedor, con
+latencia, errores y streaming configurables, para medir la aplicación sin
+red y sin coste. Los generadores lo usan a través de las variables de
+entorno OPENAI_BASE_URL, ANTHROPIC_BASE_URL y GEMINI_API_ENDPOINT.
+
+Uso:
+    python mock_llm_server.py --port 8765 --latency lognormal:0.8,0.5 --error-rate 0.02
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+DEFAULT_QUESTIONS = 5
+
+# Cuerpo de error de cada proveedor para los códigos que se pueden simular
+_ERROR_TYPES = {
+    429: ("rate_limit_error", "RESOURCE_EXHAUSTED"),
+    500: ("api_error", "INTERNAL"),
+    503: ("overloaded_error", "UNAVAILABLE"),
+    529: ("overloaded_error", "UNAVAILABLE"),
+}
+
+_NUM_QUESTIONS = re.compile(r"exactamente (\d+) preguntas")
+_GEMINI_PATH = re.compile(r"^/v1beta/models/(?P<model>[^/:]+)(?::(?P<method>\w+))?$")
+
+
+class LatencyModel:
+    """
+    Distribución de la latencia hasta el primer token
+
+    Formatos: "fixed:S", "uniform:MIN,MAX" y "lognormal:MEDIANA,SIGMA", en
+    segundos.
+    """
+
+    def __init__(self, spec: str = "fixed:0"):
+        kind, _, params = spec.partition(":")
+        values = [float(v) for v in params.split(",") if v] or [0.0]
+        if kind == "fixed":
+            self._sample = lambda rng: values[0]
+        elif kind == "uniform":
+            low, high = values[0], values[-1]
+            self._sample = lambda rng: rng.uniform(low, high)
+        elif kind == "lognormal":
+            median, sigma = values[0], values[1] if len(values) > 1 else 0.5
+            mu = math.log(median) if median > 0 else 0.0
+            self._sample = lambda rng: rng.lognormvariate(mu, sigma) if median > 0 else 0.0
+        else:
+            raise ValueError(f"Distribución de latencia no soportada: {spec}")
+        self.spec = spec
+
+    def sample(self, rng: random.Random) -> float:
+        return self._sample(rng)
+
+
+def fake_questions(num_questions: int) -> str:
+    """JSON con num_questions preguntas de prueba válidas"""
+    return json.dumps({
+        "questions": [
+            {
+                "pregunta": f"¿Cuál es la respuesta correcta a la pregunta de prueba {i + 1}?",
+                "opciones": [f"Opción {letra} de la pregunta {i + 1}" for letra in "ABCD"],
+                "respuesta_correcta": i % 4,
+                "explicacion": f"La opción {'ABCD'[i % 4]} es la correcta en esta pregunta de prueba.",
+            }
+            for i in range(num_questions)
+        ]
+    }, ensure_ascii=False)
+
+
+def _pieces(text: str, size: int):
+    return [text[i:i + size] for i in range(0, len(text), size)] or [""]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Atiende las peticiones de los tres formatos"""
+
+    protocol_version = "HTTP/1.1"
+    server_version = "MockLLM/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    # --- Enrutado ---
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == "/v1/models":
+            # Respuesta válida para OpenAI y Anthropic a la vez
+            self._send_json(200, {
+                "object": "list",
+                "data": [{
+                    "id": "mock-model", "object": "model", "created": 0, "owned_by": "mock",
+                    "type": "model", "display_name": "Mock", "created_at": "2024-01-01T00:00:00Z",
+                }],
+                "has_more": False, "first_id": "mock-model", "last_id": "mock-model",
+            })
+            return
+
+        match = _GEMINI_PATH.match(path)
+        if match and not match.group("method"):
+            self._send_json(200, {
+                "name": f"models/{match.group('model')}",
+                "baseModelId": match.group("model"),
+                "version": "001",
+                "displayName": "Mock",
+                "inputTokenLimit": 1_000_000,
+                "outputTokenLimit": 8192,
+                "supportedGenerationMethods": ["generateContent"],
+            })
+            return
+
+        self._send_json(404, {"error": {"message": f"Ruta desconocida: {path}"}})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        body = self._read_json()
+        if body is None:
+            return
+
+        if url.path == "/v1/chat/completions":
+            self._handle(self._openai, "openai", body, body.get("stream", False))
+        elif url.path == "/v1/messages":
+            self._handle(self._anthropic, "anthropic", body, body.get("stream", False))
+        else:
+            match = _GEMINI_PATH.match(url.path)
+            method = match.group("method") if match else None
+            if method in ("generateContent", "streamGenerateContent"):
+                body["_sse"] = parse_qs(url.query).get("alt") == ["sse"]
+                self._handle(self._gemini, "google", body, method == "streamGenerateContent")
+            else:
+                self._send_json(404, {"error": {"message": f"Ruta desconocida: {url.path}"}})
+
+    def _handle(self, responder, provider, body, stream):
+        """Aplica la latencia y los errores simulados y delega en el formato del proveedor"""
+        options = self.server.options
+        with self.server.lock:
+            self.server.requests += 1
+            latency = options["latency"].sample(self.server.rng)
+            failed = self.server.rng.random() < options["error_rate"]
+            if failed:
+                self.server.errors += 1
+
+        time.sleep(latency)
+        if failed:
+            self._send_error(provider, options["error_status"])
+            return
+
+        prompt = self._prompt(provider, body)
+        match = _NUM_QUESTIONS.search(prompt)
+        content = fake_questions(int(match.group(1)) if match else DEFAULT_QUESTIONS)
+        pieces = _pieces(content, options["chunk_size"])
+        responder(body, content, pieces, stream)
+
+    @staticmethod
+    def _prompt(provider, body):
+        """Texto del último mensaje del usuario"""
+        if provider == "google":
+            parts = (body.get("contents") or [{}])[-1].get("parts", [])
+            return "".join(part.get("text", "") for part in parts)
+        content = (body.get("messages") or [{}])[-1].get("content", "")
+        if isinstance(content, list):
+            return "".join(block.get("text", "") for block in content if isinstance(block, dict))
+        return content
+
+    # --- Formatos ---
+
+    def _openai(self, body, content, pieces, stream):
+        model = body.get("model", "mock-model")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        usage = {"prompt_tokens": 100, "completion_tokens": len(content) // 4,
+                 "total_tokens": 100 + len(content) // 4}
+
+        if not stream:
+            self._generation_delay(len(pieces))
+            self._send_json(200, {
+                "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                             "finish_reason": "stop"}],
+                "usage": usage,
+            })
+            return
+
+        def chunk(delta, finish_reason=None):
+            return {"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+
+        self._start_stream("text/event-stream")
+        self._sse(None, chunk({"role": "assistant", "content": ""}))
+        for piece in pieces:
+            self._chunk_delay()
+            self._sse(None, chunk({"content": piece}))
+        self._sse(None, chunk({}, "stop"))
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._end_stream()
+
+    def _anthropic(self, body, content, pieces, stream):
+        tools = body.get("tools") or []
+        tool = tools[0]["name"] if tools else None
+        message = {
+            "id": f"msg_{uuid.uuid4().hex[:12]}", "type": "message", "role": "assistant",
+            "model": body.get("model", "mock-model"), "content": [],
+            "stop_reason": None, "stop_sequence": None,
+            "usage": {"input_tokens": 100, "output_tokens": 0},
+        }
+        stop_reason = "tool_use" if tool else "end_turn"
+        if tool:
+            block = {"type": "tool_use", "id": f"toolu_{uuid.uuid4().hex[:12]}", "name": tool}
+        else:
+            block = {"type": "text"}
+
+        if not stream:
+            self._generation_delay(len(pieces))
+            full = dict(block, input=json.loads(content)) if tool else dict(block, text=content)
+            self._send_json(200, dict(
+                message, content=[full], stop_reason=stop_reason,
+                usage={"input_tokens": 100, "output_tokens": len(content) // 4}
+            ))
+            return
+
+        self._start_stream("text/event-stream")
+        self._sse("message_start", {"type": "message_start", "message": message})
+        self._sse("content_block_start", {
+            "type": "content_block_start", "index": 0,
+            "content_block": dict(block, input={}) if tool else dict(block, text=""),
+        })
+        for piece in pieces:
+            self._chunk_delay()
+            delta = ({"type": "input_json_delta", "partial_json": piece} if tool
+                     else {"type": "text_delta", "text": piece})
+            self._sse("content_block_delta", {"type": "content_block_delta", "index": 0, "delta": delta})
+        self._sse("content_block_stop", {"type": "content_block_stop", "index": 0})
+        self._sse("message_delta", {
+            "type": "message_delta",
+            "delta": {"stop_reason": stop_reason, "stop_sequence": None},
+            "usage": {"output_tokens": len(content) // 4},
+        })
+        self._sse("message_stop", {"type": "message_stop"})
+        self._end_stream()
+
+    def _gemini(self, body, content, pieces, stream):
+        def response(text, finished):
+            candidate = {"content": {"parts": [{"text": text}], "role": "model"}, "index": 0}
+            if finished:
+                candidate["finishReason"] = "STOP"
+            return {
+                "candidates": [candidate],
+                "usageMetadata": {"promptTokenCount": 100, "candidatesTokenCount": len(content) // 4,
+                                  "totalTokenCount": 100 + len(content) // 4},
+            }
+
+        if not stream:
+            self._generation_delay(len(pieces))
+            self._send_json(200, response(content, True))
+            return
+
+        # Con alt=sse, eventos SSE; si no, un array JSON que llega por partes (REST)
+        sse = body.get("_sse")
+        self._start_stream("text/event-stream" if sse else "application/json")
+        if not sse:
+            self._write_chunk(b"[")
+        for i, piece in enumerate(pieces):
+            self._chunk_delay()
+            data = response(piece, i == len(pieces) - 1)
+            if sse:
+                self._sse(None, data)
+            else:
+                self._write_chunk((("," if i else "") + json.dumps(data, ensure_ascii=False)).encode("utf-8"))
+        if not sse:
+            self._write_chunk(b"]")
+        self._end_stream()
+
+    # --- Utilidades HTTP ---
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            return json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": {"message": "JSON no válido"}})
+            return None
+
+    def _send_json(self, status, payload, headers=None):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_error(self, provider, status):
+        error_type, google_status = _ERROR_TYPES.get(status, ("api_error", "INTERNAL"))
+        message = f"Error simulado {status}"
+        if provider == "anthropic":
+            payload = {"type": "error", "error": {"type": error_type, "message": message}}
+        elif provider == "google":
+            payload = {"error": {"code": status, "message": message, "status": google_status}}
+        else:
+            payload = {"error": {"message": message, "type": error_type, "code": None, "param": None}}
+        headers = {"retry-after": str(self.server.options["retry_after"])} if status == 429 else None
+        self._send_json(status, payload, headers)
+
+    def _start_stream(self, content_type):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _end_stream(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _sse(self, event, data):
+        text = f"event: {event}\n" if event else ""
+        text += f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+        self._write_chunk(text.encode("utf-8"))
+
+    def _chunk_delay(self):
+        delay = self.server.options["chunk_delay"]
+        if delay > 0:
+            time.sleep(delay)
+
+    def _generation_delay(self, chunks):
+        """Sin streaming, la respuesta llega cuando se habría generado el último fragmento"""
+        delay = self.server.options["chunk_delay"] * chunks
+        if delay > 0:
+            time.sleep(delay)
+
+
+def configure_environment(url: str, environ=None):
+    """Apunta los SDK de los tres proveedores al servidor simulado de url"""
+    environ = os.environ if environ is None else environ
+    environ["OPENAI_BASE_URL"] = f"{url}/v1"
+    environ["ANTHROPIC_BASE_URL"] = url
+    environ["GEMINI_API_ENDPOINT"] = url
+    for name in ("OPENAI_API_KEY", "ANTHROPIC_API_KEY", "GOOGLE_API_KEY"):
+        environ[name] = "mock-key"
+
+
+class MockLLMServer:
+    """Servidor simulado que se puede arrancar en un hilo desde el propio proceso"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: str = "fixed:0",
+                 chunk_delay: float = 0.0, chunk_size: int = 40, error_rate: float = 0.0,
+                 error_status: int = 429, retry_after: float = 1.0, seed: int = None):
+        """
+        Inicializa el servidor
+
+        Args:
+            host: Dirección en la que escuchar
+            port: Puerto (0 para elegir uno libre)
+            latency: Distribución de la latencia hasta el primer token (ver LatencyModel)
+            chunk_delay: Segundos entre fragmentos de la respuesta, que simulan
+                la velocidad de generación
+            chunk_size: Caracteres por fragmento en streaming
+            error_rate: Fracción de peticiones que fallan
+            error_status: Código HTTP de los errores simulados
+            retry_after: Valor de la cabecera Retry-After en los 429
+            seed: Semilla de la latencia y los errores
+        """
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.options = {
+            "latency": LatencyModel(latency),
+            "chunk_delay": chunk_delay,
+            "chunk_size": max(1, chunk_size),
+            "error_rate": error_rate,
+            "error_status": error_status,
+            "retry_after": retry_after,
+        }
+        self._httpd.rng = random.Random(seed)
+        self._httpd.lock = threading.Lock()
+        self._httpd.requests = 0
+        self._httpd.errors = 0
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def stats(self) -> dict:
+        """Peticiones atendidas y errores simulados"""
+        with self._httpd.lock:
+            return {"requests": self._httpd.requests, "errors": self._httpd.errors}
+
+    def configure_environment(self, environ=None):
+        """Apunta los SDK de los tres proveedores a este servidor"""
+        configure_environment(self.url, environ)
+
+    def serve_forever(self):
+        self._httpd.serve_forever()
+
+    def start(self):
+        """Atiende peticiones en un hilo en segundo plano"""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor simulado de OpenAI, Anthropic y Gemini")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", default="fixed:0",
+                        help='"fixed:S", "uniform:MIN,MAX" o "lognormal:MEDIANA,SIGMA"')
+    parser.add_argument("--chunk-delay", type=float, default=0.0)
+    parser.add_argument("--chunk-size", type=int, default=40)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=429)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    server = MockLLMServer(args.host, args.port, args.latency, args.chunk_delay, args.chunk_size,
+                           args.error_rate, args.error_status, args.retry_after, args.seed)
+    print(f"🧪 Servidor simulado en {server.url}")
+    print(f"   OPENAI_BASE_URL={server.url}/v1")
+    print(f"   ANTHROPIC_BASE_URL={server.url}")
+    print(f"   GEMINI_API_ENDPOINT={server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
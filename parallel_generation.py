@@ -0,0 +1,240 @@
+"""
+Módulo de generación de preguntas en paralelo sobre documentos completos
+"""
+
+import itertools
+import math
+from typing import Iterator, List
+
+from dedup import NearDuplicateIndex, remove_near_duplicates
+from prompt_builder import DEFAULT_TOKEN_BUDGET, estimate_tokens
+from question_generator import QuestionGenerator, generate_many_async, run_sync
+from question_model import Question
+from text_chunks import split_into_chunks, spread
+
+
+def _normalize(question) -> str:
+    """Texto de la pregunta (Question o diccionario) normalizado para detectar repeticiones exactas"""
+    text = question.pregunta if isinstance(question, Question) else question.get("pregunta", "")
+    return " ".join(str(text).lower().split())
+
+
+def prompt_budget(generator: QuestionGenerator) -> int:
+    """Tokens de documento que caben en el prompt del generador o del que envuelve"""
+    while generator is not None:
+        builder = getattr(generator, "prompt_builder", None)
+        if builder is not None:
+            return builder.token_budget
+        generator = getattr(generator, "generator", None)
+    return DEFAULT_TOKEN_BUDGET
+
+
+class MapReduceQuestionGenerator(QuestionGenerator):
+    """
+    Genera preguntas sobre todo el documento en lugar de solo el principio
+
+    El texto se divide en fragmentos, se piden preguntas candidatas para
+    cada uno de forma concurrente (map) y después se eligen num_questions
+    repartidas a lo largo del documento (reduce). Si el texto cabe en un
+    solo prompt, la petición pasa tal cual al generador envuelto.
+    """
+
+    def __init__(self, generator: QuestionGenerator, chunk_size: int = 3000,
+                 max_chunks: int = 8, max_concurrency: int = 8, token_budget: int = None):
+        """
+        Inicializa el generador
+
+        Args:
+            generator: Generador que procesa cada fragmento
+            chunk_size: Tamaño de cada fragmento en caracteres
+            max_chunks: Máximo de fragmentos a enviar; si hay más se eligen
+                fragmentos repartidos por todo el documento
+            max_concurrency: Máximo de peticiones simultáneas
+            token_budget: Tokens a partir de los cuales se divide el texto
+                (por defecto, el presupuesto del prompt del generador)
+        """
+        self.generator = generator
+        self.chunk_size = chunk_size
+        self.max_chunks = max_chunks
+        self.max_concurrency = max_concurrency
+        self.token_budget = token_budget or prompt_budget(generator)
+        self.provider = generator.provider
+        self.model_name = generator.model_name
+
+    def build_prompt(self, text: str, num_questions: int = 5, avoid: List[str] = None) -> str:
+        return self.generator.build_prompt(text, num_questions, avoid)
+
+    def fits(self, text: str) -> bool:
+        """True si el texto cabe en un solo prompt sin comprimirlo"""
+        return estimate_tokens(text) <= self.token_budget
+
+    def generate_questions(self, text: str, num_questions: int = 5) -> List[dict]:
+        """Genera preguntas de todo el documento (no usar desde un bucle de eventos)"""
+        if self.fits(text):
+            return self.generator.generate_questions(text, num_questions)
+        return run_sync(self.generate_questions_async, text, num_questions)
+
+    def generate_questions_stream(self, text: str, num_questions: int = 5) -> Iterator[dict]:
+        """Si el texto cabe en un prompt, mantiene el streaming del generador envuelto"""
+        if self.fits(text):
+            yield from self.generator.generate_questions_stream(text, num_questions)
+        else:
+            yield from self.generate_questions(text, num_questions)
+
+    async def generate_questions_async(self, text: str, num_questions: int = 5) -> List[dict]:
+        """Genera preguntas de todo el documento con los fragmentos en paralelo"""
+        if self.fits(text):
+            return await self.generator.generate_questions_async(text, num_questions)
+
+        chunks = spread(split_into_chunks(text, self.chunk_size), self.max_chunks)
+        if not chunks:
+            return []
+
+        per_chunk = math.ceil(num_questions / len(chunks))
+        results = await generate_many_async(
+            self.generator,
+            chunks,
+            num_questions=per_chunk,
+            max_concurrency=self.max_concurrency,
+            return_exceptions=True
+        )
+
+        candidates = [r for r in results if not isinstance(r, BaseException)]
+        if not candidates:
+            raise Exception(f"Error al generar preguntas del documento: {results[0]}")
+
+        return self._reduce(candidates, num_questions)
+
+    @staticmethod
+    def _reduce(candidates: List[List[dict]], num_questions: int) -> List[dict]:
+        """
+        Elige num_questions preguntas repartidas entre los fragmentos
+
+        Se toma por rondas la primera candidata de cada fragmento, luego la
+        segunda, etc.; si una ronda tiene más de las que faltan, se eligen
+        fragmentos espaciados uniformemente.
+        """
+        selected = []
+        seen = set()
+
+        for round_ in itertools.zip_longest(*candidates):
+            available = []
+            for question in round_:
+                if question is None or _normalize(question) in seen:
+                    continue
+                seen.add(_normalize(question))
+                available.append(question)
+
+            selected.extend(spread(available, num_questions - len(selected)))
+            if len(selected) >= num_questions:
+                break
+
+        return selected
+
+    def warm_up(self):
+        self.generator.warm_up()
+
+
+class FanOutQuestionGenerator(QuestionGenerator):
+    """
+    Reparte una petición grande en varias pequeñas y concurrentes
+
+    La latencia la dominan los tokens de salida: pedir 50 preguntas en una
+    llamada tarda unas diez veces más que pedir 5. Aquí cada subpetición
+    trabaja sobre una parte distinta del texto y pide pocas preguntas, y los
+    resultados se unen descartando las casi repetidas (dedup.py). Si tras
+    descartarlas faltan preguntas, se piden las que faltan en otra ronda.
+    """
+
+    def __init__(self, generator: QuestionGenerator, questions_per_call: int = 5,
+                 max_concurrency: int = 8, similarity_threshold: float = 0.7,
+                 top_up_rounds: int = 2):
+        """
+        Inicializa el generador
+
+        Args:
+            generator: Generador que atiende cada subpetición
+            questions_per_call: Preguntas que se piden en cada subpetición
+            max_concurrency: Máximo de subpeticiones simultáneas
+            similarity_threshold: Similitud a partir de la cual dos
+                preguntas se consideran repetidas
+            top_up_rounds: Rondas adicionales para completar las preguntas
+                descartadas por repetidas
+        """
+        self.generator = generator
+        self.questions_per_call = questions_per_call
+        self.max_concurrency = max_concurrency
+        self.similarity_threshold = similarity_threshold
+        self.top_up_rounds = top_up_rounds
+        self.provider = generator.provider
+        self.model_name = generator.model_name
+
+    def build_prompt(self, text: str, num_questions: int = 5, avoid: List[str] = None) -> str:
+        return self.generator.build_prompt(text, num_questions, avoid)
+
+    def _fans_out(self, num_questions: int) -> bool:
+        return num_questions > self.questions_per_call
+
+    def generate_questions(self, text: str, num_questions: int = 5) -> List[dict]:
+        """Genera las preguntas en subpeticiones paralelas (no usar desde un bucle de eventos)"""
+        if not self._fans_out(num_questions):
+            return self.generator.generate_questions(text, num_questions)
+        return run_sync(self.generate_questions_async, text, num_questions)
+
+    def generate_questions_stream(self, text: str, num_questions: int = 5) -> Iterator[dict]:
+        """Las peticiones pequeñas mantienen el streaming del generador envuelto"""
+        if not self._fans_out(num_questions):
+            yield from self.generator.generate_questions_stream(text, num_questions)
+        else:
+            yield from self.generate_questions(text, num_questions)
+
+    async def generate_questions_async(self, text: str, num_questions: int = 5) -> List[dict]:
+        """Genera las preguntas en subpeticiones paralelas"""
+        if not self._fans_out(num_questions):
+            return await self.generator.generate_questions_async(text, num_questions)
+
+        index = NearDuplicateIndex(threshold=self.similarity_threshold)
+        questions = []
+        for round_ in range(1 + self.top_up_rounds):
+            missing = num_questions - len(questions)
+            if missing <= 0:
+                break
+            try:
+                merged = await self._fan_out(text, missing)
+            except Exception:
+                if not questions:
+                    raise
+                # La ronda de relleno es opcional: se entrega lo que hay
+                break
+            questions += remove_near_duplicates(merged, index=index)
+
+        return questions[:num_questions]
+
+    async def _fan_out(self, text: str, num_questions: int) -> List[dict]:
+        """Una ronda de subpeticiones; devuelve las preguntas intercaladas entre ellas"""
+        calls = math.ceil(num_questions / self.questions_per_call)
+        per_call = math.ceil(num_questions / calls)
+
+        # Una parte distinta del texto para cada subpetición; si el texto es
+        # corto y no da para todas, las partes se reutilizan
+        parts = spread(split_into_chunks(text, math.ceil(len(text) / calls)), calls) or [text]
+        parts = [parts[i % len(parts)] for i in range(calls)]
+
+        # Se pide una pregunta de más por llamada para cubrir las repetidas
+        results = await generate_many_async(
+            self.generator,
+            parts,
+            num_questions=per_call + 1,
+            max_concurrency=self.max_concurrency,
+            return_exceptions=True
+        )
+
+        answered = [r for r in results if not isinstance(r, BaseException)]
+        if not answered:
+            raise Exception(f"Error al generar preguntas: {results[0]}")
+
+        # Ronda a ronda entre subpeticiones, para no agotar primero una parte del texto
+        return [q for round_ in itertools.zip_longest(*answered) for q in round_ if q is not None]
+
+    def warm_up(self):
+        self.generator.warm_up()
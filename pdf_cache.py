@@ -0,0 +1,169 @@
+"""
+Módulo de caché en disco para el texto extraído de archivos PDF
+
+Las entradas se identifican por el hash del contenido del archivo y la
+versión del extractor, y guardan el texto de cada página por separado.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class PDFTextCache:
+    """Caché LRU en disco, acotada por tamaño total, del texto de cada página"""
+
+    def __init__(self, directory: str = ".cache/pdf_text", max_bytes: int = 256 * 1024 * 1024):
+        """
+        Inicializa la caché
+
+        Args:
+            directory: Carpeta donde se guardan las entradas
+            max_bytes: Tamaño total máximo; al superarlo se eliminan las
+                entradas usadas hace más tiempo
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # (ruta, tamaño, mtime) -> hash, para no releer archivos sin cambios
+        self._hashes = {}
+
+    def key(self, pdf_path, version) -> str:
+        """Calcula la clave de un PDF a partir de su contenido y la versión del extractor"""
+        stat = os.stat(pdf_path)
+        ident = (os.path.abspath(pdf_path), stat.st_size, stat.st_mtime_ns)
+
+        digest = self._hashes.get(ident)
+        if digest is None:
+            sha = hashlib.sha256()
+            with open(pdf_path, "rb") as f:
+                for block in iter(lambda: f.read(1024 * 1024), b""):
+                    sha.update(block)
+            digest = sha.hexdigest()
+            self._hashes[ident] = digest
+
+        return f"{digest}-v{version}"
+
+    def load(self, key):
+        """
+        Lee una entrada de la caché
+
+        Returns:
+            Diccionario con "num_pages" y "pages" (índice -> texto), o None
+        """
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            # Marcar como usada recientemente para el orden LRU
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+
+        return {
+            "num_pages": data["num_pages"],
+            "pages": {int(i): text for i, text in data["pages"].items()},
+        }
+
+    def store(self, key, num_pages, pages):
+        """
+        Añade páginas a una entrada, conservando las que ya estuvieran guardadas
+
+        La escritura se hace en un archivo temporal que luego sustituye al
+        definitivo, así otros procesos nunca leen una entrada a medio escribir.
+        La lectura, la mezcla y la escritura se hacen con el cerrojo de la
+        carpeta tomado, para que dos procesos que guardan páginas distintas
+        de la misma entrada no pierdan las del otro.
+        """
+        try:
+            with self._store_lock():
+                entry = self.load(key)
+                merged = entry["pages"] if entry else {}
+                merged.update(pages)
+
+                fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+                try:
+                    with os.fdopen(fd, "w", encoding="utf-8") as f:
+                        json.dump({"num_pages": num_pages, "pages": merged}, f, ensure_ascii=False)
+                    os.replace(tmp_path, self._path(key))
+                except BaseException:
+                    os.unlink(tmp_path)
+                    raise
+
+                self._evict()
+
+        except OSError as e:
+            print(f"⚠️  No se pudo guardar en la caché de PDF: {e}")
+
+    def record(self, hits: int = 0, misses: int = 0):
+        """Acumula los contadores de páginas servidas desde la caché y extraídas"""
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    def stats(self) -> dict:
+        """Devuelve los contadores de aciertos y fallos de la caché"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+    def _path(self, key):
+        return self.directory / f"{key}.json"
+
+    @contextmanager
+    def _store_lock(self):
+        """Cerrojo exclusivo entre procesos sobre el archivo store.lock de la carpeta"""
+        with open(self.directory / "store.lock", "a+b") as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _evict(self):
+        """Elimina las entradas menos usadas hasta quedar por debajo de max_bytes"""
+        entries = []
+        total = 0
+        for path in self.directory.glob("*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                # Otro proceso la eliminó o la está usando
+                continue
+            total -= size
@@ -2,30 +2,260 @@
 Módulo para extraer texto de archivos PDF
 """
 
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 from PyPDF2 import PdfReader
 
+import telemetry
+
+
+def _is_path(pdf_path) -> bool:
+    """True si el PDF se indicó por su ruta y no como archivo abierto"""
+    return isinstance(pdf_path, (str, os.PathLike))
+
+
+def _extract_pages(pdf_path, indices):
+    """
+    Extrae el texto de las páginas indicadas de un PDF
+
+    Se ejecuta dentro de cada proceso del pool, por eso abre su propio
+    PdfReader en lugar de compartir el del proceso principal.
+
+    Returns:
+        Lista con el texto de cada página, en orden
+    """
+    reader = PdfReader(pdf_path)
+    return [reader.pages[i].extract_text() or "" for i in indices]
+
 
 class PDFExtractor:
     """Clase para extraer texto de archivos PDF"""
-    
-    def extract_text(self, pdf_path):
+
+    # Versión del algoritmo de extracción; forma parte de la clave de la caché
+    VERSION = 1
+
+    # Por debajo de este número de páginas crear el pool cuesta más de lo que ahorra
+    MIN_PAGES_PARALLEL = 32
+
+    # Con max_chars, páginas que extrae cada proceso antes de comprobar si ya basta
+    PAGES_PER_WORKER = 8
+
+    def __init__(self, parallel: bool = False, workers: int = None,
+                 min_pages_parallel: int = MIN_PAGES_PARALLEL, cache=None):
         """
-        Extrae todo el texto de un archivo PDF
-        
+        Inicializa el extractor
+
         Args:
-            pdf_path: Ruta del archivo PDF
-            
+            parallel: Si es True, reparte las páginas entre varios procesos
+            workers: Número de procesos (por defecto, el número de CPUs)
+            min_pages_parallel: Mínimo de páginas para usar el modo paralelo
+            cache: PDFTextCache opcional donde consultar y guardar el texto
+        """
+        self.parallel = parallel
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.min_pages_parallel = min_pages_parallel
+        self.cache = cache
+
+    def extract_text(self, pdf_path, max_chars: int = None, page_range=None):
+        """
+        Extrae el texto de un archivo PDF
+
+        Args:
+            pdf_path: Ruta del archivo PDF o archivo abierto en modo binario
+                (este último no usa la caché ni el modo paralelo)
+            max_chars: Máximo de caracteres a devolver; al alcanzarlo se deja
+                de analizar el resto de páginas
+            page_range: Páginas a extraer, como range o tupla (inicio, fin)
+
         Returns:
-            String con todo el texto extraído
+            String con el texto extraído
         """
-        try:
-            reader = PdfReader(pdf_path)
-            text = ""
-            
-            for page in reader.pages:
-                text += page.extract_text()
-            
+        with telemetry.span("pdf.extract") as span:
+            text = self._extract_text(pdf_path, max_chars, page_range)
+            if span:
+                span.set(chars=len(text), parallel=self.parallel and _is_path(pdf_path))
+                if _is_path(pdf_path):
+                    span.set(bytes=os.path.getsize(pdf_path))
             return text
-        
+
+    def _extract_text(self, pdf_path, max_chars, page_range):
+        try:
+            key, entry = self._cache_lookup(pdf_path)
+            reader = None
+            # Un archivo abierto no se puede pasar a otros procesos
+            if self.parallel and _is_path(pdf_path):
+                # El PdfReader que cuenta las páginas se reutiliza si al final
+                # la extracción es en serie
+                if entry is None:
+                    reader = PdfReader(pdf_path)
+                    num_pages = len(reader.pages)
+                else:
+                    num_pages = entry["num_pages"]
+                indices = self._page_indices(num_pages, page_range)
+                cached = entry["pages"] if entry else {}
+                missing = [i for i in indices if i not in cached]
+
+                if self._use_parallel(len(missing)):
+                    return self._extract_parallel_until(pdf_path, key, num_pages, indices,
+                                                        cached, max_chars)
+
+            pages = self._iter_pages(pdf_path, page_range, key, entry, reader)
+            if max_chars is not None:
+                return self._join_until(pages, max_chars)
+            return "".join(pages)
+
         except Exception as e:
             raise Exception(f"Error al extraer PDF: {str(e)}")
+
+    def iter_pages(self, pdf_path, page_range=None):
+        """
+        Genera el texto del PDF página a página, sin analizar las siguientes
+        hasta que se piden
+
+        Args:
+            pdf_path: Ruta del archivo PDF
+            page_range: Páginas a extraer, como range o tupla (inicio, fin)
+
+        Yields:
+            String con el texto de cada página
+        """
+        try:
+            key, entry = self._cache_lookup(pdf_path)
+            yield from self._iter_pages(pdf_path, page_range, key, entry)
+        except Exception as e:
+            raise Exception(f"Error al extraer PDF: {str(e)}")
+
+    def _iter_pages(self, pdf_path, page_range, key, entry, reader=None):
+        """
+        Versión interna de iter_pages, sin envolver las excepciones
+
+        Las páginas presentes en la entrada de caché se sirven sin abrir el
+        PDF; las demás se extraen y se guardan al terminar la iteración.
+        """
+        cached = entry["pages"] if entry else {}
+        if entry is None:
+            if reader is None:
+                reader = PdfReader(pdf_path)
+            num_pages = len(reader.pages)
+        else:
+            num_pages = entry["num_pages"]
+
+        hits = 0
+        extracted = {}
+        try:
+            for i in self._page_indices(num_pages, page_range):
+                if i in cached:
+                    hits += 1
+                    yield cached[i]
+                    continue
+
+                if reader is None:
+                    reader = PdfReader(pdf_path)
+                text = reader.pages[i].extract_text() or ""
+                extracted[i] = text
+                yield text
+        finally:
+            self._cache_store(key, num_pages, hits, extracted)
+
+    def _cache_lookup(self, pdf_path):
+        """Devuelve la clave y la entrada de caché del PDF (None si no hay caché o no es una ruta)"""
+        if self.cache is None or not _is_path(pdf_path):
+            return None, None
+        key = self.cache.key(pdf_path, self.VERSION)
+        return key, self.cache.load(key)
+
+    def _cache_store(self, key, num_pages, hits, extracted):
+        """Registra aciertos y fallos y guarda las páginas recién extraídas"""
+        if key is None:
+            return
+        self.cache.record(hits=hits, misses=len(extracted))
+        if extracted:
+            self.cache.store(key, num_pages, extracted)
+
+    @staticmethod
+    def _join_until(pages, max_chars):
+        """Concatena páginas hasta reunir max_chars caracteres y se detiene"""
+        parts = []
+        total = 0
+        for text in pages:
+            parts.append(text)
+            total += len(text)
+            if total >= max_chars:
+                break
+        if hasattr(pages, "close"):
+            # Guarda en la caché lo extraído aunque no se haya recorrido todo
+            pages.close()
+        return "".join(parts)[:max_chars]
+
+    @staticmethod
+    def _page_indices(num_pages, page_range):
+        """Normaliza page_range a un range acotado al número de páginas"""
+        if page_range is None:
+            return range(num_pages)
+        if not isinstance(page_range, range):
+            start, end = page_range
+            page_range = range(start, end)
+        return range(num_pages)[page_range.start:page_range.stop:page_range.step]
+
+    def _use_parallel(self, num_pages):
+        """Indica si compensa repartir la extracción entre procesos"""
+        return (
+            self.parallel
+            and self.workers > 1
+            and num_pages >= self.min_pages_parallel
+        )
+
+    def _extract_parallel_until(self, pdf_path, key, num_pages, indices, cached, max_chars):
+        """
+        Extrae en paralelo las páginas que no están en la caché
+
+        Sin max_chars se reparten todas de una vez; con max_chars se avanza
+        por tandas de PAGES_PER_WORKER páginas por proceso y se para en
+        cuanto se reúnen los caracteres pedidos.
+        """
+        workers = min(self.workers, len(indices))
+        block = len(indices) if max_chars is None else workers * self.PAGES_PER_WORKER
+        parts = []
+        total = 0
+        hits = 0
+        extracted = {}
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                for start in range(0, len(indices), block):
+                    chunk = indices[start:start + block]
+                    todo = [i for i in chunk if i not in cached]
+                    extracted.update(zip(todo, self._extract_parallel(executor, workers, pdf_path, todo)))
+                    for i in chunk:
+                        if i in cached:
+                            hits += 1
+                            parts.append(cached[i])
+                        else:
+                            parts.append(extracted[i])
+                        total += len(parts[-1])
+                        if max_chars is not None and total >= max_chars:
+                            return "".join(parts)[:max_chars]
+            return "".join(parts)
+        finally:
+            self._cache_store(key, num_pages, hits, extracted)
+
+    @staticmethod
+    def _extract_parallel(executor, workers, pdf_path, indices):
+        """
+        Reparte las páginas en bloques contiguos, uno por proceso
+
+        Returns:
+            Lista con el texto de cada página, en el orden original
+        """
+        if not indices:
+            return []
+        workers = min(workers, len(indices))
+        size, extra = divmod(len(indices), workers)
+
+        futures = []
+        start = 0
+        for i in range(workers):
+            end = start + size + (1 if i < extra else 0)
+            futures.append(executor.submit(_extract_pages, pdf_path, list(indices[start:end])))
+            start = end
+        return [text for future in futures for text in future.result()]
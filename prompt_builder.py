@@ -0,0 +1,259 @@
+"""
+Módulo para construir los prompts de generación de preguntas
+
+Ajusta el texto del documento al presupuesto de tokens de cada modelo y,
+cuando no cabe entero, lo resume quedándose con las frases más
+representativas según TF-IDF.
+"""
+
+import hashlib
+import math
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from text_chunks import split_sentences
+
+
+SYSTEM_PROMPT = "Eres un experto en educación que crea preguntas de evaluación de calidad."
+
+PROMPT_TEMPLATE = """Basándote en el siguiente texto, genera exactamente {num_questions} preguntas de opción múltiple con 4 opciones de respuesta cada una.
+
+TEXTO:
+{text}
+
+Genera las preguntas en formato JSON con la siguiente estructura:
+{{
+    "questions": [
+        {{
+            "pregunta": "texto de la pregunta",
+            "opciones": ["opción A", "opción B", "opción C", "opción D"],
+            "respuesta_correcta": 0,
+            "explicacion": "explicación de por qué es correcta"
+        }}
+    ]
+}}
+
+Asegúrate de que:
+1. Las preguntas sean claras y específicas sobre el tema
+2. Las opciones sean plausibles pero solo una sea correcta
+3. La respuesta correcta esté indicada por el índice (0-3)
+4. Las explicaciones sean educativas y cortas
+
+Responde SOLO con el JSON, sin explicaciones adicionales."""
+
+# Esquema JSON de la respuesta, para los modos de salida estructurada
+QUESTIONS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "questions": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "pregunta": {"type": "string"},
+                    "opciones": {"type": "array", "items": {"type": "string"}},
+                    "respuesta_correcta": {"type": "integer"},
+                    "explicacion": {"type": "string"},
+                },
+                "required": ["pregunta", "opciones", "respuesta_correcta", "explicacion"],
+            },
+        },
+    },
+    "required": ["questions"],
+}
+
+# Tokens de documento por modelo: ventana de contexto menos la salida y la
+# plantilla, con margen, y limitado para no encarecer cada llamada
+TOKEN_BUDGETS = {
+    "gemini-2.5-flash": 8000,
+    "gpt-3.5-turbo": 6000,
+    "claude-3-5-sonnet-20241022": 8000,
+}
+
+# Presupuesto para modelos no listados en TOKEN_BUDGETS
+PROVIDER_TOKEN_BUDGETS = {
+    "google": 8000,
+    "openai": 4000,
+    "anthropic": 8000,
+}
+
+DEFAULT_TOKEN_BUDGET = 2000
+
+# Tokens de salida aproximados por pregunta (enunciado, opciones y explicación)
+TOKENS_PER_QUESTION = 200
+
+# Caracteres por token en texto en español; estimación conservadora
+CHARS_PER_TOKEN = 3.5
+
+_WORD = re.compile(r"\w+")
+
+
+def strict_schema(schema: dict) -> dict:
+    """Copia del esquema con additionalProperties=False en cada objeto (modo estricto de OpenAI)"""
+    if not isinstance(schema, dict):
+        return schema
+    result = {key: strict_schema(value) if isinstance(value, dict) else value
+              for key, value in schema.items()}
+    if "properties" in result:
+        result["properties"] = {key: strict_schema(value) for key, value in schema["properties"].items()}
+    if result.get("type") == "object":
+        result["additionalProperties"] = False
+    return result
+
+
+# Campos del subconjunto de OpenAPI que acepta response_schema de Gemini
+_GEMINI_SCHEMA_FIELDS = {
+    "type", "format", "description", "nullable", "enum",
+    "items", "properties", "required", "minItems", "maxItems",
+}
+
+
+def gemini_schema(schema: dict) -> dict:
+    """Copia del esquema solo con los campos que admite Gemini (sin additionalProperties)"""
+    result = {}
+    for key, value in schema.items():
+        if key not in _GEMINI_SCHEMA_FIELDS:
+            continue
+        if key == "items":
+            value = gemini_schema(value)
+        elif key == "properties":
+            value = {name: gemini_schema(prop) for name, prop in value.items()}
+        result[key] = value
+    return result
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimación rápida del número de tokens de un texto, sin tokenizador"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def max_output_tokens(num_questions: int, minimum: int = 2000) -> int:
+    """Tokens de salida a reservar para num_questions preguntas"""
+    return max(minimum, num_questions * TOKENS_PER_QUESTION)
+
+
+# Textos ya comprimidos, por hash del texto y presupuesto: la clave no
+# retiene el documento, solo el resultado
+_COMPRESS_CACHE = OrderedDict()
+_COMPRESS_CACHE_SIZE = 32
+_compress_lock = threading.Lock()
+
+
+def compress_text(text: str, max_tokens: int) -> str:
+    """
+    Reduce el texto a max_tokens conservando las frases más representativas
+
+    Cada frase se puntúa por su similitud coseno TF-IDF con el conjunto del
+    documento; se eligen las mejores hasta agotar el presupuesto y se
+    devuelven en su orden original.
+
+    Args:
+        text: Texto a comprimir
+        max_tokens: Presupuesto de tokens
+
+    Returns:
+        El texto original si cabe, o la selección de frases
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    key = (hashlib.sha256(text.encode("utf-8")).hexdigest(), max_tokens)
+    with _compress_lock:
+        result = _COMPRESS_CACHE.get(key)
+        if result is not None:
+            _COMPRESS_CACHE.move_to_end(key)
+            return result
+
+    result = _compress(text, max_tokens)
+
+    with _compress_lock:
+        _COMPRESS_CACHE[key] = result
+        while len(_COMPRESS_CACHE) > _COMPRESS_CACHE_SIZE:
+            _COMPRESS_CACHE.popitem(last=False)
+    return result
+
+
+def _compress(text: str, max_tokens: int) -> str:
+    sentences = split_sentences(text)
+    if len(sentences) < 2:
+        return text[:int(max_tokens * CHARS_PER_TOKEN)]
+
+    # Matriz dispersa frase x término en formato de coordenadas
+    vocabulary = {}
+    rows, cols = [], []
+    for i, sentence in enumerate(sentences):
+        for word in _WORD.findall(sentence.lower()):
+            rows.append(i)
+            cols.append(vocabulary.setdefault(word, len(vocabulary)))
+
+    scores = np.zeros(len(sentences))
+    if rows:
+        rows = np.array(rows)
+        cols = np.array(cols)
+        n = len(sentences)
+
+        # Frecuencia de cada (frase, término) y número de frases por término
+        pairs, tf = np.unique(rows * len(vocabulary) + cols, return_counts=True)
+        rows, cols = np.divmod(pairs, len(vocabulary))
+        df = np.bincount(cols, minlength=len(vocabulary))
+        idf = np.log((1 + n) / (1 + df)) + 1
+
+        weights = tf * idf[cols]
+        norms = np.sqrt(np.bincount(rows, weights ** 2, minlength=n))
+        norms[norms == 0] = 1
+        unit = weights / norms[rows]
+
+        centroid = np.bincount(cols, unit, minlength=len(vocabulary)) / n
+        scores = np.bincount(rows, unit * centroid[cols], minlength=n)
+
+    budget = max_tokens
+    selected = []
+    for i in np.argsort(-scores, kind="stable"):
+        cost = estimate_tokens(sentences[i]) + 1
+        if cost > budget:
+            continue
+        selected.append(i)
+        budget -= cost
+
+    return " ".join(sentences[i] for i in sorted(selected))
+
+
+class PromptBuilder:
+    """Construye prompts ajustados al presupuesto de tokens de un modelo"""
+
+    def __init__(self, provider: str = None, model_name: str = None, token_budget: int = None):
+        """
+        Inicializa el constructor de prompts
+
+        Args:
+            provider: Proveedor del modelo ("google", "openai", "anthropic")
+            model_name: Nombre del modelo
+            token_budget: Tokens de documento (por defecto, según el modelo)
+        """
+        self.provider = provider
+        self.model_name = model_name
+        self.token_budget = token_budget or TOKEN_BUDGETS.get(
+            model_name,
+            PROVIDER_TOKEN_BUDGETS.get(provider, DEFAULT_TOKEN_BUDGET)
+        )
+
+    def build(self, text: str, num_questions: int = 5, avoid=None) -> str:
+        """
+        Construye el prompt con el texto comprimido al presupuesto
+
+        Args:
+            text: Texto del documento
+            num_questions: Número de preguntas a pedir
+            avoid: Enunciados ya generados que el modelo no debe repetir
+        """
+        prompt = PROMPT_TEMPLATE.format(
+            num_questions=num_questions,
+            text=compress_text(text, self.token_budget)
+        )
+        if avoid:
+            listado = "\n".join(f"- {pregunta}" for pregunta in avoid)
+            prompt += f"\n\nNo repitas ninguna de estas preguntas ya generadas:\n{listado}"
+        return prompt
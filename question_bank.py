@@ -0,0 +1,442 @@
+"""
+Banco de preguntas en SQLite con índice de texto completo (FTS5)
+
+Cada generación se guarda como una ejecución (documento, tema, proveedor,
+modelo y fecha) con sus preguntas. El texto de las preguntas, opciones y
+explicaciones se indexa con FTS5, sin distinguir mayúsculas ni tildes, y
+hay índices por documento, tema y fecha para filtrar sin recorrer la tabla.
+
+Sustituye a los ficheros .txt que la aplicación escribía en logs/.
+
+Uso:
+    python question_bank.py search mitocondria --tema biología --since 2024-01-01
+    python question_bank.py documents
+    python question_bank.py export biologia.qset --tema biología
+    python question_bank.py import-logs logs/
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import sqlite3
+import time
+from contextlib import closing
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, List, Tuple
+
+from question_model import Question, QuestionSet
+
+
+def file_hash(path) -> str:
+    """sha256 del contenido del fichero, leído por bloques"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _as_dict(question) -> dict:
+    """Diccionario de la pregunta, tanto si es una Question como si ya lo era"""
+    return question.to_dict() if isinstance(question, Question) else question
+
+
+def _match_expression(query: str) -> str:
+    """
+    Convierte el texto del usuario en una consulta FTS5 segura
+
+    Cada palabra se entrecomilla (así los caracteres especiales de FTS5 no
+    provocan errores) y se busca como prefijo; todas deben aparecer.
+    """
+    words = re.findall(r"\w+", query)
+    return " ".join(f'"{word}"*' for word in words)
+
+
+class QuestionBank:
+    """Banco de preguntas persistente, seguro entre hilos y procesos"""
+
+    def __init__(self, path: str = ".cache/preguntas.sqlite3"):
+        """
+        Inicializa el banco
+
+        Args:
+            path: Ruta de la base de datos SQLite
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(
+                "CREATE TABLE IF NOT EXISTS ejecuciones ("
+                " id INTEGER PRIMARY KEY,"
+                " pdf_hash TEXT NOT NULL,"
+                " pdf TEXT NOT NULL DEFAULT '',"
+                " tema TEXT NOT NULL DEFAULT '',"
+                " proveedor TEXT NOT NULL DEFAULT '',"
+                " modelo TEXT NOT NULL DEFAULT '',"
+                " fecha REAL NOT NULL);"
+
+                "CREATE TABLE IF NOT EXISTS preguntas ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"  # los ids no se reutilizan al borrar
+                " ejecucion INTEGER NOT NULL REFERENCES ejecuciones(id),"
+                " pdf_hash TEXT NOT NULL,"
+                " tema TEXT NOT NULL COLLATE NOCASE,"
+                " fecha REAL NOT NULL,"
+                " pregunta TEXT NOT NULL,"
+                " opciones TEXT NOT NULL,"
+                " respuesta INTEGER NOT NULL,"
+                " explicacion TEXT NOT NULL DEFAULT '');"
+
+                "CREATE INDEX IF NOT EXISTS idx_preguntas_documento ON preguntas(pdf_hash, fecha);"
+                "CREATE INDEX IF NOT EXISTS idx_preguntas_tema ON preguntas(tema, fecha);"
+                "CREATE INDEX IF NOT EXISTS idx_preguntas_fecha ON preguntas(fecha);"
+                "CREATE INDEX IF NOT EXISTS idx_preguntas_ejecucion ON preguntas(ejecucion);"
+
+                # Índice de texto externo: el texto vive en preguntas y los
+                # disparadores mantienen el índice sincronizado
+                "CREATE VIRTUAL TABLE IF NOT EXISTS preguntas_fts USING fts5("
+                " pregunta, opciones, explicacion,"
+                " content='preguntas', content_rowid='id',"
+                " tokenize='unicode61 remove_diacritics 2');"
+
+                "CREATE TRIGGER IF NOT EXISTS preguntas_ai AFTER INSERT ON preguntas BEGIN"
+                " INSERT INTO preguntas_fts (rowid, pregunta, opciones, explicacion)"
+                " VALUES (new.id, new.pregunta, new.opciones, new.explicacion);"
+                " END;"
+
+                "CREATE TRIGGER IF NOT EXISTS preguntas_ad AFTER DELETE ON preguntas BEGIN"
+                " INSERT INTO preguntas_fts (preguntas_fts, rowid, pregunta, opciones, explicacion)"
+                " VALUES ('delete', old.id, old.pregunta, old.opciones, old.explicacion);"
+                " END;"
+            )
+
+    def add(self, questions: List[dict], pdf_hash: str, provider: str = "", model: str = "",
+            tema: str = "", pdf: str = "", fecha: float = None) -> int:
+        """
+        Guarda las preguntas de una generación en una sola transacción
+
+        Args:
+            questions: Preguntas tal como las devuelve el generador, o Question
+            pdf_hash: sha256 del PDF de origen (ver file_hash)
+            provider: Proveedor que las generó
+            model: Modelo que las generó
+            tema: Tema indicado por el usuario
+            pdf: Nombre o ruta del PDF, solo informativo
+            fecha: Instante de la generación (por defecto, ahora)
+
+        Returns:
+            Identificador de la ejecución
+        """
+        with closing(self._connect()) as conn, conn:
+            return self._insert(conn, questions, pdf_hash, provider, model, tema, pdf, fecha)
+
+    def add_many(self, runs: Iterable[dict]) -> int:
+        """
+        Guarda muchas generaciones en una sola transacción
+
+        Args:
+            runs: Diccionarios con los argumentos de add() ("questions",
+                "pdf_hash" y, opcionalmente, "provider", "model", "tema",
+                "pdf" y "fecha")
+
+        Returns:
+            Número de ejecuciones guardadas
+        """
+        count = 0
+        with closing(self._connect()) as conn, conn:
+            for run in runs:
+                self._insert(conn, **run)
+                count += 1
+        return count
+
+    def search(self, query: str = "", pdf_hash: str = None, tema: str = None,
+               provider: str = None, since: float = None, until: float = None,
+               limit: int = 50) -> List[dict]:
+        """
+        Busca preguntas por texto y las filtra por documento, tema, proveedor y fecha
+
+        Args:
+            query: Palabras a buscar en pregunta, opciones y explicación; sin
+                texto se devuelven las más recientes
+            pdf_hash: Solo preguntas de este documento
+            tema: Solo preguntas de este tema (sin distinguir mayúsculas)
+            provider: Solo preguntas de este proveedor
+            since: Solo preguntas generadas desde este instante (segundos epoch)
+            until: Solo preguntas generadas antes de este instante
+            limit: Número máximo de resultados (None, sin límite)
+
+        Returns:
+            Preguntas con el formato del generador más "id", "pdf_hash",
+            "pdf", "tema", "proveedor", "modelo" y "fecha"
+        """
+        conditions = []
+        params = []
+        match = _match_expression(query or "")
+        if match:
+            conditions.append("preguntas_fts MATCH ?")
+            params.append(match)
+        for column, value in (("p.pdf_hash", pdf_hash), ("p.tema", tema), ("e.proveedor", provider)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            conditions.append("p.fecha >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("p.fecha < ?")
+            params.append(until)
+
+        sql = (
+            "SELECT p.id, p.pregunta, p.opciones, p.respuesta, p.explicacion, p.pdf_hash,"
+            " e.pdf, p.tema, e.proveedor, e.modelo, p.fecha"
+            " FROM preguntas p JOIN ejecuciones e ON e.id = p.ejecucion"
+        )
+        if match:
+            sql += " JOIN preguntas_fts ON preguntas_fts.rowid = p.id"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY " + ("bm25(preguntas_fts), " if match else "") + "p.fecha DESC LIMIT ?"
+        params.append(-1 if limit is None else limit)
+
+        with closing(self._connect()) as conn:
+            rows = conn.execute(sql, params).fetchall()
+
+        return [
+            {
+                "id": row[0],
+                "pregunta": row[1],
+                "opciones": json.loads(row[2]),
+                "respuesta_correcta": row[3],
+                "explicacion": row[4],
+                "pdf_hash": row[5],
+                "pdf": row[6],
+                "tema": row[7],
+                "proveedor": row[8],
+                "modelo": row[9],
+                "fecha": row[10],
+            }
+            for row in rows
+        ]
+
+    def export(self, path, query: str = "", pdf_hash: str = None, tema: str = None,
+               since: float = None, until: float = None) -> Tuple[int, List[Tuple[int, str]]]:
+        """
+        Guarda las preguntas que encuentra search() en un fichero .qset o .jsonl
+
+        Las filas que no forman una pregunta válida (p. ej. las importadas de
+        un log con una sola opción) se omiten en lugar de abortar la
+        exportación. Se escriben de la más antigua a la más reciente.
+
+        Returns:
+            Número de preguntas exportadas y pares (id, motivo) de las omitidas
+        """
+        results = self.search(query, pdf_hash, tema, since=since, until=until, limit=None)
+        questions = QuestionSet()
+        skipped = []
+        for row in reversed(results):
+            try:
+                questions.append(row)
+            except ValueError as e:
+                skipped.append((row["id"], str(e)))
+        questions.save(path)
+        return len(questions), skipped
+
+    def documents(self) -> List[dict]:
+        """Documentos del banco con su número de preguntas y la última generación"""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT e.pdf_hash, MAX(e.pdf), COUNT(p.id), MAX(e.fecha)"
+                " FROM ejecuciones e LEFT JOIN preguntas p ON p.ejecucion = e.id"
+                " GROUP BY e.pdf_hash ORDER BY MAX(e.fecha) DESC"
+            ).fetchall()
+        return [{"pdf_hash": r[0], "pdf": r[1], "preguntas": r[2], "ultima": r[3]} for r in rows]
+
+    def count(self) -> int:
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COUNT(*) FROM preguntas").fetchone()[0]
+
+    def question_ids(self) -> List[int]:
+        """Identificadores de todas las preguntas guardadas, en orden"""
+        with closing(self._connect()) as conn:
+            return [row[0] for row in conn.execute("SELECT id FROM preguntas ORDER BY id")]
+
+    def questions_after(self, last_id: int = 0) -> List[Tuple[int, dict]]:
+        """
+        Preguntas guardadas después de last_id, para mantener índices al día
+
+        Returns:
+            Pares (id, pregunta) en orden de id
+        """
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT id, pregunta, opciones, respuesta, explicacion FROM preguntas"
+                " WHERE id > ? ORDER BY id",
+                (last_id,)
+            ).fetchall()
+        return [
+            (row[0], {"pregunta": row[1], "opciones": json.loads(row[2]),
+                      "respuesta_correcta": row[3], "explicacion": row[4]})
+            for row in rows
+        ]
+
+    def delete_document(self, pdf_hash: str) -> int:
+        """Elimina todas las preguntas de un documento; devuelve cuántas había"""
+        with closing(self._connect()) as conn, conn:
+            removed = conn.execute("DELETE FROM preguntas WHERE pdf_hash = ?", (pdf_hash,)).rowcount
+            conn.execute("DELETE FROM ejecuciones WHERE pdf_hash = ?", (pdf_hash,))
+        return removed
+
+    @staticmethod
+    def _insert(conn, questions, pdf_hash, provider="", model="", tema="", pdf="", fecha=None) -> int:
+        fecha = time.time() if fecha is None else fecha
+        tema = tema or ""
+        run_id = conn.execute(
+            "INSERT INTO ejecuciones (pdf_hash, pdf, tema, proveedor, modelo, fecha)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (pdf_hash, pdf or "", tema, provider or "", model or "", fecha)
+        ).lastrowid
+        conn.executemany(
+            "INSERT INTO preguntas"
+            " (ejecucion, pdf_hash, tema, fecha, pregunta, opciones, respuesta, explicacion)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (run_id, pdf_hash, tema, fecha, q.get("pregunta", ""),
+                 json.dumps(q.get("opciones", []), ensure_ascii=False),
+                 int(q.get("respuesta_correcta", 0)), q.get("explicacion", ""))
+                for q in map(_as_dict, questions)
+            ]
+        )
+        return run_id
+
+    def _connect(self):
+        # Una conexión por operación: el banco se usa desde varios hilos y procesos
+        conn = sqlite3.connect(self.path, timeout=30)
+        # Con WAL basta sincronizar en los puntos de control: cada commit es barato
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+
+_LOG_QUESTION = re.compile(
+    r"PREGUNTA \d+\n(?P<pregunta>.*?)\n\n(?P<opciones>(?:  [A-Z]\) [^\n]*\n)+)"
+    r"\nRespuesta: (?P<respuesta>[A-Z])\n(?P<explicacion>.*?)\n\n-{70}",
+    re.S
+)
+
+
+def parse_log(path) -> dict:
+    """
+    Lee un fichero preguntas_*.txt del antiguo logs/
+
+    Returns:
+        Argumentos para QuestionBank.add(); el hash es el del PDF si aún
+        existe en la ruta guardada y, si no, el de la propia ruta
+    """
+    content = Path(path).read_text(encoding="utf-8")
+    pdf = re.search(r"^PDF: (.*)$", content, re.M).group(1).strip()
+    fecha = re.search(r"^Fecha: (.*)$", content, re.M).group(1).strip()
+
+    questions = []
+    for match in _LOG_QUESTION.finditer(content):
+        options = [line.strip()[3:] for line in match.group("opciones").splitlines()]
+        questions.append({
+            "pregunta": match.group("pregunta").strip(),
+            "opciones": options,
+            "respuesta_correcta": ord(match.group("respuesta")) - 65,
+            "explicacion": match.group("explicacion").strip(),
+        })
+
+    try:
+        pdf_hash = file_hash(pdf)
+    except OSError:
+        pdf_hash = hashlib.sha256(pdf.encode("utf-8")).hexdigest()
+
+    return {
+        "questions": questions,
+        "pdf_hash": pdf_hash,
+        "pdf": Path(pdf).name,
+        "fecha": datetime.fromisoformat(fecha).timestamp(),
+    }
+
+
+def _timestamp(value: str) -> float:
+    return datetime.fromisoformat(value).timestamp()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Banco de preguntas")
+    parser.add_argument("--db", default=".cache/preguntas.sqlite3", help="Base de datos del banco")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    search = commands.add_parser("search", help="Buscar preguntas")
+    search.add_argument("query", nargs="?", default="")
+    search.add_argument("--pdf", help="Solo preguntas de este PDF (ruta o hash)")
+    search.add_argument("--tema")
+    search.add_argument("--provider")
+    search.add_argument("--since", type=_timestamp, help="Fecha ISO, p. ej. 2024-01-31")
+    search.add_argument("--until", type=_timestamp, help="Fecha ISO, p. ej. 2024-02-28")
+    search.add_argument("--limit", type=int, default=20)
+    search.add_argument("--json", action="store_true", help="Salida en JSON")
+
+    commands.add_parser("documents", help="Listar los documentos del banco")
+
+    export = commands.add_parser("export", help="Exportar preguntas a un fichero .qset o .jsonl")
+    export.add_argument("output")
+    export.add_argument("query", nargs="?", default="")
+    export.add_argument("--pdf", help="Solo preguntas de este PDF (ruta o hash)")
+    export.add_argument("--tema")
+    export.add_argument("--since", type=_timestamp)
+    export.add_argument("--until", type=_timestamp)
+
+    importer = commands.add_parser("import-logs", help="Importar los .txt del antiguo logs/")
+    importer.add_argument("directory", nargs="?", default="logs")
+
+    args = parser.parse_args()
+    bank = QuestionBank(args.db)
+
+    pdf_hash = getattr(args, "pdf", None)
+    if pdf_hash and Path(pdf_hash).is_file():
+        pdf_hash = file_hash(pdf_hash)
+
+    if args.command == "search":
+        results = bank.search(args.query, pdf_hash, args.tema, args.provider,
+                              args.since, args.until, args.limit)
+        if args.json:
+            print(json.dumps(results, ensure_ascii=False, indent=2))
+            return
+        for q in results:
+            fecha = datetime.fromtimestamp(q["fecha"]).strftime("%Y-%m-%d %H:%M")
+            print(f"❓ {q['pregunta']}")
+            for idx, opcion in enumerate(q["opciones"]):
+                mark = "✓" if idx == q["respuesta_correcta"] else " "
+                print(f"   {mark} {chr(65 + idx)}) {opcion}")
+            print(f"   📄 {q['pdf'] or q['pdf_hash'][:12]} · {q['tema'] or 'sin tema'} · "
+                  f"{q['proveedor'] or '—'} · {fecha}\n")
+        print(f"🔎 {len(results)} resultados")
+    elif args.command == "export":
+        exported, skipped = bank.export(args.output, args.query, pdf_hash, args.tema,
+                                        args.since, args.until)
+        for question_id, reason in skipped:
+            print(f"⚠️  Pregunta {question_id} omitida: {reason}")
+        print(f"💾 {exported} preguntas exportadas a {args.output}")
+    elif args.command == "documents":
+        for doc in bank.documents():
+            fecha = datetime.fromtimestamp(doc["ultima"]).strftime("%Y-%m-%d %H:%M")
+            print(f"📄 {doc['pdf'] or '—'}  {doc['pdf_hash'][:12]}  "
+                  f"{doc['preguntas']} preguntas  (última: {fecha})")
+    elif args.command == "import-logs":
+        paths = sorted(Path(args.directory).glob("preguntas_*.txt"))
+        runs = []
+        for path in paths:
+            try:
+                runs.append(parse_log(path))
+            except (AttributeError, ValueError, OSError) as e:
+                print(f"⚠️  {path.name}: {e}")
+        imported = bank.add_many(runs)
+        print(f"✅ {imported} ejecuciones importadas de {len(paths)} ficheros")
+
+
+if __name__ == "__main__":
+    main()
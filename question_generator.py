@@ -1,16 +1,67 @@
 """
 Módulo para generar preguntas usando modelos de IA
-Soporta: Google Gemini, OpenAI GPT, Anthropic Claude
+Soporta: Google Gemini, OpenAI GPT, Anthropic Claude y un generador local sin red
 """
 import os
-from typing import List
+import asyncio
+import contextvars
+import copy
+import threading
+import time
+import weakref
+from typing import Iterator, List
 from abc import ABC, abstractmethod
 import json
 
+import telemetry
+from prompt_builder import (
+    PromptBuilder, QUESTIONS_SCHEMA, SYSTEM_PROMPT, estimate_tokens, gemini_schema, max_output_tokens,
+    strict_schema
+)
+from json_stream import QuestionStreamParser, salvage_questions, validate_question
+
+
+class _PerLoop:
+    """
+    Un objeto por bucle de eventos, creado la primera vez que se pide en él
+
+    Los clientes asíncronos de los SDK quedan ligados al bucle en que se
+    usan por primera vez. Los generadores se comparten entre hilos
+    (generator_registry) y cada llamada síncrona a los envoltorios
+    paralelos ejecuta su propio bucle con asyncio.run, así que cada bucle
+    necesita su cliente; el de un bucle que ya no existe se libera con él.
+    """
+    
+    def __init__(self, factory):
+        self._factory = factory
+        self._objects = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+    
+    def get(self):
+        """Objeto del bucle en curso (se llama desde una corrutina)"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            obj = self._objects.get(loop)
+            if obj is None:
+                obj = self._factory()
+                self._objects[loop] = obj
+            return obj
+
+
+# Cuota del intento en curso, que fija RateLimitedGenerator (rate_limiter.py):
+# cada llamada al proveedor la consulta antes de hacerse, así que también
+# pagan su parte las que pide el propio generador (las preguntas que faltan)
+request_quota = contextvars.ContextVar("request_quota", default=None)
+
 
 class QuestionGenerator(ABC):
     """Clase base abstracta para generadores de preguntas"""
     
+    # Identificadores del proveedor y del modelo (los fijan las subclases)
+    provider = None
+    model_name = None
+    prompt_builder = None
+    
     @abstractmethod
     def generate_questions(self, text: str, num_questions: int = 5) -> List[dict]:
         """
@@ -24,227 +75,605 @@ class QuestionGenerator(ABC):
             Lista de diccionarios con preguntas y respuestas
         """
         pass
+    
+    async def generate_questions_async(self, text: str, num_questions: int = 5) -> List[dict]:
+        """
+        Versión asíncrona de generate_questions
+        
+        Por defecto ejecuta generate_questions en un hilo; los proveedores
+        la sobrescriben con los clientes asíncronos de su SDK.
+        """
+        return await asyncio.to_thread(self.generate_questions, text, num_questions)
+    
+    def generate_questions_stream(self, text: str, num_questions: int = 5) -> Iterator[dict]:
+        """
+        Genera las preguntas una a una, a medida que el modelo las escribe
+        
+        Por defecto espera a la respuesta completa; los proveedores la
+        sobrescriben con la API de streaming de su SDK.
+        
+        Yields:
+            Diccionario de cada pregunta en cuanto está completa
+        """
+        yield from self.generate_questions(text, num_questions)
+    
+    def warm_up(self):
+        """
+        Abre la conexión con el proveedor antes de la primera petición
+        
+        Por defecto no hace nada; los proveedores hacen una llamada barata
+        para que la negociación TLS no se pague al generar preguntas.
+        """
+        pass
+    
+    def build_prompt(self, text: str, num_questions: int = 5, avoid: List[str] = None) -> str:
+        """
+        Construye el prompt exacto que se enviará al modelo
+        
+        Args:
+            text: Texto del tema
+            num_questions: Número de preguntas a generar
+            avoid: Enunciados ya generados que no se deben repetir
+            
+        Returns:
+            String con el prompt
+        """
+        if self.prompt_builder is None:
+            self.prompt_builder = PromptBuilder(self.provider, self.model_name)
+        with telemetry.span("prompt.build", provider=self.provider) as span:
+            prompt = self.prompt_builder.build(text, num_questions, avoid)
+            if span:
+                span.set(text_chars=len(text), prompt_chars=len(prompt),
+                         tokens_in=estimate_tokens(prompt))
+            return prompt
+    
+    def _complete(self, text: str, num_questions: int, request) -> List[dict]:
+        """
+        Pide las preguntas y completa las que falten
+        
+        Si la respuesta trae menos preguntas válidas de las pedidas (JSON
+        cortado, objetos mal formados), se vuelven a pedir solo las que
+        faltan, una vez, indicando las que ya se tienen.
+        
+        Args:
+            request: Función (prompt, num_questions) que devuelve la
+                respuesta del modelo
+        """
+        questions = self._call(request, self.build_prompt(text, num_questions), num_questions)
+        missing = num_questions - len(questions)
+        if missing > 0:
+            prompt = self.build_prompt(text, missing, [q["pregunta"] for q in questions])
+            questions += self._call(request, prompt, missing)[:missing]
+        return questions[:num_questions]
+    
+    async def _complete_async(self, text: str, num_questions: int, request) -> List[dict]:
+        """Versión asíncrona de _complete; request es una corrutina"""
+        questions = await self._call_async(request, self.build_prompt(text, num_questions), num_questions)
+        missing = num_questions - len(questions)
+        if missing > 0:
+            prompt = self.build_prompt(text, missing, [q["pregunta"] for q in questions])
+            questions += (await self._call_async(request, prompt, missing))[:missing]
+        return questions[:num_questions]
+    
+    def _complete_stream(self, text: str, num_questions: int, stream, request) -> Iterator[dict]:
+        """
+        Versión en streaming de _complete
+        
+        Args:
+            stream: Función (prompt, num_questions) que devuelve los
+                fragmentos de texto de la respuesta
+            request: Función para pedir al final las preguntas que falten
+        """
+        delivered = []
+        prompt = self.build_prompt(text, num_questions)
+        self._reserve(prompt, num_questions)
+        # El análisis se hace a la vez que llegan los fragmentos: un único span
+        with telemetry.span("provider.stream", provider=self.provider, model=self.model_name) as span:
+            started = time.perf_counter()
+            for question in self._stream_questions(stream(prompt, num_questions)):
+                if len(delivered) < num_questions:
+                    if span and not delivered:
+                        span.set(first_question_ms=(time.perf_counter() - started) * 1000)
+                    delivered.append(question)
+                    yield question
+            if span:
+                span.set(questions=len(delivered))
+        
+        missing = num_questions - len(delivered)
+        if missing > 0:
+            prompt = self.build_prompt(text, missing, [q["pregunta"] for q in delivered])
+            yield from self._call(request, prompt, missing)[:missing]
+    
+    def _reserve(self, prompt: str, num_questions: int):
+        """Espera turno en la cuota del intento en curso, si la hay"""
+        quota = request_quota.get()
+        if quota is not None:
+            quota.acquire(estimate_tokens(prompt) + max_output_tokens(num_questions))
+    
+    async def _reserve_async(self, prompt: str, num_questions: int):
+        """Versión asíncrona de _reserve"""
+        quota = request_quota.get()
+        if quota is not None:
+            await quota.acquire_async(estimate_tokens(prompt) + max_output_tokens(num_questions))
+    
+    def _call(self, request, prompt: str, num_questions: int) -> List[dict]:
+        """Llama al proveedor y analiza la respuesta, midiendo cada etapa"""
+        self._reserve(prompt, num_questions)
+        with telemetry.span("provider.call", provider=self.provider, model=self.model_name) as span:
+            content = request(prompt, num_questions)
+            if span:
+                span.set(**self._response_size(content))
+        return self._parse(content)
+    
+    async def _call_async(self, request, prompt: str, num_questions: int) -> List[dict]:
+        """Versión asíncrona de _call"""
+        await self._reserve_async(prompt, num_questions)
+        with telemetry.span("provider.call", provider=self.provider, model=self.model_name) as span:
+            content = await request(prompt, num_questions)
+            if span:
+                span.set(**self._response_size(content))
+        return self._parse(content)
+    
+    def _parse(self, content) -> List[dict]:
+        with telemetry.span("response.parse", provider=self.provider) as span:
+            questions = self._parse_questions(content)
+            if span:
+                span.set(questions=len(questions))
+            return questions
+    
+    @staticmethod
+    def _response_size(content) -> dict:
+        """Bytes y tokens estimados de la respuesta del modelo"""
+        raw = content if isinstance(content, str) else json.dumps(content, ensure_ascii=False)
+        return {"response_bytes": len(raw.encode("utf-8")), "tokens_out": estimate_tokens(raw)}
+    
+    @staticmethod
+    def _stream_questions(fragments) -> Iterator[dict]:
+        """Convierte los fragmentos de texto de una respuesta en preguntas completas y válidas"""
+        parser = QuestionStreamParser()
+        for fragment in fragments:
+            if fragment:
+                for question in parser.feed(fragment):
+                    question = validate_question(question)
+                    if question is not None:
+                        yield question
+    
+    @staticmethod
+    def _parse_questions(content) -> List[dict]:
+        """
+        Extrae las preguntas válidas de la respuesta del modelo
+        
+        Acepta el JSON como texto o ya decodificado (llamadas a herramientas).
+        Si el texto no es JSON válido se rescatan los objetos completos, y
+        las preguntas con campos incorrectos se descartan.
+        """
+        if isinstance(content, str):
+            # Limpiar el contenido si contiene bloques de código
+            if "```json" in content:
+                content = content.split("```json")[1].split("```")[0]
+            elif "```" in content:
+                content = content.split("```")[1].split("```")[0]
+            
+            content = content.strip()
+            try:
+                content = json.loads(content)
+            except ValueError:
+                return salvage_questions(content)
+        
+        items = content.get("questions", []) if isinstance(content, dict) else content
+        if isinstance(items, str):
+            # Algunos modelos devuelven el array serializado dentro del campo
+            return QuestionGenerator._parse_questions(f'{{"questions": {items}}}')
+        if not isinstance(items, list):
+            return []
+        return [q for q in map(validate_question, items) if q is not None]
 
 
 class GoogleQuestionGenerator(QuestionGenerator):
     """Generador de preguntas usando Google Gemini API"""
     
-    def __init__(self, api_key: str = None):
+    provider = "google"
+    DEFAULT_MODEL = "gemini-2.5-flash"
+    
+    def __init__(self, api_key: str = None, model: str = None, token_budget: int = None):
         """
         Inicializa el generador con Google Gemini API
         
         Args:
-            api_key: Clave de API de Google (o variable de entorno GOOGLE_API_KEY)
+            api_key: Clave de API de Google (o variable de entorno GOOGLE_API_KEY);
+                GEMINI_API_ENDPOINT permite usar otro servidor
+            model: Nombre del modelo (por defecto, DEFAULT_MODEL)
+            token_budget: Tokens de documento por prompt (por defecto, según el modelo)
         """
         try:
             import google.generativeai as genai
+            from google.generativeai import client as genai_client
             self.api_key = api_key or os.getenv('GOOGLE_API_KEY')
-            genai.configure(api_key=self.api_key)
-            self.model = genai.GenerativeModel('gemini-2.5-flash')
+            self.model_name = model or self.DEFAULT_MODEL
+            self.prompt_builder = PromptBuilder(self.provider, self.model_name, token_budget)
+            
+            # genai.configure es global: con él, el último generador creado
+            # cambiaría la clave de todos los demás. Cada instancia tiene sus
+            # propios clientes y se los asigna al modelo.
+            self._clients = genai_client._ClientManager()
+            endpoint = os.getenv('GEMINI_API_ENDPOINT')
+            self._rest = bool(endpoint)
+            if endpoint:
+                # Servidor alternativo (p. ej. mock_llm_server.py), solo por REST
+                self._clients.configure(api_key=self.api_key, transport="rest",
+                                        client_options={"api_endpoint": endpoint})
+            else:
+                self._clients.configure(api_key=self.api_key)
+            self.model = genai.GenerativeModel(self.model_name)
+            self.model._client = self._clients.get_default_client("generative")
+            self._async_models = _PerLoop(self._new_async_model)
         except ImportError:
             raise ImportError("Se requiere instalar google-generativeai: pip install google-generativeai")
     
+    # Salida JSON nativa: el modelo solo puede responder con el esquema (en
+    # el subconjunto de OpenAPI de Gemini, que no admite additionalProperties)
+    GENERATION_CONFIG = {
+        "response_mime_type": "application/json",
+        "response_schema": gemini_schema(QUESTIONS_SCHEMA),
+    }
+    
     def generate_questions(self, text: str, num_questions: int = 5) -> List[dict]:
         """Genera preguntas usando Google Gemini"""
         try:
-            prompt = f"""Basándote en el siguiente texto, genera exactamente {num_questions} preguntas de opción múltiple con 4 opciones de respuesta cada una.
-
-TEXTO:
-{text[:3000]}
-
-Genera las preguntas en formato JSON con la siguiente estructura:
-{{
-    "questions": [
-        {{
-            "pregunta": "texto de la pregunta",
-            "opciones": ["opción A", "opción B", "opción C", "opción D"],
-            "respuesta_correcta": 0,
-            "explicacion": "explicación de por qué es correcta"
-        }}
-    ]
-}}
-
-Asegúrate de que:
-1. Las preguntas sean claras y específicas sobre el tema
-2. Las opciones sean plausibles pero solo una sea correcta
-3. La respuesta correcta esté indicada por el índice (0-3)
-4. Las explicaciones sean educativas y cortas
-
-Responde SOLO con el JSON, sin explicaciones adicionales."""
-
-            response = self.model.generate_content(prompt)
-            content = response.text
-            
-            # Limpiar el contenido si contiene bloques de código
-            if "```json" in content:
-                content = content.split("```json")[1].split("```")[0]
-            elif "```" in content:
-                content = content.split("```")[1].split("```")[0]
-            
-            # Remover caracteres de escape
-            content = content.strip()
-            
-            data = json.loads(content)
-            return data.get("questions", [])
+            return self._complete(text, num_questions, self._request)
         
         except Exception as e:
-            raise Exception(f"Error al generar preguntas con Google Gemini: {str(e)}")
+            raise Exception(f"Error al generar preguntas con Google Gemini: {str(e)}") from e
+    
+    def generate_questions_stream(self, text: str, num_questions: int = 5) -> Iterator[dict]:
+        """Genera preguntas usando Google Gemini en modo streaming"""
+        try:
+            yield from self._complete_stream(text, num_questions, self._request_stream, self._request)
+        
+        except Exception as e:
+            raise Exception(f"Error al generar preguntas con Google Gemini: {str(e)}") from e
+    
+    def warm_up(self):
+        """Consulta los datos del modelo para abrir la conexión"""
+        self._clients.get_default_client("model").get_model(name=f"models/{self.model_name}")
+    
+    async def generate_questions_async(self, text: str, num_questions: int = 5) -> List[dict]:
+        """Genera preguntas usando Google Gemini sin bloquear el bucle de eventos"""
+        try:
+            return await self._complete_async(text, num_questions, self._request_async)
+        
+        except Exception as e:
+            raise Exception(f"Error al generar preguntas con Google Gemini: {str(e)}") from e
+    
+    def _request(self, prompt: str, num_questions: int) -> str:
+        response = self.model.generate_content(prompt, generation_config=self.GENERATION_CONFIG)
+        return response.text
+    
+    def _new_async_model(self):
+        """Copia del modelo con un cliente asíncrono propio del bucle en curso"""
+        model = copy.copy(self.model)
+        # make_client y no get_default_client, que devolvería siempre el mismo
+        model._async_client = self._clients.make_client("generative_async")
+        return model
+    
+    async def _request_async(self, prompt: str, num_questions: int) -> str:
+        if self._rest:
+            # El SDK no tiene cliente asíncrono por REST: la llamada síncrona
+            # va a un hilo para no bloquear el bucle de eventos
+            return await asyncio.to_thread(self._request, prompt, num_questions)
+        model = self._async_models.get()
+        response = await model.generate_content_async(prompt, generation_config=self.GENERATION_CONFIG)
+        return response.text
+    
+    def _request_stream(self, prompt: str, num_questions: int) -> Iterator[str]:
+        response = self.model.generate_content(prompt, stream=True, generation_config=self.GENERATION_CONFIG)
+        # El último fragmento puede traer solo el motivo de fin, sin texto
+        return (chunk.text for chunk in response if chunk.parts)
 
 
 class OpenAIQuestionGenerator(QuestionGenerator):
     """Generador de preguntas usando OpenAI"""
     
-    def __init__(self, api_key: str = None):
+    provider = "openai"
+    DEFAULT_MODEL = "gpt-3.5-turbo"
+    
+    def __init__(self, api_key: str = None, model: str = None, token_budget: int = None):
         """
         Inicializa el generador con la API de OpenAI
         
         Args:
             api_key: Clave de API de OpenAI (o variable de entorno OPENAI_API_KEY)
+            model: Nombre del modelo (por defecto, DEFAULT_MODEL)
+            token_budget: Tokens de documento por prompt (por defecto, según el modelo)
         """
         try:
-            from openai import OpenAI
+            from openai import OpenAI, AsyncOpenAI
             self.api_key = api_key or os.getenv('OPENAI_API_KEY')
+            self.model_name = model or self.DEFAULT_MODEL
+            self.prompt_builder = PromptBuilder(self.provider, self.model_name, token_budget)
             self.client = OpenAI(api_key=self.api_key)
+            self._async_clients = _PerLoop(lambda: AsyncOpenAI(api_key=self.api_key))
         except ImportError:
             raise ImportError("Se requiere instalar openai: pip install openai")
     
+    # Modelos con salida estructurada (json_schema estricto); el resto usa
+    # el modo JSON, que garantiza JSON válido pero no el esquema
+    JSON_SCHEMA_MODELS = ("gpt-4o", "gpt-4.1", "gpt-5", "o1", "o3", "o4")
+    
+    def generate_questions_stream(self, text: str, num_questions: int = 5) -> Iterator[dict]:
+        """Genera preguntas usando OpenAI GPT en modo streaming"""
+        try:
+            yield from self._complete_stream(text, num_questions, self._request_stream, self._request)
+        
+        except Exception as e:
+            raise Exception(f"Error al generar preguntas con OpenAI: {str(e)}") from e
+    
+    def warm_up(self):
+        """Lista los modelos para abrir la conexión del pool HTTP"""
+        self.client.models.list()
+    
+    def _request_args(self, prompt: str, num_questions: int) -> dict:
+        """Parámetros comunes de la petición síncrona y asíncrona"""
+        return dict(
+            model=self.model_name,
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.7,
+            max_tokens=max_output_tokens(num_questions),
+            response_format=self._response_format()
+        )
+    
+    def _response_format(self) -> dict:
+        """Formato de respuesta según lo que admite el modelo"""
+        if self.model_name.startswith(self.JSON_SCHEMA_MODELS):
+            return {
+                "type": "json_schema",
+                "json_schema": {
+                    "name": "preguntas",
+                    "strict": True,
+                    "schema": strict_schema(QUESTIONS_SCHEMA)
+                }
+            }
+        return {"type": "json_object"}
+    
     def generate_questions(self, text: str, num_questions: int = 5) -> List[dict]:
         """Genera preguntas usando OpenAI GPT"""
         try:
-            prompt = f"""Basándote en el siguiente texto, genera exactamente {num_questions} preguntas de opción múltiple con 4 opciones de respuesta cada una.
-
-TEXTO:
-{text[:3000]}
-
-Genera las preguntas en formato JSON con la siguiente estructura:
-{{
-    "questions": [
-        {{
-            "pregunta": "texto de la pregunta",
-            "opciones": ["opción A", "opción B", "opción C", "opción D"],
-            "respuesta_correcta": 0,
-            "explicacion": "explicación de por qué es correcta"
-        }}
-    ]
-}}
-
-Asegúrate de que:
-1. Las preguntas sean claras y específicas sobre el tema
-2. Las opciones sean plausibles pero solo una sea correcta
-3. La respuesta correcta esté indicada por el índice (0-3)
-4. Las explicaciones sean educativas"""
-
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "Eres un experto en educación que crea preguntas de evaluación de calidad."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=2000
-            )
-            
-            # Extraer el contenido JSON de la respuesta
-            content = response.choices[0].message.content
-            
-            # Limpiar el contenido si contiene bloques de código
-            if "```json" in content:
-                content = content.split("```json")[1].split("```")[0]
-            elif "```" in content:
-                content = content.split("```")[1].split("```")[0]
-            
-            data = json.loads(content)
-            return data.get("questions", [])
+            return self._complete(text, num_questions, self._request)
         
         except Exception as e:
-            raise Exception(f"Error al generar preguntas con OpenAI: {str(e)}")
+            raise Exception(f"Error al generar preguntas con OpenAI: {str(e)}") from e
+    
+    async def generate_questions_async(self, text: str, num_questions: int = 5) -> List[dict]:
+        """Genera preguntas usando OpenAI GPT sin bloquear el bucle de eventos"""
+        try:
+            return await self._complete_async(text, num_questions, self._request_async)
+        
+        except Exception as e:
+            raise Exception(f"Error al generar preguntas con OpenAI: {str(e)}") from e
+    
+    def _request(self, prompt: str, num_questions: int) -> str:
+        response = self.client.chat.completions.create(**self._request_args(prompt, num_questions))
+        return response.choices[0].message.content
+    
+    async def _request_async(self, prompt: str, num_questions: int) -> str:
+        response = await self._async_clients.get().chat.completions.create(**self._request_args(prompt, num_questions))
+        return response.choices[0].message.content
+    
+    def _request_stream(self, prompt: str, num_questions: int) -> Iterator[str]:
+        stream = self.client.chat.completions.create(
+            **self._request_args(prompt, num_questions),
+            stream=True
+        )
+        return (chunk.choices[0].delta.content for chunk in stream if chunk.choices)
 
 
 class AnthropicQuestionGenerator(QuestionGenerator):
     """Generador de preguntas usando Anthropic Claude"""
     
-    def __init__(self, api_key: str = None):
+    provider = "anthropic"
+    DEFAULT_MODEL = "claude-3-5-sonnet-20241022"
+    
+    def __init__(self, api_key: str = None, model: str = None, token_budget: int = None):
         """
         Inicializa el generador con la API de Anthropic
         
         Args:
             api_key: Clave de API de Anthropic (o variable de entorno ANTHROPIC_API_KEY)
+            model: Nombre del modelo (por defecto, DEFAULT_MODEL)
+            token_budget: Tokens de documento por prompt (por defecto, según el modelo)
         """
         try:
-            from anthropic import Anthropic
+            from anthropic import Anthropic, AsyncAnthropic
             self.api_key = api_key or os.getenv('ANTHROPIC_API_KEY')
+            self.model_name = model or self.DEFAULT_MODEL
+            self.prompt_builder = PromptBuilder(self.provider, self.model_name, token_budget)
             self.client = Anthropic(api_key=self.api_key)
+            self._async_clients = _PerLoop(lambda: AsyncAnthropic(api_key=self.api_key))
         except ImportError:
             raise ImportError("Se requiere instalar anthropic: pip install anthropic")
     
+    # Herramienta que el modelo está obligado a usar: su entrada sigue el
+    # esquema de las preguntas (Claude no tiene un modo JSON propio)
+    TOOL_NAME = "registrar_preguntas"
+    
+    def generate_questions_stream(self, text: str, num_questions: int = 5) -> Iterator[dict]:
+        """Genera preguntas usando Anthropic Claude en modo streaming"""
+        try:
+            yield from self._complete_stream(text, num_questions, self._request_stream, self._request)
+        
+        except Exception as e:
+            raise Exception(f"Error al generar preguntas con Claude: {str(e)}") from e
+    
+    def warm_up(self):
+        """Lista los modelos para abrir la conexión del pool HTTP"""
+        self.client.models.list(limit=1)
+    
+    def _request_args(self, prompt: str, num_questions: int) -> dict:
+        """Parámetros comunes de la petición síncrona y asíncrona"""
+        return dict(
+            model=self.model_name,
+            max_tokens=max_output_tokens(num_questions),
+            system=SYSTEM_PROMPT,
+            messages=[
+                {"role": "user", "content": prompt}
+            ],
+            tools=[{
+                "name": self.TOOL_NAME,
+                "description": "Registra las preguntas de opción múltiple generadas",
+                "input_schema": QUESTIONS_SCHEMA
+            }],
+            tool_choice={"type": "tool", "name": self.TOOL_NAME}
+        )
+    
     def generate_questions(self, text: str, num_questions: int = 5) -> List[dict]:
         """Genera preguntas usando Anthropic Claude"""
         try:
-            prompt = f"""Basándote en el siguiente texto, genera exactamente {num_questions} preguntas de opción múltiple con 4 opciones de respuesta cada una.
-
-TEXTO:
-{text[:3000]}
-
-Genera las preguntas en formato JSON con la siguiente estructura:
-{{
-    "questions": [
-        {{
-            "pregunta": "texto de la pregunta",
-            "opciones": ["opción A", "opción B", "opción C", "opción D"],
-            "respuesta_correcta": 0,
-            "explicacion": "explicación de por qué es correcta"
-        }}
-    ]
-}}
-
-Asegúrate de que:
-1. Las preguntas sean claras y específicas sobre el tema
-2. Las opciones sean plausibles pero solo una sea correcta
-3. La respuesta correcta esté indicada por el índice (0-3)
-4. Las explicaciones sean educativas"""
-
-            response = self.client.messages.create(
-                model="claude-3-5-sonnet-20241022",
-                max_tokens=2000,
-                system="Eres un experto en educación que crea preguntas de evaluación de calidad.",
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
-            )
-            
-            content = response.content[0].text
-            
-            # Limpiar el contenido si contiene bloques de código
-            if "```json" in content:
-                content = content.split("```json")[1].split("```")[0]
-            elif "```" in content:
-                content = content.split("```")[1].split("```")[0]
-            
-            data = json.loads(content)
-            return data.get("questions", [])
+            return self._complete(text, num_questions, self._request)
+        
+        except Exception as e:
+            raise Exception(f"Error al generar preguntas con Claude: {str(e)}") from e
+    
+    async def generate_questions_async(self, text: str, num_questions: int = 5) -> List[dict]:
+        """Genera preguntas usando Anthropic Claude sin bloquear el bucle de eventos"""
+        try:
+            return await self._complete_async(text, num_questions, self._request_async)
         
         except Exception as e:
-            raise Exception(f"Error al generar preguntas con Claude: {str(e)}")
+            raise Exception(f"Error al generar preguntas con Claude: {str(e)}") from e
+    
+    @staticmethod
+    def _response_content(response):
+        """Entrada de la llamada a la herramienta, o el texto si el modelo no la usó"""
+        for block in response.content:
+            if block.type == "tool_use":
+                return block.input
+        return "".join(block.text for block in response.content if block.type == "text")
+    
+    def _request(self, prompt: str, num_questions: int):
+        response = self.client.messages.create(**self._request_args(prompt, num_questions))
+        return self._response_content(response)
+    
+    async def _request_async(self, prompt: str, num_questions: int):
+        response = await self._async_clients.get().messages.create(**self._request_args(prompt, num_questions))
+        return self._response_content(response)
+    
+    def _request_stream(self, prompt: str, num_questions: int) -> Iterator[str]:
+        with self.client.messages.stream(**self._request_args(prompt, num_questions)) as stream:
+            # La entrada de la herramienta llega como fragmentos de JSON
+            for event in stream:
+                if event.type == "input_json":
+                    yield event.partial_json
+                elif event.type == "text":
+                    yield event.text
 
 
-def create_generator(provider: str = "google", api_key: str = None) -> QuestionGenerator:
+def create_generator(provider: str = "google", api_key: str = None, model: str = None,
+                     providers: List[str] = None) -> QuestionGenerator:
     """
     Crea un generador de preguntas según el proveedor especificado
     
     Args:
-        provider: "google", "openai" o "anthropic"
+        provider: "google", "openai", "anthropic", "local", "hedged" o "failover"
         api_key: Clave de API (opcional, se lee del entorno si no se proporciona)
+        model: Nombre del modelo (opcional, cada proveedor tiene uno por defecto)
+        providers: Proveedores que combinan "hedged" y "failover", en orden de
+            preferencia (por defecto, las variables de entorno HEDGED_PROVIDERS
+            y FAILOVER_PROVIDERS)
         
     Returns:
         Instancia del generador de preguntas
+        
+    Raises:
+        ValueError: Si el proveedor no existe, o si se pasa api_key o model a
+            "hedged" o "failover" (cada proveedor que combinan usa los suyos)
     """
     provider = provider.lower()
     
-    if provider == "google":
-        return GoogleQuestionGenerator(api_key)
+    if provider in ("hedged", "failover") and (api_key or model):
+        raise ValueError(f"'{provider}' combina varios proveedores: no admite api_key ni model, "
+                         "cada uno usa su clave y su modelo por defecto")
+    
+    if provider == "hedged":
+        from hedged_generator import HedgedQuestionGenerator
+        providers = providers or os.getenv('HEDGED_PROVIDERS', 'google,openai').split(',')
+        return HedgedQuestionGenerator([create_generator(p.strip()) for p in providers])
+    elif provider == "failover":
+        from failover_generator import FailoverQuestionGenerator
+        # El generador local va al final: responde siempre, aunque no haya red
+        providers = providers or os.getenv('FAILOVER_PROVIDERS', 'google,openai,anthropic,local').split(',')
+        generators = []
+        for name in providers:
+            try:
+                generators.append(create_generator(name.strip()))
+            except Exception as e:
+                # Un proveedor sin SDK o sin clave no debe impedir usar los demás
+                print(f"⚠️  Proveedor {name} no disponible: {e}")
+        return FailoverQuestionGenerator(generators)
+    elif provider == "google":
+        return GoogleQuestionGenerator(api_key, model)
     elif provider == "openai":
-        return OpenAIQuestionGenerator(api_key)
+        return OpenAIQuestionGenerator(api_key, model)
     elif provider == "anthropic":
-        return AnthropicQuestionGenerator(api_key)
+        return AnthropicQuestionGenerator(api_key, model)
+    elif provider == "local":
+        from local_generator import LocalQuestionGenerator
+        return LocalQuestionGenerator()
     else:
-        raise ValueError(f"Proveedor no soportado: {provider}. Usa 'google', 'openai' o 'anthropic'")
+        raise ValueError(f"Proveedor no soportado: {provider}. Usa 'google', 'openai', 'anthropic', 'local', 'hedged' o 'failover'")
+
+
+async def generate_many_async(generator: QuestionGenerator, texts: List[str],
+                              num_questions: int = 5, max_concurrency: int = 20,
+                              return_exceptions: bool = False) -> list:
+    """
+    Genera preguntas para muchos textos en el mismo bucle de eventos
+    
+    Args:
+        generator: Generador a utilizar
+        texts: Textos para los que generar preguntas
+        num_questions: Número de preguntas por texto
+        max_concurrency: Máximo de peticiones en curso a la vez
+        return_exceptions: Si es True, los errores se devuelven en la lista;
+            si es False, el primer error se propaga y se cancelan las
+            peticiones que sigan pendientes
+        
+    Returns:
+        Lista con el resultado de cada texto, en el mismo orden
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    
+    async def run(text):
+        async with semaphore:
+            return await generator.generate_questions_async(text, num_questions)
+    
+    tasks = [asyncio.ensure_future(run(text)) for text in texts]
+    try:
+        return await asyncio.gather(*tasks, return_exceptions=return_exceptions)
+    except BaseException:
+        # gather no cancela las demás tareas al propagar un error
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+def run_sync(coroutine_function, *args):
+    """
+    Ejecuta una corrutina desde código síncrono, en un bucle de eventos propio
+    
+    Cada llamada crea y cierra su bucle. Los generadores de los proveedores
+    crean sus clientes asíncronos por bucle (_PerLoop), así que un mismo
+    generador compartido sirve en llamadas sucesivas y desde varios hilos.
+    
+    Raises:
+        RuntimeError: Si se llama desde un bucle de eventos en marcha, que
+            quedaría bloqueado; ahí hay que usar la versión asíncrona
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine_function(*args))
+    raise RuntimeError("Llamada síncrona desde un bucle de eventos: usa generate_questions_async")
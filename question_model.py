@@ -0,0 +1,325 @@
+"""
+Modelo tipado de las preguntas y contenedor compacto para colecciones grandes
+
+Question valida una pregunta al crearla (al analizar la respuesta del
+modelo, al leer un fichero...) y usa __slots__, así que no arrastra un
+diccionario por instancia. QuestionSet guarda muchas preguntas por
+columnas: todos los textos en un único bloque UTF-8 con un array de
+desplazamientos y las respuestas en un array de bytes, sin un objeto de
+Python por pregunta. Se serializa en un formato binario que se carga con
+unas pocas lecturas, o en JSONL (una pregunta por línea) para intercambio.
+
+Los diccionarios {"pregunta", "opciones", "respuesta_correcta",
+"explicacion"} siguen siendo el formato de las cachés, del servicio HTTP
+y de los esquemas JSON de los proveedores; to_dict/from_dict convierten.
+"""
+
+import json
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from pathlib import Path
+from typing import Iterable, Iterator, List
+
+MAX_OPCIONES = 26
+
+
+class Question:
+    """Pregunta de opción múltiple validada e inmutable"""
+
+    __slots__ = ("pregunta", "opciones", "respuesta_correcta", "explicacion")
+
+    def __init__(self, pregunta: str, opciones, respuesta_correcta: int, explicacion: str = ""):
+        """
+        Crea la pregunta comprobando sus campos
+
+        Raises:
+            ValueError: Si el enunciado está vacío, hay menos de 2 opciones
+                (o más de 26) o la respuesta no es el índice de una opción
+        """
+        if not isinstance(pregunta, str) or not pregunta.strip():
+            raise ValueError("La pregunta no tiene enunciado")
+        opciones = tuple(str(opcion) for opcion in opciones)
+        if not 2 <= len(opciones) <= MAX_OPCIONES:
+            raise ValueError(f"Se esperaban entre 2 y {MAX_OPCIONES} opciones y hay {len(opciones)}")
+        if isinstance(respuesta_correcta, bool) or not isinstance(respuesta_correcta, int):
+            raise ValueError(f"Respuesta correcta no válida: {respuesta_correcta!r}")
+        if not 0 <= respuesta_correcta < len(opciones):
+            raise ValueError(f"La respuesta {respuesta_correcta} no es ninguna de las {len(opciones)} opciones")
+
+        set_ = object.__setattr__
+        set_(self, "pregunta", pregunta.strip())
+        set_(self, "opciones", opciones)
+        set_(self, "respuesta_correcta", respuesta_correcta)
+        set_(self, "explicacion", explicacion if isinstance(explicacion, str) else str(explicacion))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Las preguntas son inmutables")
+
+    @classmethod
+    def from_dict(cls, raw) -> "Question":
+        """
+        Crea la pregunta a partir del diccionario que devuelven los modelos
+
+        Acepta la respuesta correcta como índice, como número en texto o como
+        letra ("B"), y descarta los campos desconocidos.
+
+        Raises:
+            ValueError: Si el diccionario no describe una pregunta válida
+        """
+        if not isinstance(raw, dict):
+            raise ValueError("La pregunta no es un objeto JSON")
+        opciones = raw.get("opciones")
+        if not isinstance(opciones, list) or not all(
+            isinstance(opcion, (str, int, float)) and not isinstance(opcion, bool) for opcion in opciones
+        ):
+            raise ValueError("Las opciones deben ser una lista de textos")
+
+        respuesta = raw.get("respuesta_correcta", 0)
+        if isinstance(respuesta, str):
+            respuesta = respuesta.strip().upper()
+            if respuesta.isdigit():
+                respuesta = int(respuesta)
+            elif len(respuesta) == 1 and "A" <= respuesta <= "Z":
+                respuesta = ord(respuesta) - ord("A")
+
+        return cls(raw.get("pregunta"), opciones, respuesta, raw.get("explicacion", ""))
+
+    def to_dict(self) -> dict:
+        return {
+            "pregunta": self.pregunta,
+            "opciones": list(self.opciones),
+            "respuesta_correcta": self.respuesta_correcta,
+            "explicacion": self.explicacion,
+        }
+
+    @property
+    def respuesta(self) -> str:
+        """Texto de la opción correcta"""
+        return self.opciones[self.respuesta_correcta]
+
+    @property
+    def letra(self) -> str:
+        """Letra de la opción correcta ("A", "B"...)"""
+        return chr(65 + self.respuesta_correcta)
+
+    def __eq__(self, other):
+        if not isinstance(other, Question):
+            return NotImplemented
+        return (self.pregunta, self.opciones, self.respuesta_correcta, self.explicacion) == \
+            (other.pregunta, other.opciones, other.respuesta_correcta, other.explicacion)
+
+    def __hash__(self):
+        return hash((self.pregunta, self.opciones, self.respuesta_correcta, self.explicacion))
+
+    def __repr__(self):
+        return f"Question({self.pregunta!r}, {list(self.opciones)!r}, {self.respuesta_correcta})"
+
+
+# Cabecera del formato binario: firma, versión, preguntas, textos y bytes de texto
+_MAGIC = b"QSET"
+_VERSION = 1
+_HEADER = struct.Struct("<4sBxxxIIQ")
+
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+class QuestionSet:
+    """
+    Colección de preguntas guardada por columnas
+
+    Los textos de la pregunta i ocupan las posiciones first[i]..first[i+1]
+    de la tabla de textos: enunciado, explicación y una por opción. Cada
+    texto termina en ends[k] dentro de un único bloque UTF-8.
+    """
+
+    def __init__(self, questions: Iterable = ()):
+        """
+        Args:
+            questions: Preguntas iniciales (Question o diccionarios, que se validan)
+        """
+        self._blob = bytearray()
+        self._ends = array("Q")
+        self._first = array("I", [0])
+        self._answers = array("B")
+        self.extend(questions)
+
+    def append(self, question):
+        """Añade una pregunta; los diccionarios se validan con Question.from_dict"""
+        if not isinstance(question, Question):
+            question = Question.from_dict(question)
+        for text in (question.pregunta, question.explicacion) + question.opciones:
+            self._blob += text.encode("utf-8")
+            self._ends.append(len(self._blob))
+        self._first.append(len(self._ends))
+        self._answers.append(question.respuesta_correcta)
+
+    def extend(self, questions: Iterable):
+        for question in questions:
+            self.append(question)
+
+    def __len__(self):
+        return len(self._answers)
+
+    def _text(self, k: int) -> str:
+        start = self._ends[k - 1] if k else 0
+        return self._blob[start:self._ends[k]].decode("utf-8")
+
+    def __getitem__(self, i: int) -> Question:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("Índice de pregunta fuera de rango")
+        first, last = self._first[i], self._first[i + 1]
+        texts = [self._text(k) for k in range(first, last)]
+        # Los datos ya se validaron al añadirlos: se evita repetir la validación
+        question = Question.__new__(Question)
+        set_ = object.__setattr__
+        set_(question, "pregunta", texts[0])
+        set_(question, "opciones", tuple(texts[2:]))
+        set_(question, "respuesta_correcta", self._answers[i])
+        set_(question, "explicacion", texts[1])
+        return question
+
+    def __iter__(self) -> Iterator[Question]:
+        for i in range(len(self)):
+            yield self[i]
+
+    @property
+    def answers(self) -> array:
+        """Índice de la respuesta correcta de cada pregunta"""
+        return self._answers
+
+    def nbytes(self) -> int:
+        """Memoria ocupada por los datos de la colección"""
+        return (len(self._blob) + self._ends.itemsize * len(self._ends)
+                + self._first.itemsize * len(self._first) + len(self._answers))
+
+    def to_dicts(self) -> List[dict]:
+        return [question.to_dict() for question in self]
+
+    # --- Formato binario ---
+
+    def to_bytes(self) -> bytes:
+        header = _HEADER.pack(_MAGIC, _VERSION, len(self), len(self._ends), len(self._blob))
+        return b"".join((
+            header,
+            _little_endian(self._ends),
+            _little_endian(self._first),
+            self._answers.tobytes(),
+            bytes(self._blob),
+        ))
+
+    @classmethod
+    def from_bytes(cls, data) -> "QuestionSet":
+        """
+        Carga una colección escrita con to_bytes
+
+        Raises:
+            ValueError: Si los datos no tienen el formato esperado
+        """
+        data = memoryview(data)
+        if len(data) < _HEADER.size:
+            raise ValueError("Datos demasiado cortos para una colección de preguntas")
+        magic, version, count, strings, blob_size = _HEADER.unpack_from(data)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError("Formato de colección de preguntas desconocido")
+
+        sizes = (8 * strings, 4 * (count + 1), count, blob_size)
+        if len(data) != _HEADER.size + sum(sizes):
+            raise ValueError("Colección de preguntas truncada o corrupta")
+
+        result = cls()
+        offset = _HEADER.size
+        parts = []
+        for size in sizes:
+            parts.append(data[offset:offset + size])
+            offset += size
+        result._ends = array("Q", parts[0].tobytes())
+        result._first = array("I", parts[1].tobytes())
+        if sys.byteorder == "big":
+            result._ends.byteswap()
+            result._first.byteswap()
+        result._answers = array("B", parts[2].tobytes())
+        result._blob = bytearray(parts[3])
+
+        if (result._first[0] != 0 or result._first[-1] != strings
+                or (strings and result._ends[-1] != blob_size)):
+            raise ValueError("Colección de preguntas truncada o corrupta")
+        result._check_tables()
+        return result
+
+    def _check_tables(self):
+        """
+        Comprueba que las tablas leídas describen preguntas válidas
+
+        Sin esto, unos desplazamientos corruptos darían textos mezclados y
+        una respuesta corrupta, preguntas que Question habría rechazado.
+        """
+        ends, first = self._ends, self._first
+        if any(a > b for a, b in zip(ends, ends[1:])):
+            raise ValueError("Colección de preguntas corrupta: desplazamientos de texto desordenados")
+        for i, answer in enumerate(self._answers):
+            options = first[i + 1] - first[i] - 2
+            if not 2 <= options <= MAX_OPCIONES or answer >= options:
+                raise ValueError(f"Colección de preguntas corrupta: pregunta {i} no válida")
+
+    def save(self, path):
+        """Escribe la colección en formato binario, o en JSONL si la ruta termina en .jsonl"""
+        path = Path(path)
+        if path.suffix == ".jsonl":
+            self.write_jsonl(path)
+            return
+        _write_atomic(path, self.to_bytes())
+
+    @classmethod
+    def load(cls, path) -> "QuestionSet":
+        """Lee una colección guardada con save() (binaria o JSONL según la extensión)"""
+        path = Path(path)
+        if path.suffix == ".jsonl":
+            return cls.read_jsonl(path)
+        return cls.from_bytes(path.read_bytes())
+
+    # --- JSONL ---
+
+    def write_jsonl(self, path):
+        lines = "".join(json.dumps(q.to_dict(), ensure_ascii=False) + "\n" for q in self)
+        _write_atomic(Path(path), lines.encode("utf-8"))
+
+    @classmethod
+    def read_jsonl(cls, path) -> "QuestionSet":
+        """
+        Lee un fichero con una pregunta JSON por línea
+
+        Raises:
+            ValueError: Si alguna línea no es una pregunta válida (indica cuál)
+        """
+        result = cls()
+        with open(path, "r", encoding="utf-8") as f:
+            for number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    result.append(json.loads(line))
+                except ValueError as e:
+                    raise ValueError(f"Línea {number}: {e}") from e
+        return result
+
+
+def _write_atomic(path: Path, data: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
@@ -0,0 +1,309 @@
+"""
+Módulo de control de cuota para los proveedores de IA
+
+Cada proveedor tiene dos cubetas de tokens (peticiones por minuto y tokens
+por minuto) compartidas por todo el proceso. Las peticiones esperan su
+turno en lugar de fallar, y los errores 429 se reintentan con espera
+exponencial con jitter, respetando la cabecera Retry-After.
+"""
+
+import asyncio
+import contextvars
+import email.utils
+import random
+import threading
+import time
+from typing import Iterator, List
+
+from prompt_builder import estimate_tokens, max_output_tokens
+from question_generator import QuestionGenerator, request_quota
+
+
+# Límites por defecto (peticiones por minuto, tokens por minuto)
+DEFAULT_LIMITS = {
+    "google": {"requests_per_minute": 15, "tokens_per_minute": 1_000_000},
+    "openai": {"requests_per_minute": 500, "tokens_per_minute": 200_000},
+    "anthropic": {"requests_per_minute": 50, "tokens_per_minute": 40_000},
+    # Sin cuota real: solo evita que el límite genérico frene las pruebas de carga
+    "local": {"requests_per_minute": 1_000_000, "tokens_per_minute": 1_000_000_000},
+}
+
+# Códigos HTTP que indican saturación temporal y merecen reintento
+RETRYABLE_STATUS = {429, 503, 529}
+
+_END = object()
+
+
+class TokenBucket:
+    """
+    Cubeta de tokens con reserva anticipada
+
+    Cada petición reserva su parte aunque la cubeta quede en negativo y
+    recibe el tiempo que debe esperar; así las peticiones se atienden en
+    orden de llegada sin que ninguna tenga que volver a comprobar.
+    """
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float = 1) -> float:
+        """Reserva amount tokens y devuelve los segundos a esperar antes de usarlos"""
+        # Una petición mayor que la cubeta nunca cabría: se limita a la capacidad
+        amount = min(amount, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity,
+                self._tokens + (now - self._updated) * self.refill_per_second
+            )
+            self._updated = now
+            self._tokens -= amount
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.refill_per_second
+
+    def acquire(self, amount: float = 1):
+        """Espera (bloqueando el hilo) hasta disponer de amount tokens"""
+        delay = self.reserve(amount)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self, amount: float = 1):
+        """Espera sin bloquear el bucle de eventos hasta disponer de amount tokens"""
+        delay = self.reserve(amount)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class ProviderLimiter:
+    """Cubetas de peticiones y tokens por minuto de un proveedor"""
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60)
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60)
+
+    def acquire(self, tokens: int):
+        self.requests.acquire(1)
+        self.tokens.acquire(tokens)
+
+    async def acquire_async(self, tokens: int):
+        await self.requests.acquire_async(1)
+        await self.tokens.acquire_async(tokens)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(provider: str) -> ProviderLimiter:
+    """Devuelve el limitador compartido del proveedor, creándolo con DEFAULT_LIMITS"""
+    with _limiters_lock:
+        limiter = _limiters.get(provider)
+        if limiter is None:
+            limits = DEFAULT_LIMITS.get(provider, {"requests_per_minute": 60, "tokens_per_minute": 100_000})
+            limiter = ProviderLimiter(**limits)
+            _limiters[provider] = limiter
+        return limiter
+
+
+def set_limits(provider: str, requests_per_minute: float, tokens_per_minute: float):
+    """Configura la cuota de un proveedor para todo el proceso"""
+    with _limiters_lock:
+        _limiters[provider] = ProviderLimiter(requests_per_minute, tokens_per_minute)
+
+
+def _error_chain(error: BaseException):
+    """Recorre la excepción y las que la causaron"""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        yield error
+        error = error.__cause__ or error.__context__
+
+
+def _status_code(error: BaseException):
+    """Código HTTP del error del SDK (openai, anthropic o google-api-core)"""
+    for exc in _error_chain(error):
+        for attr in ("status_code", "code"):
+            code = getattr(exc, attr, None)
+            if isinstance(code, int):
+                return code
+    return None
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Indica si el error se debe a saturación temporal del proveedor"""
+    return _status_code(error) in RETRYABLE_STATUS
+
+
+def retry_after(error: BaseException):
+    """
+    Lee la espera indicada por el proveedor en la respuesta
+
+    Returns:
+        Segundos a esperar, o None si la respuesta no lo indica
+    """
+    for exc in _error_chain(error):
+        headers = getattr(getattr(exc, "response", None), "headers", None)
+        if not headers:
+            continue
+
+        value = headers.get("retry-after-ms")
+        if value:
+            try:
+                return float(value) / 1000
+            except ValueError:
+                pass
+
+        value = headers.get("retry-after")
+        if value:
+            try:
+                return float(value)
+            except ValueError:
+                pass
+            try:
+                date = email.utils.parsedate_to_datetime(value)
+            except (TypeError, ValueError):
+                # Cabecera mal formada: se usa la espera exponencial
+                return None
+            return max(0.0, date.timestamp() - time.time())
+    return None
+
+
+class _AttemptQuota:
+    """
+    Cuota de un intento para las llamadas que hace el generador envuelto
+
+    La primera llamada ya la reservó RateLimitedGenerator antes del
+    intento; cada una de las siguientes (las preguntas que faltaban)
+    reserva la suya. Los generadores que no usan request_quota quedan
+    cubiertos por esa primera reserva.
+    """
+
+    def __init__(self, limiter: ProviderLimiter):
+        self.limiter = limiter
+        self.prepaid = True
+
+    def acquire(self, tokens: int):
+        if self.prepaid:
+            self.prepaid = False
+        else:
+            self.limiter.acquire(tokens)
+
+    async def acquire_async(self, tokens: int):
+        if self.prepaid:
+            self.prepaid = False
+        else:
+            await self.limiter.acquire_async(tokens)
+
+
+class RateLimitedGenerator(QuestionGenerator):
+    """
+    Envuelve un QuestionGenerator con control de cuota y reintentos
+
+    Cada llamada al proveedor reserva su cuota: la de cada intento,
+    incluidos los reintentos tras un error de saturación, y las que haga el
+    generador envuelto dentro del intento (ver request_quota). Un 429 no
+    devuelve cuota, así que reintentar sin esperar turno solo provocaría
+    más rechazos; los reintentos esperan además el Retry-After o la espera
+    exponencial.
+    """
+
+    def __init__(self, generator: QuestionGenerator, limiter: ProviderLimiter = None,
+                 max_retries: int = 5, base_delay: float = 1.0, max_delay: float = 60.0):
+        """
+        Inicializa el generador
+
+        Args:
+            generator: Generador que realiza las llamadas reales
+            limiter: Limitador a usar (por defecto, el compartido del proveedor)
+            max_retries: Reintentos ante errores de saturación
+            base_delay: Espera base del primer reintento, en segundos
+            max_delay: Espera máxima entre reintentos, en segundos
+        """
+        self.generator = generator
+        self.limiter = limiter or get_limiter(generator.provider)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.provider = generator.provider
+        self.model_name = generator.model_name
+
+    def build_prompt(self, text: str, num_questions: int = 5, avoid: List[str] = None) -> str:
+        return self.generator.build_prompt(text, num_questions, avoid)
+
+    def generate_questions(self, text: str, num_questions: int = 5) -> List[dict]:
+        """Genera preguntas esperando turno en la cuota del proveedor"""
+        tokens = self._estimate_tokens(text, num_questions)
+
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire(tokens)
+            quota = request_quota.set(_AttemptQuota(self.limiter))
+            try:
+                return self.generator.generate_questions(text, num_questions)
+            except Exception as e:
+                if attempt == self.max_retries or not is_retryable(e):
+                    raise
+                time.sleep(self._delay(e, attempt))
+            finally:
+                request_quota.reset(quota)
+
+    def generate_questions_stream(self, text: str, num_questions: int = 5) -> Iterator[dict]:
+        """
+        Versión en streaming de generate_questions
+
+        Solo se reintenta si el error llega antes de la primera pregunta;
+        después ya se han entregado resultados y repetir los duplicaría.
+        """
+        tokens = self._estimate_tokens(text, num_questions)
+
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire(tokens)
+            # La cuota solo debe verse mientras avanza el generador envuelto,
+            # no en el código que consume las preguntas entre una y otra
+            context = contextvars.copy_context()
+            context.run(request_quota.set, _AttemptQuota(self.limiter))
+            questions = self.generator.generate_questions_stream(text, num_questions)
+            delivered = False
+            try:
+                while True:
+                    question = context.run(next, questions, _END)
+                    if question is _END:
+                        return
+                    delivered = True
+                    yield question
+            except Exception as e:
+                if delivered or attempt == self.max_retries or not is_retryable(e):
+                    raise
+                time.sleep(self._delay(e, attempt))
+
+    async def generate_questions_async(self, text: str, num_questions: int = 5) -> List[dict]:
+        """Versión asíncrona de generate_questions"""
+        tokens = self._estimate_tokens(text, num_questions)
+
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.acquire_async(tokens)
+            quota = request_quota.set(_AttemptQuota(self.limiter))
+            try:
+                return await self.generator.generate_questions_async(text, num_questions)
+            except Exception as e:
+                if attempt == self.max_retries or not is_retryable(e):
+                    raise
+                await asyncio.sleep(self._delay(e, attempt))
+            finally:
+                request_quota.reset(quota)
+
+    def _estimate_tokens(self, text, num_questions):
+        """Tokens de entrada y salida que consumirá la petición"""
+        return estimate_tokens(self.build_prompt(text, num_questions)) + max_output_tokens(num_questions)
+
+    def _delay(self, error, attempt):
+        """Espera antes del siguiente intento: Retry-After o exponencial con jitter"""
+        delay = retry_after(error)
+        if delay is None:
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        return min(delay, self.max_delay)
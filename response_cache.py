@@ -0,0 +1,180 @@
+"""
+Módulo de caché de respuestas para los generadores de preguntas
+
+Guarda en SQLite las preguntas generadas, identificadas por proveedor,
+modelo, texto completo, número de preguntas y versión de las plantillas
+del prompt.
+"""
+
+import asyncio
+import hashlib
+import json
+import sqlite3
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Iterator, List
+
+from prompt_builder import PROMPT_TEMPLATE, SYSTEM_PROMPT
+from question_generator import QuestionGenerator
+
+# Cambia con las plantillas: las respuestas a un prompt anterior no se reutilizan
+_PROMPT_VERSION = hashlib.sha256((SYSTEM_PROMPT + PROMPT_TEMPLATE).encode("utf-8")).hexdigest()[:16]
+
+
+class ResponseCache:
+    """Caché de respuestas en SQLite con caducidad y límite de entradas"""
+
+    def __init__(self, path: str = ".cache/respuestas.sqlite3",
+                 ttl: float = 7 * 24 * 3600, max_entries: int = 1000):
+        """
+        Inicializa la caché
+
+        Args:
+            path: Ruta de la base de datos SQLite
+            ttl: Segundos que una respuesta se considera válida
+            max_entries: Número máximo de respuestas guardadas; al superarlo
+                se eliminan las usadas hace más tiempo
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS respuestas ("
+                " clave TEXT PRIMARY KEY,"
+                " preguntas TEXT NOT NULL,"
+                " creada REAL NOT NULL,"
+                " usada REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_respuestas_usada ON respuestas(usada)")
+
+    @staticmethod
+    def make_key(provider, model_name, text, num_questions) -> str:
+        """
+        Calcula la clave de una petición
+
+        Se usa el texto completo y no el prompt: el prompt lleva el texto
+        comprimido o recortado, y dos documentos que solo difieren en la
+        parte descartada compartirían respuesta.
+        """
+        raw = json.dumps([provider, model_name, _PROMPT_VERSION, text, num_questions], ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """
+        Busca una respuesta vigente
+
+        Returns:
+            Lista de preguntas, o None si no existe o ha caducado
+        """
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute(
+                "SELECT preguntas FROM respuestas WHERE clave = ? AND creada >= ?",
+                (key, now - self.ttl)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE respuestas SET usada = ? WHERE clave = ?", (now, key))
+        return json.loads(row[0])
+
+    def put(self, key, questions: List[dict]):
+        """Guarda una respuesta y aplica la caducidad y el límite de entradas"""
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO respuestas (clave, preguntas, creada, usada) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(questions, ensure_ascii=False), now, now)
+            )
+            conn.execute("DELETE FROM respuestas WHERE creada < ?", (now - self.ttl,))
+            conn.execute(
+                "DELETE FROM respuestas WHERE clave IN ("
+                " SELECT clave FROM respuestas ORDER BY usada DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def _connect(self):
+        # Una conexión por operación: la caché se usa desde varios hilos y procesos
+        return sqlite3.connect(self.path, timeout=30)
+
+
+class CachedQuestionGenerator(QuestionGenerator):
+    """Envuelve cualquier QuestionGenerator y reutiliza sus respuestas anteriores"""
+
+    def __init__(self, generator: QuestionGenerator, cache: ResponseCache = None):
+        """
+        Inicializa el generador con caché
+
+        Args:
+            generator: Generador que realiza las llamadas reales
+            cache: ResponseCache a utilizar (por defecto, una en .cache/)
+        """
+        self.generator = generator
+        self.cache = cache or ResponseCache()
+        self.provider = generator.provider
+        self.model_name = generator.model_name
+
+    def build_prompt(self, text: str, num_questions: int = 5, avoid: List[str] = None) -> str:
+        return self.generator.build_prompt(text, num_questions, avoid)
+
+    def generate_questions(self, text: str, num_questions: int = 5,
+                           force_refresh: bool = False) -> List[dict]:
+        """
+        Devuelve las preguntas guardadas para esta petición o las genera
+
+        Args:
+            text: Texto del tema
+            num_questions: Número de preguntas a generar
+            force_refresh: Si es True, ignora la caché y pide una respuesta nueva
+        """
+        key = self._key(text, num_questions)
+
+        if not force_refresh:
+            questions = self.cache.get(key)
+            if questions is not None:
+                return questions
+
+        questions = self.generator.generate_questions(text, num_questions)
+        if questions:
+            self.cache.put(key, questions)
+        return questions
+
+    def generate_questions_stream(self, text: str, num_questions: int = 5,
+                                  force_refresh: bool = False) -> Iterator[dict]:
+        """Versión en streaming; la respuesta se guarda solo si llega completa"""
+        key = self._key(text, num_questions)
+
+        if not force_refresh:
+            questions = self.cache.get(key)
+            if questions is not None:
+                yield from questions
+                return
+
+        questions = []
+        for question in self.generator.generate_questions_stream(text, num_questions):
+            questions.append(question)
+            yield question
+
+        if questions:
+            self.cache.put(key, questions)
+
+    async def generate_questions_async(self, text: str, num_questions: int = 5,
+                                       force_refresh: bool = False) -> List[dict]:
+        """Versión asíncrona de generate_questions; SQLite se consulta en un hilo"""
+        key = self._key(text, num_questions)
+
+        if not force_refresh:
+            questions = await asyncio.to_thread(self.cache.get, key)
+            if questions is not None:
+                return questions
+
+        questions = await self.generator.generate_questions_async(text, num_questions)
+        if questions:
+            await asyncio.to_thread(self.cache.put, key, questions)
+        return questions
+
+    def _key(self, text, num_questions):
+        return ResponseCache.make_key(self.provider, self.model_name, text, num_questions)
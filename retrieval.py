@@ -0,0 +1,177 @@
+"""
+Módulo de búsqueda de fragmentos relevantes dentro de un documento
+
+Implementa un índice BM25 en memoria para enviar al modelo solo los
+fragmentos relacionados con el tema indicado por el usuario.
+"""
+
+import hashlib
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import List
+
+import numpy as np
+
+from text_chunks import split_into_chunks
+
+
+_TOKEN = re.compile(r"\w+")
+
+# Palabras demasiado frecuentes como para distinguir fragmentos
+STOPWORDS = frozenset("""
+a al algo como con de del el ella en entre es esta este esto ha la las le lo los
+mas me mi muy no o para pero por que se sea ser si sin sobre su sus tambien te
+un una uno unos unas y ya the of and to in is are for on with as by
+""".split())
+
+
+def _stem(token: str) -> str:
+    """Reduce los plurales más comunes a singular (células -> celula)"""
+    if len(token) > 4 and token.endswith("es"):
+        return token[:-2]
+    if len(token) > 3 and token.endswith("s"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Divide el texto en palabras en minúsculas y sin tildes, sin palabras vacías"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return [
+        _stem(t) for t in _TOKEN.findall(text)
+        if len(t) > 1 and t not in STOPWORDS
+    ]
+
+
+class BM25Index:
+    """Índice BM25 sobre una lista de fragmentos de texto"""
+
+    def __init__(self, chunks: List[str], k1: float = 1.5, b: float = 0.75):
+        """
+        Construye el índice
+
+        Args:
+            chunks: Fragmentos del documento, en orden
+            k1: Saturación de la frecuencia de término
+            b: Peso de la normalización por longitud del fragmento
+        """
+        self.chunks = chunks
+        self.k1 = k1
+        self.b = b
+
+        postings = {}
+        lengths = np.zeros(len(chunks), dtype=np.float32)
+        for i, chunk in enumerate(chunks):
+            tokens = tokenize(chunk)
+            lengths[i] = len(tokens)
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, tf in counts.items():
+                postings.setdefault(token, ([], []))
+                postings[token][0].append(i)
+                postings[token][1].append(tf)
+
+        avg_length = float(lengths.mean()) if len(chunks) else 0.0
+        # Denominador de BM25 sin la frecuencia: k1 * (1 - b + b * |d| / avgdl)
+        self._norm = k1 * (1 - b + b * lengths / (avg_length or 1.0))
+
+        n = len(chunks)
+        self._postings = {}
+        for token, (ids, tfs) in postings.items():
+            df = len(ids)
+            idf = np.log(1 + (n - df + 0.5) / (df + 0.5))
+            self._postings[token] = (
+                np.array(ids, dtype=np.int32),
+                np.array(tfs, dtype=np.float32),
+                idf,
+            )
+
+    def scores(self, query: str) -> np.ndarray:
+        """Devuelve la puntuación BM25 de cada fragmento para la consulta"""
+        scores = np.zeros(len(self.chunks), dtype=np.float32)
+        for token in set(tokenize(query)):
+            posting = self._postings.get(token)
+            if posting is None:
+                continue
+            ids, tfs, idf = posting
+            scores[ids] += idf * tfs * (self.k1 + 1) / (tfs + self._norm[ids])
+        return scores
+
+    def search(self, query: str, top_k: int = 5) -> List[int]:
+        """
+        Busca los fragmentos más relevantes
+
+        Returns:
+            Índices de los fragmentos con puntuación positiva, de mayor a menor
+        """
+        scores = self.scores(query)
+        if top_k < len(scores):
+            candidates = np.argpartition(-scores, top_k)[:top_k]
+        else:
+            candidates = np.arange(len(scores))
+        ranked = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [int(i) for i in ranked if scores[i] > 0]
+
+
+# Índices ya construidos, por hash del texto y tamaño de fragmento
+_INDEX_CACHE = OrderedDict()
+_INDEX_CACHE_SIZE = 16
+_index_lock = threading.Lock()
+
+
+def get_index(text: str, chunk_size: int = 1000) -> BM25Index:
+    """Devuelve el índice del texto, construyéndolo solo la primera vez"""
+    key = (hashlib.sha256(text.encode("utf-8")).hexdigest(), chunk_size)
+
+    with _index_lock:
+        index = _INDEX_CACHE.get(key)
+        if index is not None:
+            _INDEX_CACHE.move_to_end(key)
+            return index
+
+    index = BM25Index(split_into_chunks(text, chunk_size, overlap=0))
+
+    with _index_lock:
+        _INDEX_CACHE[key] = index
+        while len(_INDEX_CACHE) > _INDEX_CACHE_SIZE:
+            _INDEX_CACHE.popitem(last=False)
+    return index
+
+
+def select_relevant_text(text: str, topic: str, max_chars: int = 3000,
+                         chunk_size: int = 1000) -> str:
+    """
+    Reduce el texto a los fragmentos más relacionados con el tema
+
+    Args:
+        text: Texto completo del documento
+        topic: Tema indicado por el usuario
+        max_chars: Máximo de caracteres del resultado
+        chunk_size: Tamaño de los fragmentos del índice
+
+    Returns:
+        Los fragmentos elegidos en el orden del documento, o el texto
+        original si no hay tema o ningún fragmento coincide
+    """
+    if not topic or not topic.strip():
+        return text
+
+    index = get_index(text, chunk_size)
+    ranked = index.search(topic, top_k=max(1, max_chars // chunk_size + 1))
+    if not ranked:
+        return text
+
+    selected = []
+    total = 0
+    for i in ranked:
+        length = len(index.chunks[i])
+        if selected and total + length > max_chars:
+            break
+        selected.append(i)
+        total += length
+
+    return "\n\n".join(index.chunks[i] for i in sorted(selected))
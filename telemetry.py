@@ -0,0 +1,321 @@
+"""
+Módulo de medición por etapas (spans) y exportación de métricas
+
+Cada etapa de la cadena (extracción del PDF, construcción del prompt,
+llamada al proveedor, análisis de la respuesta y pintado en la interfaz)
+se envuelve en un span que mide su duración y guarda atributos como
+tokens o bytes. Los spans terminados alimentan métricas acumuladas que se
+exportan en formato de texto de Prometheus y, opcionalmente, se escriben
+una a una en un fichero JSONL.
+
+Los componentes con estado propio (como los cortacircuitos de
+failover_generator.py) registran además métricas de estado con
+register_gauge, que se leen al exportar.
+
+Desactivado (por defecto), span() devuelve siempre el mismo objeto vacío,
+así que el coste se reduce a una llamada a función.
+
+Configuración por entorno (ver configure_from_env):
+    TELEMETRY_TRACE_FILE=trazas.jsonl   activa y escribe cada span
+    TELEMETRY_METRICS_PORT=9464         activa y sirve /metrics por HTTP
+"""
+
+import contextvars
+import itertools
+import json
+import os
+import threading
+import time
+import weakref
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# Límites superiores de los intervalos del histograma de duración, en segundos
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Atributos de texto que se exportan como etiquetas de Prometheus
+LABEL_ATTRIBUTES = ("provider",)
+
+METRIC_PREFIX = "preguntas"
+
+_enabled = False
+_trace_file = None
+_trace_lock = threading.Lock()
+_metrics_lock = threading.Lock()
+_metrics = {}
+
+# Métricas de estado (gauges): nombre -> (ayuda, funciones que dan su valor)
+_gauges = {}
+_ids = itertools.count(1)
+_current = contextvars.ContextVar("telemetry_span", default=None)
+
+
+class _NoopSpan:
+    """Span vacío que se usa con la medición desactivada; es falso en un if"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __bool__(self):
+        return False
+
+    def set(self, **attributes):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    """Medición de una etapa; se usa como gestor de contexto"""
+
+    __slots__ = ("name", "attributes", "span_id", "parent_id", "trace_id",
+                 "_started", "_wall_started", "_token")
+
+    def __init__(self, name: str, attributes: dict):
+        self.name = name
+        self.attributes = attributes
+        self.span_id = next(_ids)
+        parent = _current.get()
+        self.parent_id = parent.span_id if parent is not None else None
+        self.trace_id = parent.trace_id if parent is not None else self.span_id
+
+    def set(self, **attributes):
+        """Añade atributos al span (tokens, bytes, número de preguntas...)"""
+        self.attributes.update(attributes)
+
+    def __enter__(self):
+        self._token = _current.set(self)
+        self._wall_started = time.time()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self._started
+        _current.reset(self._token)
+        _record(self, duration, exc)
+        return False
+
+
+def span(name: str, **attributes):
+    """
+    Abre un span con el nombre de la etapa
+
+    Ejemplo:
+        with telemetry.span("provider.call", provider="openai") as s:
+            respuesta = llamar()
+            if s:
+                s.set(response_bytes=len(respuesta))
+
+    Returns:
+        Un Span, o un span vacío (falso) si la medición está desactivada
+    """
+    if not _enabled:
+        return _NOOP_SPAN
+    return Span(name, attributes)
+
+
+def enable(trace_path: str = None):
+    """Activa la medición y, si se indica, la escritura de spans en JSONL"""
+    global _enabled, _trace_file
+    with _trace_lock:
+        if _trace_file is not None:
+            _trace_file.close()
+            _trace_file = None
+        if trace_path:
+            _trace_file = open(trace_path, "a", encoding="utf-8", buffering=1)
+    _enabled = True
+
+
+def disable():
+    """Desactiva la medición y cierra el fichero de trazas"""
+    global _enabled, _trace_file
+    _enabled = False
+    with _trace_lock:
+        if _trace_file is not None:
+            _trace_file.close()
+            _trace_file = None
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def reset():
+    """Borra las métricas acumuladas"""
+    with _metrics_lock:
+        _metrics.clear()
+
+
+def _record(span_: Span, duration: float, error):
+    """Acumula las métricas del span y lo escribe en el fichero de trazas"""
+    labels = tuple(
+        (name, str(span_.attributes[name])) for name in LABEL_ATTRIBUTES
+        if name in span_.attributes
+    )
+    key = (span_.name, labels)
+
+    with _metrics_lock:
+        entry = _metrics.get(key)
+        if entry is None:
+            entry = {"count": 0, "sum": 0.0, "errors": 0,
+                     "buckets": [0] * len(BUCKETS), "totals": {}}
+            _metrics[key] = entry
+        entry["count"] += 1
+        entry["sum"] += duration
+        if error is not None:
+            entry["errors"] += 1
+        for i, bound in enumerate(BUCKETS):
+            if duration <= bound:
+                entry["buckets"][i] += 1
+        for name, value in span_.attributes.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                entry["totals"][name] = entry["totals"].get(name, 0) + value
+
+    if _trace_file is not None:
+        record = {
+            "name": span_.name,
+            "trace_id": span_.trace_id,
+            "span_id": span_.span_id,
+            "parent_id": span_.parent_id,
+            "start": span_._wall_started,
+            "duration_ms": duration * 1000,
+            "thread": threading.current_thread().name,
+            "attributes": span_.attributes,
+        }
+        if error is not None:
+            record["error"] = f"{type(error).__name__}: {error}"
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with _trace_lock:
+            if _trace_file is not None:
+                _trace_file.write(line + "\n")
+
+
+def register_gauge(name: str, help_text: str, source):
+    """
+    Registra una función que devuelve el valor actual de una métrica de estado
+
+    Se consulta al exportar las métricas, así que no hace falta actualizarla.
+
+    Args:
+        name: Nombre de la métrica (sin el prefijo común)
+        help_text: Descripción para Prometheus
+        source: Función sin argumentos que devuelve una lista de
+            (etiquetas, valor); si es un método se guarda con una referencia
+            débil y su métrica desaparece al liberarse el objeto
+    """
+    if hasattr(source, "__self__"):
+        ref = weakref.WeakMethod(source)
+    else:
+        ref = lambda: source
+    with _metrics_lock:
+        _gauges.setdefault(name, (help_text, []))[1].append(ref)
+
+
+def _gauge_values():
+    """Valores actuales de las métricas de estado, descartando las de objetos liberados"""
+    with _metrics_lock:
+        gauges = []
+        for name, (help_text, refs) in sorted(_gauges.items()):
+            refs[:] = [ref for ref in refs if ref() is not None]
+            gauges.append((name, help_text, [ref() for ref in refs]))
+
+    result = []
+    for name, help_text, sources in gauges:
+        values = [value for source in sources if source is not None for value in source()]
+        result.append((name, help_text, values))
+    return result
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(pairs) -> str:
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def render_prometheus() -> str:
+    """Métricas acumuladas en el formato de texto de Prometheus"""
+    with _metrics_lock:
+        snapshot = [
+            (name, labels, dict(entry, buckets=list(entry["buckets"]), totals=dict(entry["totals"])))
+            for (name, labels), entry in sorted(_metrics.items())
+        ]
+
+    seconds = f"{METRIC_PREFIX}_span_seconds"
+    lines = [
+        f"# HELP {seconds} Duración de cada etapa de la generación de preguntas",
+        f"# TYPE {seconds} histogram",
+    ]
+    for name, labels, entry in snapshot:
+        base = (("span", name),) + labels
+        for bound, count in zip(BUCKETS, entry["buckets"]):
+            lines.append(f"{seconds}_bucket{_format_labels(base + (('le', repr(bound)),))} {count}")
+        lines.append(f"{seconds}_bucket{_format_labels(base + (('le', '+Inf'),))} {entry['count']}")
+        lines.append(f"{seconds}_sum{_format_labels(base)} {entry['sum']}")
+        lines.append(f"{seconds}_count{_format_labels(base)} {entry['count']}")
+
+    errors = f"{METRIC_PREFIX}_span_errors_total"
+    lines += [f"# HELP {errors} Etapas terminadas con error", f"# TYPE {errors} counter"]
+    for name, labels, entry in snapshot:
+        lines.append(f"{errors}{_format_labels((('span', name),) + labels)} {entry['errors']}")
+
+    totals = f"{METRIC_PREFIX}_span_attribute_total"
+    lines += [f"# HELP {totals} Suma de los atributos numéricos (tokens, bytes...) por etapa",
+              f"# TYPE {totals} counter"]
+    for name, labels, entry in snapshot:
+        for attribute, value in sorted(entry["totals"].items()):
+            pairs = (("span", name),) + labels + (("attribute", attribute),)
+            lines.append(f"{totals}{_format_labels(pairs)} {value}")
+
+    for name, help_text, values in _gauge_values():
+        gauge = f"{METRIC_PREFIX}_{name}"
+        lines += [f"# HELP {gauge} {help_text}", f"# TYPE {gauge} gauge"]
+        for labels, value in values:
+            lines.append(f"{gauge}{_format_labels(sorted(labels.items()))} {value}")
+
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        data = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port: int = 9464, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Sirve /metrics en un hilo en segundo plano"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def configure_from_env():
+    """Activa la medición según TELEMETRY_TRACE_FILE y TELEMETRY_METRICS_PORT"""
+    trace_path = os.getenv("TELEMETRY_TRACE_FILE")
+    port = os.getenv("TELEMETRY_METRICS_PORT")
+    if not trace_path and not port:
+        return
+    enable(trace_path)
+    if port:
+        try:
+            start_metrics_server(int(port))
+        except (OSError, ValueError) as e:
+            print(f"⚠️  No se pudo abrir el puerto de métricas {port}: {e}")
@@ -0,0 +1,21 @@
+"""Configuración de pytest: los módulos de la aplicación están en la raíz del repositorio"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture
+def mock_llm(monkeypatch):
+    """Servidor simulado de los proveedores, con los SDK apuntando a él"""
+    from mock_llm_server import MockLLMServer
+
+    environ = {}
+    with MockLLMServer() as server:
+        server.configure_environment(environ)
+        for name, value in environ.items():
+            monkeypatch.setenv(name, value)
+        yield server
@@ -0,0 +1,231 @@
+"""Pruebas de la cola de trabajos por lotes y del proceso trabajador"""
+
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+import generator_registry
+from batch_jobs import DONE, FAILED, PENDING, RUNNING, JobQueue, _worker_process
+from benchmark_pipeline import write_sample_pdf
+from question_generator import QuestionGenerator
+
+
+@pytest.fixture
+def pdfs(tmp_path):
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"doc{i}.pdf"
+        path.write_bytes(f"%PDF-1.4 documento {i}".encode())
+        paths.append(path)
+    return paths
+
+
+@pytest.fixture
+def jobs(tmp_path):
+    return JobQueue(tmp_path / "trabajos.sqlite3", max_attempts=2, lease=60)
+
+
+def _state(jobs, job_id):
+    with sqlite3.connect(jobs.path) as conn:
+        return conn.execute(
+            "SELECT estado, intentos, trabajador FROM trabajos WHERE id = ?", (job_id,)
+        ).fetchone()
+
+
+def _expire(jobs, job_id):
+    """Simula que la concesión del trabajo caducó"""
+    with sqlite3.connect(jobs.path) as conn:
+        past = time.time() - jobs.lease - 1
+        conn.execute("UPDATE trabajos SET iniciado = ?, renovado = ? WHERE id = ?",
+                     (past, past, job_id))
+
+
+def test_enqueue_ignores_duplicates(jobs, pdfs):
+    assert jobs.enqueue("lote", pdfs) == 3
+    assert jobs.enqueue("lote", pdfs) == 0
+    assert jobs.enqueue("otro", pdfs[:1]) == 1
+
+
+def test_concurrent_claims_never_share_a_job(jobs, pdfs):
+    jobs.enqueue("lote", pdfs)
+    claimed = []
+
+    def claim(i):
+        job = jobs.claim("lote", f"host:1:{i}")
+        if job is not None:
+            claimed.append(job["id"])
+
+    threads = [threading.Thread(target=claim, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(claimed) == [1, 2, 3]
+    assert jobs.claim("lote", "host:1:9") is None
+
+
+def test_expired_lease_is_reclaimed(jobs, pdfs):
+    jobs.enqueue("lote", pdfs[:1])
+    job = jobs.claim("lote", "host:1:0")
+    assert jobs.claim("lote", "host:2:0") is None
+
+    _expire(jobs, job["id"])
+    again = jobs.claim("lote", "host:2:0")
+    assert again["id"] == job["id"]
+    assert _state(jobs, job["id"]) == (RUNNING, 2, "host:2:0")
+
+
+def test_renew_keeps_the_lease(jobs, pdfs):
+    jobs.enqueue("lote", pdfs[:1])
+    job = jobs.claim("lote", "host:1:0")
+    _expire(jobs, job["id"])
+
+    assert jobs.renew(job["id"], "host:1:0")
+    assert jobs.claim("lote", "host:2:0") is None
+    assert not jobs.renew(job["id"], "host:2:0")
+
+
+def test_expired_lease_without_attempts_fails(jobs, pdfs):
+    jobs.enqueue("lote", pdfs[:1])
+    for worker in ("host:1:0", "host:2:0"):
+        job = jobs.claim("lote", worker)
+        _expire(jobs, job["id"])
+
+    assert jobs.claim("lote", "host:3:0") is None
+    assert _state(jobs, job["id"])[0] == FAILED
+
+
+def test_reclaimed_job_ignores_the_previous_worker(jobs, pdfs):
+    jobs.enqueue("lote", pdfs[:1])
+    job = jobs.claim("lote", "host:1:0")
+    _expire(jobs, job["id"])
+    jobs.claim("lote", "host:2:0")
+
+    assert not jobs.fail(job["id"], "host:1:0", "tarde")
+    assert not jobs.complete(job["id"], "host:1:0", "viejo.json", 1.0)
+    assert _state(jobs, job["id"]) == (RUNNING, 2, "host:2:0")
+
+    assert jobs.complete(job["id"], "host:2:0", "nuevo.json", 1.0)
+    assert _state(jobs, job["id"])[0] == DONE
+
+
+def test_fail_requeues_until_attempts_run_out(jobs, pdfs):
+    jobs.enqueue("lote", pdfs[:1])
+    job = jobs.claim("lote", "host:1:0")
+    assert jobs.fail(job["id"], "host:1:0", "error 1")
+    assert _state(jobs, job["id"])[0] == PENDING
+
+    job = jobs.claim("lote", "host:1:0")
+    assert jobs.fail(job["id"], "host:1:0", "error 2")
+    assert _state(jobs, job["id"])[0] == FAILED
+
+    assert jobs.retry_failed("lote") == 1
+    assert _state(jobs, job["id"])[:2] == (PENDING, 0)
+
+
+def test_release_returns_jobs_without_spending_an_attempt(jobs, pdfs):
+    jobs.enqueue("lote", pdfs[:2])
+    first = jobs.claim("lote", "host:10:0")
+    second = jobs.claim("lote", "host:100:0")
+
+    assert jobs.release("lote", ["host:10"]) == 1
+    assert _state(jobs, first["id"]) == (PENDING, 0, None)
+    assert _state(jobs, second["id"])[0] == RUNNING
+
+
+def test_requeue_abandoned_recovers_dead_local_workers(jobs, pdfs):
+    jobs.enqueue("lote", pdfs)
+    host = socket.gethostname()
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+
+    gone = jobs.claim("lote", f"{host}:{dead.pid}:0")
+    alive = jobs.claim("lote", f"{host}:{os.getpid()}:0")
+    remote = jobs.claim("lote", f"otra-maquina:{dead.pid}:0")
+
+    assert jobs.requeue_abandoned("lote") == 1
+    assert _state(jobs, gone["id"])[0] == PENDING
+    assert _state(jobs, alive["id"])[0] == RUNNING
+    assert _state(jobs, remote["id"])[0] == RUNNING
+
+
+def test_progress_counts_states(jobs, pdfs):
+    jobs.enqueue("lote", pdfs)
+    job = jobs.claim("lote", "host:1:0")
+    jobs.complete(job["id"], "host:1:0", "r.json", 2.0)
+    jobs.claim("lote", "host:1:0")
+
+    progress = jobs.progress("lote")
+    assert progress["total"] == 3
+    assert (progress[PENDING], progress[RUNNING], progress[DONE], progress[FAILED]) == (1, 1, 1, 0)
+
+
+class _Fake(QuestionGenerator):
+    """Generador sin red compartido por todos los hilos del trabajador"""
+
+    provider = "prueba"
+    model_name = "falso"
+
+    def __init__(self):
+        self.calls = 0
+        self.loops = set()
+        self.threads = set()
+        self.lock = threading.Lock()
+
+    def generate_questions(self, text, num_questions=5):
+        with self.lock:
+            self.calls += 1
+            call = self.calls
+            self.threads.add(threading.get_ident())
+        return [{
+            "pregunta": " ".join(f"llamada{call}pregunta{i}palabra{w}" for w in range(8)),
+            "opciones": ["sí", "no"],
+            "respuesta_correcta": 0,
+            "explicacion": "",
+        } for i in range(num_questions)]
+
+    async def generate_questions_async(self, text, num_questions=5):
+        with self.lock:
+            self.loops.add(asyncio.get_running_loop())
+        await asyncio.sleep(0.01)
+        return self.generate_questions(text, num_questions)
+
+
+def test_worker_process_end_to_end(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    fake = _Fake()
+    monkeypatch.setattr(generator_registry, "get_generator", lambda provider: fake)
+
+    paths = []
+    for i in range(4):
+        path = tmp_path / f"tema{i}.pdf"
+        write_sample_pdf(str(path), pages=2 + i)
+        paths.append(path)
+    broken = tmp_path / "roto.pdf"
+    broken.write_bytes(b"no es un PDF")
+
+    jobs = JobQueue(tmp_path / "trabajos.sqlite3", max_attempts=1, lease=60)
+    jobs.enqueue("lote", paths + [broken], provider="prueba", num_questions=8, tema="mitocondria")
+    output = tmp_path / "resultados"
+    _worker_process(jobs.path, "lote", output, 3, 1, 1, 60)
+
+    progress = jobs.progress("lote")
+    assert progress[DONE] == 4 and progress[FAILED] == 1
+
+    results = sorted(output.glob("*.json"))
+    assert len(results) == 4
+    for result in results:
+        payload = json.loads(result.read_text(encoding="utf-8"))
+        assert payload["provider"] == "prueba" and payload["tema"] == "mitocondria"
+        assert len(payload["questions"]) == 8
+    # Varios hilos, cada uno con su bucle, sobre el mismo generador compartido
+    assert len(fake.loops) > 1
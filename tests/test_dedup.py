@@ -0,0 +1,164 @@
+"""Pruebas de las firmas MinHash, del índice de casi repetidas y del generador que las descarta"""
+
+import pytest
+
+from dedup import (DeduplicatingGenerator, MinHasher, NearDuplicateIndex, question_text,
+                   remove_near_duplicates)
+from question_generator import QuestionGenerator
+from retrieval import tokenize
+
+
+def _words(start, stop):
+    return " ".join(f"tok{i}" for i in range(start, stop))
+
+
+def _jaccard(a, b):
+    a, b = set(tokenize(a)), set(tokenize(b))
+    return len(a & b) / len(a | b)
+
+
+def _question(pregunta, correcta="respuesta"):
+    return {"pregunta": pregunta, "opciones": [correcta, "otra"], "respuesta_correcta": 0,
+            "explicacion": ""}
+
+
+class _Small(NearDuplicateIndex):
+    MERGE_EVERY = 4
+
+
+@pytest.fixture(scope="module")
+def hasher():
+    return MinHasher()
+
+
+@pytest.mark.parametrize("overlap", [10, 50, 90])
+def test_signature_similarity_estimates_jaccard(hasher, overlap):
+    a, b = _words(0, 100), _words(100 - overlap, 200 - overlap)
+    estimate = (hasher.signature(a) == hasher.signature(b)).mean()
+    assert abs(estimate - _jaccard(a, b)) < 0.1
+
+
+def test_batch_signatures_match_single(hasher):
+    texts = [_words(0, 20), "", _words(5, 30), "¿Qué es la mitocondria?"]
+    batch = hasher.signatures(texts, chunk=3)
+    for text, signature in zip(texts, batch):
+        assert (signature == hasher.signature(text)).all()
+
+
+def test_threshold_separates_near_duplicates(hasher):
+    index = NearDuplicateIndex(hasher, threshold=0.7)
+    index.add(1, hasher.signature(_words(0, 100)))
+
+    near = index.query(hasher.signature(_words(3, 103)))
+    assert near is not None and near[0] == 1 and near[1] >= 0.7
+    assert index.query(hasher.signature(_words(40, 140))) is None
+
+    strict = NearDuplicateIndex(hasher, threshold=0.99)
+    strict.add(1, hasher.signature(_words(0, 100)))
+    assert strict.query(hasher.signature(_words(3, 103))) is None
+    assert strict.query(hasher.signature(_words(0, 100))) == (1, 1.0)
+
+
+def test_empty_text_never_matches(hasher):
+    index = NearDuplicateIndex(hasher)
+    index.add(1, hasher.signature(""))
+    assert index.check_and_add(hasher.signature("")) is None
+    assert index.query(hasher.signature(_words(0, 10))) is None
+
+
+def test_merged_and_pending_signatures_are_both_searched(hasher):
+    index = _Small(hasher, threshold=0.9)
+    for key in range(10):
+        index.add(key, hasher.signature(_words(key * 100, key * 100 + 50)))
+    assert len(index) == 10
+    assert len(index.keys) == 8
+
+    for key in (0, 7, 9):
+        assert index.query(hasher.signature(_words(key * 100, key * 100 + 50)))[0] == key
+
+
+def test_retain_forgets_deleted_keys(hasher):
+    index = NearDuplicateIndex(hasher)
+    index.add_many([1, 2], hasher.signatures([_words(0, 30), _words(100, 130)]))
+    index.retain(index.keys != 1)
+    assert index.query(hasher.signature(_words(0, 30))) is None
+    assert index.query(hasher.signature(_words(100, 130)))[0] == 2
+
+
+def test_save_and_load_round_trip(tmp_path, hasher):
+    index = NearDuplicateIndex(hasher)
+    index.add_many([3, 5], hasher.signatures([_words(0, 30), _words(100, 130)]))
+    index.add(8, hasher.signature(_words(200, 230)))
+    path = tmp_path / "firmas.npz"
+    index.save(path)
+
+    loaded = NearDuplicateIndex(hasher)
+    assert loaded.load(path)
+    assert loaded.keys.tolist() == [3, 5, 8]
+    assert loaded.query(hasher.signature(_words(200, 230)))[0] == 8
+
+    assert not NearDuplicateIndex(MinHasher(seed=2)).load(path)
+    assert not loaded.load(tmp_path / "no-existe.npz")
+
+
+def test_question_text_uses_correct_option():
+    question = _question("Capital de Francia", correcta="París")
+    assert question_text(question) == "Capital de Francia París"
+    assert question_text({"pregunta": "Sin opciones", "respuesta_correcta": 3}) == "Sin opciones "
+
+
+def test_remove_near_duplicates_keeps_first_in_order():
+    questions = [
+        _question(_words(0, 40)),
+        _question(_words(500, 540)),
+        _question(_words(1, 40)),
+    ]
+    assert remove_near_duplicates(questions, threshold=0.8) == questions[:2]
+
+
+def test_remove_near_duplicates_with_shared_index():
+    index = NearDuplicateIndex(threshold=0.8)
+    first = remove_near_duplicates([_question(_words(0, 40))], index=index)
+    second = remove_near_duplicates([_question(_words(0, 40)), _question(_words(500, 540))], index=index)
+    assert len(first) == 1
+    assert second == [_question(_words(500, 540))]
+
+
+class _Fixed(QuestionGenerator):
+    provider = "prueba"
+    model_name = "fijo"
+
+    def __init__(self, questions):
+        self.questions = questions
+
+    def build_prompt(self, text, num_questions=5, avoid=None):
+        return text
+
+    def generate_questions(self, text, num_questions=5):
+        return list(self.questions)
+
+    def generate_questions_stream(self, text, num_questions=5):
+        yield from self.questions
+
+
+def test_generator_rejects_bank_duplicates():
+    index = NearDuplicateIndex(threshold=0.8)
+    index.add(1, index.hasher.signature(question_text(_question(_words(0, 40)))))
+    fresh = _question(_words(500, 540))
+    generator = DeduplicatingGenerator(_Fixed([_question(_words(0, 40)), fresh]), index)
+
+    assert generator.generate_questions("texto") == [fresh]
+    assert generator.rejected == 1
+    # La aceptada quedó registrada
+    assert list(generator.generate_questions_stream("texto")) == []
+
+
+def test_generator_without_record_only_queries():
+    index = NearDuplicateIndex(threshold=0.8)
+    fresh = _question(_words(500, 540))
+    generator = DeduplicatingGenerator(_Fixed([fresh]), index, record=False)
+
+    assert generator.generate_questions("texto") == [fresh]
+    assert len(index) == 0
+    generator.record_question(fresh)
+    assert generator.generate_questions("texto") == []
@@ -0,0 +1,137 @@
+"""Pruebas de los estados del cortacircuitos y de la conmutación entre proveedores"""
+
+import pytest
+
+import failover_generator
+from failover_generator import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, FailoverQuestionGenerator
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(failover_generator.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3)
+    breaker.record_failure("error", 0.1)
+    breaker.record_failure("error", 0.1)
+    assert breaker.state == CLOSED
+    breaker.record_failure("error", 0.1)
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+    assert breaker.snapshot()["motivo"] == "3 fallos consecutivos"
+
+
+def test_success_resets_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=2)
+    breaker.record_failure("error", 0.1)
+    breaker.record_success(0.1)
+    breaker.record_failure("error", 0.1)
+    assert breaker.state == CLOSED
+
+
+def test_opens_on_error_rate_once_window_is_full(clock):
+    breaker = CircuitBreaker(failure_threshold=100, error_rate_threshold=0.5, window=4)
+    breaker.record_failure("error", 0.1)
+    breaker.record_success(0.1)
+    breaker.record_failure("error", 0.1)
+    assert breaker.state == CLOSED
+    breaker.record_success(0.1)
+    assert breaker.state == CLOSED
+    breaker.record_failure("error", 0.1)
+    assert breaker.state == OPEN
+    assert breaker.snapshot()["motivo"] == "tasa de error del 50%"
+
+
+def test_slow_calls_count_as_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=1, slow_call_threshold=2.0)
+    breaker.record_success(5.0)
+    assert breaker.state == OPEN
+
+
+def test_half_open_allows_a_single_trial(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure("error", 0.1)
+
+    clock[0] += 29
+    assert not breaker.allow_request()
+    clock[0] += 1
+    assert breaker.allow_request()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow_request()
+
+
+def test_successful_trial_closes(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure("error", 0.1)
+    clock[0] += 30
+    assert breaker.allow_request()
+    breaker.record_success(0.1)
+    assert breaker.state == CLOSED
+    assert breaker.allow_request()
+
+
+def test_failed_trial_reopens(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure("error", 0.1)
+    clock[0] += 30
+    assert breaker.allow_request()
+    breaker.record_failure("sigue caído", 0.1)
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+    clock[0] += 30
+    assert breaker.allow_request()
+
+
+def test_abandoned_trial_is_replaced(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure("error", 0.1)
+    clock[0] += 30
+    assert breaker.allow_request()
+    clock[0] += 30
+    assert breaker.allow_request()
+
+
+class FakeGenerator:
+    def __init__(self, name):
+        self.provider = name
+        self.model_name = name
+        self.down = False
+        self.calls = 0
+
+    def generate_questions(self, text, num_questions=5):
+        self.calls += 1
+        if self.down:
+            raise RuntimeError(f"{self.provider} caído")
+        return [self.provider]
+
+
+def test_failover_moves_traffic_and_recovers_with_real_request(clock):
+    primary, backup = FakeGenerator("primario"), FakeGenerator("respaldo")
+    generator = FailoverQuestionGenerator([primary, backup], failure_threshold=2, reset_timeout=10)
+
+    primary.down = True
+    assert generator.generate_questions("texto") == ["respaldo"]
+    assert generator.generate_questions("texto") == ["respaldo"]
+    assert generator.health()["0:primario"]["estado"] == OPEN
+
+    calls = primary.calls
+    assert generator.generate_questions("texto") == ["respaldo"]
+    assert primary.calls == calls
+
+    primary.down = False
+    clock[0] += 10
+    assert generator.generate_questions("texto") == ["primario"]
+    assert generator.health()["0:primario"]["estado"] == CLOSED
+
+
+def test_failover_raises_when_every_provider_fails(clock):
+    only = FakeGenerator("único")
+    only.down = True
+    generator = FailoverQuestionGenerator([only], failure_threshold=1)
+    with pytest.raises(Exception, match="único caído"):
+        generator.generate_questions("texto")
+    with pytest.raises(Exception, match="circuito abierto"):
+        generator.generate_questions("texto")
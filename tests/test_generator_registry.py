@@ -0,0 +1,80 @@
+"""Pruebas del registro de generadores: reutilización por clave, hilos y precalentamiento"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import generator_registry
+from generator_registry import get_generator, warm_up
+
+
+class _Fake:
+    def __init__(self, provider, api_key, model):
+        self.key = (provider, api_key, model)
+        self.warmed = 0
+
+    def warm_up(self):
+        if self.key[0] == "roto":
+            raise ConnectionError("sin red")
+        self.warmed += 1
+
+
+@pytest.fixture
+def created(monkeypatch):
+    created = []
+
+    def create(provider, api_key=None, model=None):
+        # Lenta a propósito, para que varios hilos coincidan creando
+        time.sleep(0.02)
+        generator = _Fake(provider, api_key, model)
+        created.append(generator)
+        return generator
+
+    monkeypatch.setattr(generator_registry, "create_generator", create)
+    generator_registry.clear()
+    yield created
+    generator_registry.clear()
+
+
+def test_same_key_returns_the_same_instance(created):
+    first = get_generator("openai")
+    assert get_generator("OpenAI") is first
+    assert get_generator("openai", api_key="otra") is not first
+    assert get_generator("openai", model="gpt-4o") is not first
+    assert len(created) == 3
+
+
+def test_clear_forgets_generators(created):
+    first = get_generator("google")
+    generator_registry.clear()
+    assert get_generator("google") is not first
+
+
+def test_concurrent_calls_create_one_generator(created):
+    barrier = threading.Barrier(16)
+
+    def call(_):
+        barrier.wait()
+        return get_generator("google")
+
+    with ThreadPoolExecutor(16) as executor:
+        generators = list(executor.map(call, range(16)))
+
+    assert len(created) == 1
+    assert all(generator is created[0] for generator in generators)
+
+
+def test_warm_up_registers_and_warms(created, capsys):
+    thread = warm_up(["google", "roto"])
+    thread.join(5)
+
+    assert get_generator("google").warmed == 1
+    assert len(created) == 2
+    assert "No se pudo precalentar roto" in capsys.readouterr().out
+
+
+def test_warm_up_in_foreground(created):
+    assert warm_up(["openai"], background=False) is None
+    assert get_generator("openai").warmed == 1
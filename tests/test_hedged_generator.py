@@ -0,0 +1,119 @@
+"""Pruebas de la cobertura de peticiones entre proveedores"""
+
+import asyncio
+import time
+
+import pytest
+
+from hedged_generator import HedgedQuestionGenerator
+from question_generator import QuestionGenerator
+
+
+class _Fake(QuestionGenerator):
+    """Proveedor sin red que tarda delay segundos y responde o falla"""
+
+    model_name = "falso"
+
+    def __init__(self, provider, delay=0.0, questions=None, error=None):
+        self.provider = provider
+        self.delay = delay
+        self.questions = [{"pregunta": provider}] if questions is None else questions
+        self.error = error
+        self.started = 0
+        self.cancelled = 0
+        self.loops = set()
+
+    def generate_questions(self, text, num_questions=5):
+        raise NotImplementedError
+
+    async def generate_questions_async(self, text, num_questions=5):
+        self.started += 1
+        self.loops.add(asyncio.get_running_loop())
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error:
+            raise self.error
+        return list(self.questions)
+
+
+def test_fast_primary_is_not_hedged():
+    primary, backup = _Fake("principal"), _Fake("reserva")
+    generator = HedgedQuestionGenerator([primary, backup], default_delay=1.0)
+    assert generator.generate_questions("texto") == [{"pregunta": "principal"}]
+    assert backup.started == 0
+
+
+def test_hedge_fires_after_the_delay_and_cancels_the_loser():
+    primary, backup = _Fake("principal", delay=5.0), _Fake("reserva")
+    generator = HedgedQuestionGenerator([primary, backup], default_delay=0.05)
+
+    started = time.monotonic()
+    assert generator.generate_questions("texto") == [{"pregunta": "reserva"}]
+    elapsed = time.monotonic() - started
+    assert 0.05 <= elapsed < 1.0
+    assert primary.cancelled == 1
+    # El principal cancelado cuenta como una muestra lenta
+    assert len(generator._latencies) == 1 and generator._latencies[0] >= 0.05
+
+
+def test_primary_can_still_win_after_the_hedge():
+    primary, backup = _Fake("principal", delay=0.1), _Fake("reserva", delay=5.0)
+    generator = HedgedQuestionGenerator([primary, backup], default_delay=0.02)
+    assert generator.generate_questions("texto") == [{"pregunta": "principal"}]
+    assert backup.started == 1 and backup.cancelled == 1
+
+
+def test_failed_primary_falls_back_without_waiting():
+    primary = _Fake("principal", error=ValueError("caído"))
+    backup = _Fake("reserva")
+    generator = HedgedQuestionGenerator([primary, backup], default_delay=5.0)
+
+    started = time.monotonic()
+    assert generator.generate_questions("texto") == [{"pregunta": "reserva"}]
+    assert time.monotonic() - started < 1.0
+
+
+def test_empty_answer_counts_as_failure():
+    primary, backup = _Fake("principal", questions=[]), _Fake("reserva")
+    generator = HedgedQuestionGenerator([primary, backup], default_delay=5.0)
+    assert generator.generate_questions("texto") == [{"pregunta": "reserva"}]
+
+
+def test_error_when_every_provider_fails():
+    primary = _Fake("principal", delay=0.1, error=ValueError("primero"))
+    backup = _Fake("reserva", error=ValueError("segundo"))
+    generator = HedgedQuestionGenerator([primary, backup], default_delay=0.02)
+    with pytest.raises(Exception, match="todos los proveedores") as info:
+        generator.generate_questions("texto")
+    assert isinstance(info.value.__cause__, ValueError)
+    assert primary.started == backup.started == 1
+
+
+def test_hedge_delay_uses_percentile_once_there_are_samples():
+    generator = HedgedQuestionGenerator([_Fake("principal")], percentile=90, default_delay=8.0,
+                                        min_samples=10)
+    generator._latencies.extend(i / 10 for i in range(1, 10))
+    assert generator.hedge_delay() == 8.0
+    generator._latencies.append(1.0)
+    assert generator.hedge_delay() == 1.0
+
+
+def test_sync_calls_reuse_the_same_generator():
+    primary = _Fake("principal")
+    generator = HedgedQuestionGenerator([primary, _Fake("reserva")])
+    for _ in range(2):
+        assert generator.generate_questions("texto") == [{"pregunta": "principal"}]
+    assert len(primary.loops) == 2
+
+
+def test_sync_call_from_event_loop_is_rejected():
+    generator = HedgedQuestionGenerator([_Fake("principal")])
+
+    async def call():
+        generator.generate_questions("texto")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(call())
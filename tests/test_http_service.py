@@ -0,0 +1,233 @@
+"""Pruebas del servicio HTTP: respuestas, errores, control de admisión y streaming acotado"""
+
+import asyncio
+import http.client
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+import http_service
+from benchmark_pipeline import write_sample_pdf
+from http_service import STREAM_QUEUE_SIZE, QuestionService, create_server
+from question_generator import QuestionGenerator
+from response_cache import ResponseCache
+
+
+class _Fake(QuestionGenerator):
+    """Proveedor sin red; puede bloquearse, fallar o emitir preguntas sin fin"""
+
+    provider = "prueba"
+    model_name = "falso"
+
+    def __init__(self):
+        self.calls = 0
+        self.loops = set()
+        self.produced = 0
+        self.closed = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+        self.error = None
+        self.endless = False
+        self.lock = threading.Lock()
+
+    def _question(self, i):
+        return {"pregunta": " ".join(f"llamada{self.calls}pregunta{i}palabra{w}" for w in range(8)),
+                "opciones": ["sí", "no"], "respuesta_correcta": 0, "explicacion": ""}
+
+    def generate_questions(self, text, num_questions=5):
+        self.release.wait(5)
+        with self.lock:
+            self.calls += 1
+        if self.error:
+            raise self.error
+        return [self._question(i) for i in range(num_questions)]
+
+    async def generate_questions_async(self, text, num_questions=5):
+        with self.lock:
+            self.loops.add(asyncio.get_running_loop())
+        return await asyncio.to_thread(self.generate_questions, text, num_questions)
+
+    def generate_questions_stream(self, text, num_questions=5):
+        try:
+            i = 0
+            while self.endless or i < num_questions:
+                if self.error and i == 2:
+                    raise self.error
+                self.produced += 1
+                yield self._question(i)
+                i += 1
+        finally:
+            self.closed.set()
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    fake = _Fake()
+    monkeypatch.setattr(http_service, "get_generator", lambda provider: fake)
+    return fake
+
+
+@pytest.fixture
+def server(tmp_path, fake):
+    service = QuestionService(extract_workers=1, generate_workers=2, queue_size=0,
+                              response_cache=ResponseCache(tmp_path / "respuestas.sqlite3"))
+    server = create_server("127.0.0.1", 0, service, retry_after=7)
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    service.shutdown()
+
+
+def _request(server, method, path, body=None, headers=None):
+    conn = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=10)
+    try:
+        conn.request(method, path, body=body, headers=headers or {})
+        response = conn.getresponse()
+        return response.status, dict(response.getheaders()), response.read()
+    finally:
+        conn.close()
+
+
+def _post_text(server, path, text="La mitocondria produce energía.", **params):
+    query = "&".join(f"{k}={v}" for k, v in {"provider": "prueba", **params}.items())
+    return _request(server, "POST", f"{path}?{query}", json.dumps({"text": text}),
+                    {"Content-Type": "application/json"})
+
+
+def test_health(server):
+    status, _, body = _request(server, "GET", "/health")
+    health = json.loads(body)
+    assert status == 200
+    assert health["status"] == "ok" and health["capacity"] == 2 and health["inflight"] == 0
+
+
+def test_questions_from_text(server, fake):
+    status, _, body = _post_text(server, "/questions", num=3)
+    assert status == 200
+    assert len(json.loads(body)["questions"]) == 3
+
+
+def test_questions_from_pdf(server, tmp_path):
+    path = tmp_path / "apuntes.pdf"
+    write_sample_pdf(str(path), pages=2)
+    status, _, body = _request(server, "POST", "/extract", path.read_bytes(),
+                               {"Content-Type": "application/pdf"})
+    assert status == 200
+    assert "mitocondria" in json.loads(body)["text"]
+
+
+def test_shared_generator_serves_repeated_fan_out_requests(server, fake):
+    # Más de 5 preguntas: FanOut abre un bucle de eventos por petición
+    for text in ("primer documento", "segundo documento"):
+        status, _, body = _post_text(server, "/questions", text, num=12)
+        assert status == 200
+        assert len(json.loads(body)["questions"]) == 12
+    assert len(fake.loops) == 2
+
+
+@pytest.mark.parametrize("path, body, headers, status", [
+    ("/nada", b"", {}, 404),
+    ("/questions", b"no es un PDF", {"Content-Type": "application/pdf"}, 400),
+    ("/questions", b"{", {"Content-Type": "application/json"}, 400),
+    ("/questions", b'{"text": 3}', {"Content-Type": "application/json"}, 400),
+    ("/questions", b'{"text": "   "}', {"Content-Type": "application/json"}, 400),
+    ("/questions?num=51", b'{"text": "a"}', {"Content-Type": "application/json"}, 400),
+    ("/questions?max_chars=0", b'{"text": "a"}', {"Content-Type": "application/json"}, 400),
+    ("/extract", b'{"text": "a"}', {"Content-Type": "application/json"}, 400),
+])
+def test_invalid_requests(server, path, body, headers, status):
+    code, _, data = _request(server, "POST", path, body, headers)
+    assert code == status
+    assert "error" in json.loads(data)
+
+
+def test_upload_too_large(server):
+    server.max_upload_bytes = 10
+    status, headers, _ = _request(server, "POST", "/extract", b"%PDF" + b"0" * 20)
+    assert status == 413
+    assert headers["Connection"] == "close"
+
+
+def test_generation_error_is_500(server, fake):
+    fake.error = RuntimeError("proveedor caído")
+    status, _, body = _post_text(server, "/questions", num=3)
+    assert status == 500
+    assert "proveedor caído" in json.loads(body)["error"]
+
+
+def test_busy_service_answers_503_with_retry_after(server, fake):
+    fake.release.clear()
+    service = server.service
+    blocked = [threading.Thread(target=_post_text, args=(server, "/questions", f"texto {i}"))
+               for i in range(service.capacity)]
+    for thread in blocked:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while service.health()["inflight"] < service.capacity and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    status, headers, body = _post_text(server, "/questions", "uno más")
+    assert status == 503
+    assert headers["Retry-After"] == "7"
+    assert "ocupado" in json.loads(body)["error"]
+
+    fake.release.set()
+    for thread in blocked:
+        thread.join()
+    assert service.health()["inflight"] == 0
+    assert _post_text(server, "/questions", "uno más")[0] == 200
+
+
+def test_stream_sends_one_line_per_question_and_a_trailer(server):
+    status, headers, body = _post_text(server, "/questions/stream", num=4)
+    lines = [json.loads(line) for line in body.decode("utf-8").splitlines()]
+    assert status == 200 and headers["Content-Type"] == "application/x-ndjson"
+    assert len(lines) == 5
+    assert lines[-1]["done"] is True and lines[-1]["count"] == 4
+
+
+def test_stream_error_goes_in_the_trailer(server, fake):
+    fake.error = RuntimeError("cortado")
+    _, _, body = _post_text(server, "/questions/stream", num=4)
+    lines = [json.loads(line) for line in body.decode("utf-8").splitlines()]
+    assert len(lines) == 3
+    assert lines[-1]["done"] is False and lines[-1]["count"] == 2
+    assert "cortado" in lines[-1]["error"]
+
+
+def test_stream_queue_is_bounded_and_stops_on_close(tmp_path, fake):
+    fake.endless = True
+    service = QuestionService(extract_workers=1, generate_workers=1, queue_size=0,
+                              response_cache=ResponseCache(tmp_path / "respuestas.sqlite3"))
+    try:
+        stream = service.generate_stream("prueba", "texto", 5)
+        next(stream)
+        time.sleep(0.3)
+        # El productor no adelanta más de lo que cabe en la cola
+        assert fake.produced <= STREAM_QUEUE_SIZE + 2
+        stream.close()
+        assert fake.closed.wait(2)
+    finally:
+        service.shutdown()
+
+
+def test_client_disconnect_stops_the_stream(server, fake):
+    fake.endless = True
+    body = json.dumps({"text": "texto"}).encode("utf-8")
+    with socket.create_connection(server.server_address, timeout=5) as sock:
+        sock.sendall(
+            b"POST /questions/stream?provider=prueba&num=5 HTTP/1.1\r\n"
+            b"Host: prueba\r\nContent-Type: application/json\r\n"
+            + f"Content-Length: {len(body)}\r\n\r\n".encode("ascii") + body
+        )
+        assert sock.recv(1024).startswith(b"HTTP/1.1 200")
+    assert fake.closed.wait(5)
+    deadline = time.monotonic() + 5
+    while server.service.health()["inflight"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert server.service.health()["inflight"] == 0
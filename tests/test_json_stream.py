@@ -0,0 +1,98 @@
+"""Pruebas del analizador incremental de la respuesta JSON"""
+
+import json
+
+import pytest
+
+from json_stream import QuestionStreamParser, salvage_questions, validate_question
+
+
+def _question(i, **extra):
+    question = {
+        "pregunta": f"¿Pregunta {i}?",
+        "opciones": ["a", "b", "c", "d"],
+        "respuesta_correcta": i % 4,
+        "explicacion": "porque sí",
+    }
+    question.update(extra)
+    return question
+
+
+RESPONSE = json.dumps({"questions": [_question(i) for i in range(3)]}, ensure_ascii=False)
+
+
+def _feed_all(parser, fragments):
+    questions = []
+    for fragment in fragments:
+        questions.extend(parser.feed(fragment))
+    return questions
+
+
+@pytest.mark.parametrize("size", [1, 2, 7, 64, len(RESPONSE)])
+def test_any_fragmentation_gives_the_same_questions(size):
+    parser = QuestionStreamParser()
+    fragments = [RESPONSE[i:i + size] for i in range(0, len(RESPONSE), size)]
+    assert _feed_all(parser, fragments) == [_question(i) for i in range(3)]
+    assert parser.finished
+
+
+def test_questions_are_returned_as_soon_as_they_close():
+    parser = QuestionStreamParser()
+    first = json.dumps(_question(0), ensure_ascii=False)
+    assert parser.feed('{"questions": [' + first[:-1]) == []
+    assert parser.feed("}") == [_question(0)]
+    assert parser.feed(", {") == []
+
+
+def test_braces_quotes_and_brackets_inside_strings():
+    tricky = _question(1, pregunta='¿Qué imprime print("}{ ] [")?', explicacion='Escapa \\"comillas\\" y \\\\')
+    text = json.dumps({"questions": [tricky]}, ensure_ascii=False)
+    assert _feed_all(QuestionStreamParser(), text) == [tricky]
+
+
+def test_text_before_the_array_is_ignored():
+    text = "Aquí tienes las preguntas:\n```json\n" + RESPONSE + "\n```"
+    assert len(QuestionStreamParser().feed(text)) == 3
+
+
+def test_stops_at_the_end_of_the_array():
+    text = '{"questions": [' + json.dumps(_question(0)) + '], "extra": [{"pregunta": "no"}]}'
+    parser = QuestionStreamParser()
+    assert parser.feed(text) == [_question(0)]
+    assert parser.finished
+    assert parser.feed('{"pregunta": "tampoco"}') == []
+
+
+def test_malformed_object_is_skipped():
+    text = '{"questions": [{"pregunta": "rota", "opciones": [1,,]}, ' + json.dumps(_question(2)) + "]}"
+    assert QuestionStreamParser().feed(text) == [_question(2)]
+
+
+def test_buffer_does_not_keep_completed_objects():
+    parser = QuestionStreamParser()
+    parser.feed('{"questions": [')
+    for i in range(100):
+        parser.feed(json.dumps(_question(i)) + ", ")
+    assert len(parser._buffer) < 10
+
+
+def test_custom_key():
+    text = json.dumps({"items": [_question(0)]})
+    assert QuestionStreamParser(key="items").feed(text) == [_question(0)]
+
+
+def test_salvage_truncated_response():
+    truncated = RESPONSE[:RESPONSE.rindex("{") + 20]
+    assert salvage_questions(truncated) == [_question(0), _question(1)]
+
+
+def test_salvage_drops_invalid_questions():
+    invalid = {"pregunta": "sin opciones", "opciones": [], "respuesta_correcta": 0}
+    text = json.dumps({"questions": [invalid, _question(1)]})
+    assert salvage_questions(text) == [_question(1)]
+
+
+def test_validate_question_normalizes_letter_answers():
+    assert validate_question(_question(0, respuesta_correcta="C", extra="x")) == _question(0, respuesta_correcta=2)
+    assert validate_question(_question(0, respuesta_correcta=9)) is None
+    assert validate_question("no es un objeto") is None
@@ -0,0 +1,64 @@
+"""Pruebas del generador local: forma de las preguntas, determinismo y textos pobres"""
+
+import asyncio
+
+from json_stream import validate_question
+from local_generator import LocalQuestionGenerator
+from question_generator import create_generator
+
+TEXT = (
+    "La mitocondria es un orgánulo celular que produce la mayor parte de la energía química. "
+    "El ribosoma es una estructura que sintetiza las proteínas a partir del ARN mensajero. "
+    "El núcleo contiene el material genético de la célula eucariota y regula su actividad. "
+    "La membrana plasmática delimita la célula y controla el paso de sustancias. "
+    "Los cloroplastos realizan la fotosíntesis en las células vegetales gracias a la clorofila. "
+    "El aparato de Golgi modifica, empaqueta y distribuye las proteínas producidas. "
+    "Los lisosomas contienen enzimas digestivas que degradan moléculas y orgánulos viejos. "
+    "El citoesqueleto mantiene la forma celular y permite el movimiento de los orgánulos."
+)
+
+
+def test_questions_have_the_expected_shape():
+    questions = LocalQuestionGenerator().generate_questions(TEXT, 5)
+    assert len(questions) == 5
+    for question in questions:
+        assert set(question) == {"pregunta", "opciones", "respuesta_correcta", "explicacion"}
+        assert validate_question(question) == question
+        assert len(question["opciones"]) == 4
+        assert len(set(option.lower() for option in question["opciones"])) == 4
+        assert 0 <= question["respuesta_correcta"] < 4
+        assert question["explicacion"]
+    assert len({q["pregunta"] for q in questions}) == 5
+
+
+def test_cloze_answer_is_the_removed_word():
+    cloze = [q for q in LocalQuestionGenerator().generate_questions(TEXT, 8)
+             if q["pregunta"].startswith("Completa la frase")]
+    assert cloze
+    for question in cloze:
+        answer = question["opciones"][question["respuesta_correcta"]]
+        sentence = question["pregunta"].split("«", 1)[1].replace("_____", answer)
+        assert question["explicacion"] == f"El texto dice: «{sentence}"
+
+
+def test_same_text_gives_the_same_questions():
+    assert (LocalQuestionGenerator().generate_questions(TEXT, 4)
+            == LocalQuestionGenerator().generate_questions(TEXT, 4))
+    assert (LocalQuestionGenerator(seed=1).generate_questions(TEXT, 4)
+            == LocalQuestionGenerator(seed=1).generate_questions(TEXT, 4))
+
+
+def test_short_or_empty_text_returns_fewer_questions():
+    generator = LocalQuestionGenerator()
+    assert generator.generate_questions("", 5) == []
+    assert generator.generate_questions("Hola.", 5) == []
+    assert generator.generate_questions(TEXT, 0) == []
+    assert len(generator.generate_questions(TEXT, 100)) < 100
+
+
+def test_registered_as_local_provider_with_stream_and_async():
+    generator = create_generator("local")
+    assert isinstance(generator, LocalQuestionGenerator)
+    expected = generator.generate_questions(TEXT, 3)
+    assert list(generator.generate_questions_stream(TEXT, 3)) == expected
+    assert asyncio.run(generator.generate_questions_async(TEXT, 3)) == expected
@@ -0,0 +1,219 @@
+"""Pruebas de los generadores que reparten una petición en varias concurrentes"""
+
+import asyncio
+import threading
+import warnings
+
+import pytest
+
+from parallel_generation import FanOutQuestionGenerator, MapReduceQuestionGenerator, prompt_budget
+from question_generator import QuestionGenerator, create_generator
+from text_chunks import split_into_chunks
+
+warnings.filterwarnings("ignore", category=FutureWarning)
+
+TEXT = " ".join(f"La frase {i} habla de la fotosíntesis y de la energía química." for i in range(60))
+
+
+class _Fake(QuestionGenerator):
+    """Generador sin red: preguntas distintas entre sí que recuerdan el texto recibido"""
+
+    provider = "prueba"
+    model_name = "falso"
+
+    def __init__(self, fail=None):
+        self.fail = fail or (lambda text: False)
+        self.calls = []
+        self.loops = set()
+        self._lock = threading.Lock()
+
+    def _questions(self, text, num_questions):
+        with self._lock:
+            self.calls.append((text, num_questions))
+            call = len(self.calls)
+        if self.fail(text):
+            raise ValueError("fallo")
+        return [{
+            "pregunta": " ".join(f"llamada{call}pregunta{i}palabra{w}" for w in range(8)),
+            "opciones": ["sí", "no"],
+            "respuesta_correcta": 0,
+            "explicacion": text,
+        } for i in range(num_questions)]
+
+    def generate_questions(self, text, num_questions=5):
+        return self._questions(text, num_questions)
+
+    async def generate_questions_async(self, text, num_questions=5):
+        self.loops.add(asyncio.get_running_loop())
+        await asyncio.sleep(0)
+        return self._questions(text, num_questions)
+
+
+def test_fan_out_small_requests_go_straight_through():
+    fake = _Fake()
+    generator = FanOutQuestionGenerator(fake, questions_per_call=5)
+    assert len(generator.generate_questions(TEXT, 5)) == 5
+    assert fake.calls == [(TEXT, 5)]
+    assert not fake.loops
+
+
+def test_fan_out_splits_the_text_and_asks_for_one_more():
+    fake = _Fake()
+    generator = FanOutQuestionGenerator(fake, questions_per_call=5)
+    questions = generator.generate_questions(TEXT, 12)
+
+    assert len(questions) == 12
+    assert [n for _, n in fake.calls] == [5, 5, 5]
+    assert len({text for text, _ in fake.calls}) == 3
+    # Intercaladas: las tres primeras vienen de subpeticiones distintas
+    assert len({q["explicacion"] for q in questions[:3]}) == 3
+
+
+def test_fan_out_tops_up_after_duplicates():
+    class Repeats(_Fake):
+        def _questions(self, text, num_questions):
+            questions = super()._questions(text, num_questions)
+            # La primera ronda devuelve la misma pregunta en todas las posiciones
+            return questions if len(self.calls) > 2 else [questions[0]] * num_questions
+
+    fake = Repeats()
+    generator = FanOutQuestionGenerator(fake, questions_per_call=5)
+    assert len(generator.generate_questions(TEXT, 8)) == 8
+    assert len(fake.calls) > 2
+
+
+def test_fan_out_keeps_answers_when_some_calls_fail():
+    failed = set()
+
+    def fail_once(text):
+        if not failed:
+            failed.add(text)
+            return True
+        return False
+
+    generator = FanOutQuestionGenerator(_Fake(fail_once), questions_per_call=5, top_up_rounds=0)
+    assert len(generator.generate_questions(TEXT, 10)) == 6
+
+
+def test_fan_out_raises_when_every_call_fails():
+    generator = FanOutQuestionGenerator(_Fake(lambda text: True), questions_per_call=5)
+    with pytest.raises(Exception, match="fallo"):
+        generator.generate_questions(TEXT, 10)
+
+
+def test_fan_out_sync_calls_reuse_the_same_generator():
+    fake = _Fake()
+    generator = FanOutQuestionGenerator(fake, questions_per_call=5)
+    for _ in range(2):
+        assert len(generator.generate_questions(TEXT, 10)) == 10
+    # Cada llamada síncrona tiene su propio bucle
+    assert len(fake.loops) == 2
+
+
+def test_fan_out_sync_call_from_event_loop_is_rejected():
+    generator = FanOutQuestionGenerator(_Fake(), questions_per_call=5)
+
+    async def call():
+        generator.generate_questions(TEXT, 10)
+
+    with pytest.raises(RuntimeError, match="generate_questions_async"):
+        asyncio.run(call())
+
+
+@pytest.mark.parametrize("provider", ["google", "openai", "anthropic"])
+def test_fan_out_sync_calls_work_with_real_clients(mock_llm, provider):
+    pytest.importorskip("google.generativeai" if provider == "google" else provider)
+    generator = FanOutQuestionGenerator(create_generator(provider), questions_per_call=5)
+    before = mock_llm.stats()["requests"]
+
+    # El cliente asíncrono del primer asyncio.run queda cerrado al terminar
+    for _ in range(2):
+        assert generator.generate_questions(TEXT, 10)
+    assert mock_llm.stats()["requests"] - before >= 4
+
+
+def _q(pregunta):
+    return {"pregunta": pregunta, "opciones": ["sí", "no"], "respuesta_correcta": 0, "explicacion": ""}
+
+
+class _Wrapper(QuestionGenerator):
+    provider = "prueba"
+    model_name = "envoltorio"
+
+    def __init__(self, generator):
+        self.generator = generator
+
+    def generate_questions(self, text, num_questions=5):
+        return self.generator.generate_questions(text, num_questions)
+
+
+def test_prompt_budget_looks_through_wrappers():
+    fake = _Fake()
+    fake.prompt_builder = type("Builder", (), {"token_budget": 1234})()
+    assert prompt_budget(_Wrapper(_Wrapper(fake))) == 1234
+    assert MapReduceQuestionGenerator(_Wrapper(fake)).token_budget == 1234
+
+
+def test_map_reduce_short_text_goes_straight_through():
+    fake = _Fake()
+    generator = MapReduceQuestionGenerator(fake, token_budget=10 ** 6)
+    assert generator.fits(TEXT)
+    assert len(generator.generate_questions(TEXT, 4)) == 4
+    assert fake.calls == [(TEXT, 4)]
+    assert not fake.loops
+
+
+def test_map_reduce_spreads_chunks_over_the_document():
+    fake = _Fake()
+    generator = MapReduceQuestionGenerator(fake, chunk_size=300, max_chunks=3, token_budget=10)
+    assert not generator.fits(TEXT)
+    questions = generator.generate_questions(TEXT, 5)
+
+    chunks = split_into_chunks(TEXT, 300)
+    assert len(chunks) > 3
+    sent = sorted(chunks.index(text) for text, _ in fake.calls)
+    assert [n for _, n in fake.calls] == [2, 2, 2]
+    # Uno del principio, uno del centro y uno del final
+    assert sent[0] < len(chunks) / 3 <= sent[1] < 2 * len(chunks) / 3 <= sent[2]
+    assert len(questions) == 5
+
+
+def test_map_reduce_skips_failed_chunks():
+    chunks = split_into_chunks(TEXT, 300)
+    generator = MapReduceQuestionGenerator(_Fake(lambda text: text == chunks[0]),
+                                           chunk_size=300, max_chunks=len(chunks), token_budget=10)
+    # Una pregunta por fragmento; el que falla no aporta la suya
+    assert len(generator.generate_questions(TEXT, len(chunks))) == len(chunks) - 1
+
+    failing = MapReduceQuestionGenerator(_Fake(lambda text: True), chunk_size=300, token_budget=10)
+    with pytest.raises(Exception, match="fallo"):
+        failing.generate_questions(TEXT, 5)
+
+
+def test_reduce_takes_rounds_across_chunks():
+    candidates = [[_q("a1"), _q("a2")], [_q("b1"), _q("b2")], [_q("c1")]]
+    selected = MapReduceQuestionGenerator._reduce(candidates, 4)
+    assert [q["pregunta"] for q in selected] == ["a1", "b1", "c1", "b2"]
+
+
+def test_reduce_spreads_a_partial_round_and_drops_repeats():
+    candidates = [[_q("a")], [_q(" A ")], [_q("b")], [_q("c")], [_q("d")]]
+    assert [q["pregunta"] for q in MapReduceQuestionGenerator._reduce(candidates, 2)] == ["b", "d"]
+    assert len(MapReduceQuestionGenerator._reduce(candidates, 10)) == 4
+
+
+def test_map_reduce_sync_calls_reuse_the_same_generator():
+    fake = _Fake()
+    generator = MapReduceQuestionGenerator(fake, chunk_size=300, token_budget=10)
+    for _ in range(2):
+        assert len(generator.generate_questions(TEXT, 5)) == 5
+    assert len(fake.loops) == 2
+
+
+def test_map_reduce_sync_calls_work_with_real_clients(mock_llm):
+    pytest.importorskip("openai")
+    generator = MapReduceQuestionGenerator(create_generator("openai"), chunk_size=300, token_budget=10)
+    before = mock_llm.stats()["requests"]
+    for _ in range(2):
+        assert generator.generate_questions(TEXT, 5)
+    assert mock_llm.stats()["requests"] - before == 2 * generator.max_chunks
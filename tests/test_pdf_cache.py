@@ -0,0 +1,75 @@
+"""Pruebas de la caché de texto de PDF: aciertos, invalidación, versión y expulsión LRU"""
+
+import os
+
+from benchmark_pipeline import write_sample_pdf
+from pdf_cache import PDFTextCache
+from pdf_extractor import PDFExtractor
+
+
+def test_second_extraction_is_served_from_the_cache(tmp_path):
+    path = str(tmp_path / "apuntes.pdf")
+    write_sample_pdf(path, pages=3)
+    cache = PDFTextCache(tmp_path / "cache")
+    extractor = PDFExtractor(cache=cache)
+
+    text = extractor.extract_text(path)
+    assert cache.stats() == {"hits": 0, "misses": 3, "hit_rate": 0.0}
+    assert extractor.extract_text(path) == text
+    assert cache.stats() == {"hits": 3, "misses": 3, "hit_rate": 0.5}
+
+
+def test_partial_extraction_stores_only_what_was_read(tmp_path):
+    path = str(tmp_path / "apuntes.pdf")
+    write_sample_pdf(path, pages=5)
+    cache = PDFTextCache(tmp_path / "cache")
+    extractor = PDFExtractor(cache=cache)
+
+    extractor.extract_text(path, page_range=(0, 2))
+    entry = cache.load(cache.key(path, PDFExtractor.VERSION))
+    assert entry["num_pages"] == 5
+    assert sorted(entry["pages"]) == [0, 1]
+
+    extractor.extract_text(path)
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 5
+
+
+def test_changed_content_invalidates_the_entry(tmp_path):
+    path = str(tmp_path / "apuntes.pdf")
+    write_sample_pdf(path, pages=2)
+    cache = PDFTextCache(tmp_path / "cache")
+    extractor = PDFExtractor(cache=cache)
+    first_key = cache.key(path, PDFExtractor.VERSION)
+    extractor.extract_text(path)
+
+    write_sample_pdf(path, pages=3)
+    assert cache.key(path, PDFExtractor.VERSION) != first_key
+    assert extractor.extract_text(path).count("Página") == 3
+    assert cache.stats()["hits"] == 0
+
+
+def test_key_depends_on_the_extractor_version(tmp_path):
+    path = str(tmp_path / "apuntes.pdf")
+    write_sample_pdf(path, pages=1)
+    cache = PDFTextCache(tmp_path / "cache")
+    assert cache.key(path, 1) != cache.key(path, 2)
+    assert cache.key(path, 1).endswith("-v1")
+
+
+def test_eviction_removes_least_recently_used(tmp_path):
+    cache = PDFTextCache(tmp_path / "cache")
+    page = "x" * 1000
+    for i, key in enumerate(("a", "b", "c")):
+        cache.store(key, 1, {0: page})
+        os.utime(cache._path(key), (1000 + i, 1000 + i))
+    # "a" se lee y pasa a ser la más reciente
+    assert cache.load("a") is not None
+
+    cache.max_bytes = 2 * cache._path("a").stat().st_size + 100
+    cache.store("d", 1, {0: page})
+
+    assert cache.load("b") is None
+    assert cache.load("c") is None
+    assert cache.load("a") is not None
+    assert cache.load("d") == {"num_pages": 1, "pages": {0: page}}
@@ -0,0 +1,74 @@
+"""Pruebas del extractor de PDF: modo paralelo frente a serie, rangos, max_chars y archivos abiertos"""
+
+import io
+
+import pytest
+
+from benchmark_pipeline import write_sample_pdf
+from pdf_cache import PDFTextCache
+from pdf_extractor import PDFExtractor
+
+
+@pytest.fixture(scope="module")
+def sample_pdf(tmp_path_factory):
+    path = tmp_path_factory.mktemp("pdf") / "apuntes.pdf"
+    write_sample_pdf(str(path), pages=40)
+    return str(path)
+
+
+def _parallel(**kwargs):
+    return PDFExtractor(parallel=True, workers=2, min_pages_parallel=4, **kwargs)
+
+
+@pytest.mark.parametrize("max_chars, page_range", [
+    (None, None),
+    (None, (5, 30)),
+    (None, range(0, 40, 3)),
+    (5000, None),
+    (5000, (10, 40)),
+    (10 ** 7, None),
+])
+def test_parallel_matches_serial(sample_pdf, max_chars, page_range):
+    expected = PDFExtractor().extract_text(sample_pdf, max_chars, page_range)
+    assert _parallel().extract_text(sample_pdf, max_chars, page_range) == expected
+    if max_chars is not None:
+        assert len(expected) <= max_chars
+
+
+def test_iter_pages_matches_extract_text(sample_pdf):
+    extractor = PDFExtractor()
+    pages = list(extractor.iter_pages(sample_pdf, (2, 6)))
+    assert len(pages) == 4
+    assert pages[0].startswith("Página 3")
+    assert "".join(pages) == extractor.extract_text(sample_pdf, page_range=(2, 6))
+
+
+def test_parallel_with_cache_matches_serial(sample_pdf, tmp_path):
+    cache = PDFTextCache(tmp_path / "cache")
+    extractor = _parallel(cache=cache)
+    expected = PDFExtractor().extract_text(sample_pdf)
+
+    # La primera pasada solo extrae una parte; la segunda completa el resto
+    assert extractor.extract_text(sample_pdf, max_chars=5000) == expected[:5000]
+    assert extractor.extract_text(sample_pdf) == expected
+    assert extractor.extract_text(sample_pdf) == expected
+    assert cache.stats()["hits"] >= 40
+
+
+def test_file_object_skips_cache_and_pool(sample_pdf, tmp_path):
+    cache = PDFTextCache(tmp_path / "cache")
+    extractor = _parallel(cache=cache)
+    with open(sample_pdf, "rb") as f:
+        data = f.read()
+
+    text = extractor.extract_text(io.BytesIO(data))
+    assert text == PDFExtractor().extract_text(sample_pdf)
+    assert cache.stats() == {"hits": 0, "misses": 0, "hit_rate": 0.0}
+    assert list(cache.directory.glob("*.json")) == []
+
+
+def test_invalid_pdf_raises(tmp_path):
+    path = tmp_path / "roto.pdf"
+    path.write_bytes(b"no es un PDF")
+    with pytest.raises(Exception, match="Error al extraer PDF"):
+        PDFExtractor().extract_text(str(path))
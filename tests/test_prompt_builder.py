@@ -0,0 +1,66 @@
+"""Pruebas del constructor de prompts: presupuesto de tokens y compresión del texto"""
+
+import prompt_builder
+from prompt_builder import (
+    DEFAULT_TOKEN_BUDGET, PromptBuilder, compress_text, estimate_tokens, max_output_tokens
+)
+from text_chunks import split_sentences
+
+
+def _sentences(n):
+    return " ".join(f"La frase número {i} habla de la célula y del tema {i % 7}." for i in range(n))
+
+
+def test_estimate_and_output_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("a" * 35) == 10
+    assert max_output_tokens(3) == 2000
+    assert max_output_tokens(20) == 20 * prompt_builder.TOKENS_PER_QUESTION
+
+
+def test_short_text_is_not_compressed():
+    text = "Un texto corto."
+    assert compress_text(text, 100) is text
+
+
+def test_compressed_text_fits_the_budget_and_keeps_order():
+    text = _sentences(200)
+    compressed = compress_text(text, 300)
+    assert estimate_tokens(compressed) <= 300
+    kept = split_sentences(compressed)
+    original = split_sentences(text)
+    assert kept
+    # Frases completas del original, en el mismo orden
+    positions = [original.index(sentence) for sentence in kept]
+    assert positions == sorted(positions)
+
+
+def test_text_without_sentences_is_truncated():
+    text = "palabra " * 1000
+    assert compress_text(text, 100) == text[:int(100 * prompt_builder.CHARS_PER_TOKEN)]
+
+
+def test_compression_is_cached(monkeypatch):
+    text = _sentences(150)
+    first = compress_text(text, 250)
+    monkeypatch.setattr(prompt_builder, "_compress", lambda *args: "no se usa")
+    assert compress_text(text, 250) == first
+    assert compress_text(text, 251) == "no se usa"
+
+
+def test_budget_depends_on_model_and_provider():
+    assert PromptBuilder("openai", "gpt-3.5-turbo").token_budget == 6000
+    assert PromptBuilder("openai", "otro").token_budget == 4000
+    assert PromptBuilder("desconocido").token_budget == DEFAULT_TOKEN_BUDGET
+    assert PromptBuilder("openai", token_budget=123).token_budget == 123
+
+
+def test_build_fits_the_document_and_lists_avoided_questions():
+    builder = PromptBuilder(token_budget=200)
+    text = _sentences(200)
+    prompt = builder.build(text, 3, avoid=["¿Primera?", "¿Segunda?"])
+    template = prompt_builder.PROMPT_TEMPLATE.format(num_questions=3, text="")
+    assert estimate_tokens(prompt) <= estimate_tokens(template) + 200 + 20
+    assert "3 preguntas" in prompt
+    assert prompt.endswith("- ¿Primera?\n- ¿Segunda?")
+    assert "No repitas" not in builder.build(text, 3)
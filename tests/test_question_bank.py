@@ -0,0 +1,166 @@
+"""Pruebas del banco de preguntas: búsqueda FTS, filtros, exportación e importación de logs"""
+
+import hashlib
+import sys
+from datetime import datetime
+
+import pytest
+
+import question_bank
+from question_bank import QuestionBank, parse_log
+from question_model import QuestionSet
+
+DAY = 24 * 3600
+START = datetime(2024, 3, 1).timestamp()
+
+
+def _q(pregunta, opciones=("Mitocondria", "Ribosoma"), respuesta=0, explicacion=""):
+    return {"pregunta": pregunta, "opciones": list(opciones), "respuesta_correcta": respuesta,
+            "explicacion": explicacion}
+
+
+@pytest.fixture
+def bank(tmp_path):
+    bank = QuestionBank(tmp_path / "preguntas.sqlite3")
+    bank.add([_q("¿Qué orgánulo produce la energía?", explicacion="La respiración celular"),
+              _q("¿Dónde se sintetizan las proteínas?", respuesta=1)],
+             "hash-celula", provider="google", model="g", tema="Biología", pdf="celula.pdf",
+             fecha=START)
+    bank.add([_q("¿Quién escribió El Quijote?", ("Cervantes", "Lope"))],
+             "hash-literatura", provider="openai", model="o", tema="Literatura", pdf="quijote.pdf",
+             fecha=START + DAY)
+    bank.add([_q("¿Cuál es la función de la mitocondria?")],
+             "hash-celula", provider="openai", model="o", tema="biología", pdf="celula.pdf",
+             fecha=START + 2 * DAY)
+    return bank
+
+
+def _preguntas(results):
+    return [q["pregunta"] for q in results]
+
+
+def test_search_without_query_returns_most_recent_first(bank):
+    results = bank.search()
+    assert len(results) == 4
+    assert results[0]["pregunta"] == "¿Cuál es la función de la mitocondria?"
+    assert results[-1]["fecha"] == START
+    assert results[0]["proveedor"] == "openai" and results[0]["pdf"] == "celula.pdf"
+
+
+def test_search_matches_options_and_explanation_without_accents_or_case(bank):
+    # "MITOCONDRIA" está en las opciones de las preguntas de biología y en un enunciado
+    assert len(bank.search("MITOCONDRIA")) == 3
+    assert _preguntas(bank.search("respiracion")) == ["¿Qué orgánulo produce la energía?"]
+    assert _preguntas(bank.search("energia")) == ["¿Qué orgánulo produce la energía?"]
+
+
+def test_search_uses_prefixes_and_requires_every_word(bank):
+    assert _preguntas(bank.search("cervan")) == ["¿Quién escribió El Quijote?"]
+    assert bank.search("cervantes mitocondria") == []
+
+
+def test_search_tolerates_fts_syntax(bank):
+    assert _preguntas(bank.search('Quijote" * (')) == ["¿Quién escribió El Quijote?"]
+    assert len(bank.search("¿?")) == 4
+
+
+def test_search_filters(bank):
+    assert len(bank.search(pdf_hash="hash-celula")) == 3
+    # El tema no distingue mayúsculas (NOCASE de SQLite: solo las ASCII)
+    assert len(bank.search(tema="biología")) == 3
+    assert len(bank.search(tema="BIOLOGía")) == 3
+    assert _preguntas(bank.search(provider="openai", tema="literatura")) == ["¿Quién escribió El Quijote?"]
+    assert len(bank.search(since=START + DAY)) == 2
+    assert len(bank.search(until=START + DAY)) == 2
+    assert len(bank.search(since=START + DAY, until=START + 2 * DAY)) == 1
+    assert len(bank.search(limit=1)) == 1
+    assert len(bank.search("mitocondria", provider="google")) == 2
+
+
+def test_documents_and_delete(bank):
+    documents = {doc["pdf_hash"]: doc for doc in bank.documents()}
+    assert documents["hash-celula"]["preguntas"] == 3
+    assert documents["hash-celula"]["ultima"] == START + 2 * DAY
+
+    last_id = max(bank.question_ids())
+    assert bank.delete_document("hash-celula") == 3
+    assert bank.count() == 1
+    assert bank.search("mitocondria") == []
+    # Los ids no se reutilizan tras borrar
+    bank.add([_q("¿Nueva?")], "hash-nuevo")
+    assert max(bank.question_ids()) > last_id
+
+
+def test_export_writes_oldest_first(bank, tmp_path):
+    path = tmp_path / "biologia.jsonl"
+    exported, skipped = bank.export(path, tema="biología")
+    assert (exported, skipped) == (3, [])
+    assert [q.pregunta for q in QuestionSet.load(path)][-1] == "¿Cuál es la función de la mitocondria?"
+
+
+def test_export_skips_invalid_rows(bank, tmp_path):
+    bank.add([_q("¿Solo una opción?", ("Única",))], "hash-roto", fecha=START + 3 * DAY)
+    path = tmp_path / "todo.qset"
+    exported, skipped = bank.export(path)
+
+    assert exported == 4
+    assert len(skipped) == 1 and "opciones" in skipped[0][1]
+    assert len(QuestionSet.load(path)) == 4
+
+
+def _write_log(path, pdf, questions, fecha="2024-03-05 10:30:00.123456"):
+    """Fichero con el formato que escribía la aplicación en logs/"""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"PDF: {pdf}\n")
+        f.write(f"Fecha: {fecha}\n")
+        f.write("=" * 70 + "\n\n")
+        for idx, q in enumerate(questions, 1):
+            f.write(f"PREGUNTA {idx}\n")
+            f.write(f"{q['pregunta']}\n\n")
+            for opt_idx, opcion in enumerate(q["opciones"]):
+                f.write(f"  {chr(65 + opt_idx)}) {opcion}\n")
+            f.write(f"\nRespuesta: {chr(65 + q['respuesta_correcta'])}\n")
+            f.write(f"{q['explicacion']}\n\n")
+            f.write("-" * 70 + "\n\n")
+
+
+def test_parse_log(tmp_path):
+    pdf = tmp_path / "apuntes.pdf"
+    pdf.write_bytes(b"%PDF-1.4 apuntes")
+    questions = [_q("¿Primera?", ("a", "b", "c"), 2, "Porque sí"), _q("¿Segunda?", respuesta=1)]
+    log = tmp_path / "preguntas_20240305_103000.txt"
+    _write_log(log, pdf, questions)
+
+    run = parse_log(log)
+    assert run["questions"] == questions
+    assert run["pdf"] == "apuntes.pdf"
+    assert run["pdf_hash"] == hashlib.sha256(pdf.read_bytes()).hexdigest()
+    assert run["fecha"] == datetime(2024, 3, 5, 10, 30, 0, 123456).timestamp()
+
+
+def test_parse_log_without_the_pdf_hashes_the_path(tmp_path):
+    log = tmp_path / "preguntas_1.txt"
+    _write_log(log, "/no/existe/tema.pdf", [_q("¿Una?")])
+    run = parse_log(log)
+    assert run["pdf_hash"] == hashlib.sha256(b"/no/existe/tema.pdf").hexdigest()
+    assert run["pdf"] == "tema.pdf"
+
+
+def test_import_logs_command(tmp_path, monkeypatch, capsys):
+    logs = tmp_path / "logs"
+    logs.mkdir()
+    _write_log(logs / "preguntas_1.txt", "uno.pdf", [_q("¿Importada?")])
+    _write_log(logs / "preguntas_2.txt", "dos.pdf", [_q("¿Otra?"), _q("¿Y otra?")])
+    (logs / "preguntas_3.txt").write_text("sin cabecera\n", encoding="utf-8")
+    (logs / "otro.txt").write_text("no es un log\n", encoding="utf-8")
+    db = tmp_path / "banco.sqlite3"
+
+    monkeypatch.setattr(sys, "argv", ["question_bank.py", "--db", str(db), "import-logs", str(logs)])
+    question_bank.main()
+
+    output = capsys.readouterr().out
+    assert "preguntas_3.txt" in output
+    assert "2 ejecuciones importadas de 3 ficheros" in output
+    bank = QuestionBank(db)
+    assert bank.count() == 3
+    assert _preguntas(bank.search("importada")) == ["¿Importada?"]
@@ -0,0 +1,99 @@
+"""Pruebas de los clientes asíncronos por bucle de eventos y de generate_many_async"""
+
+import asyncio
+import threading
+import warnings
+
+import pytest
+
+from question_generator import QuestionGenerator, _PerLoop, create_generator, generate_many_async
+
+warnings.filterwarnings("ignore", category=FutureWarning)
+
+TEXT = "La fotosíntesis convierte la energía de la luz en energía química. " * 20
+
+
+def test_per_loop_creates_one_object_per_event_loop():
+    per_loop = _PerLoop(object)
+
+    async def get_twice():
+        return per_loop.get(), per_loop.get()
+
+    first, again = asyncio.run(get_twice())
+    second, _ = asyncio.run(get_twice())
+    assert first is again
+    assert first is not second
+
+
+def test_per_loop_is_thread_safe():
+    created = []
+    per_loop = _PerLoop(lambda: created.append(1) or object())
+    results = []
+
+    async def get_many():
+        await asyncio.gather(*(asyncio.sleep(0) for _ in range(10)))
+        return {id(per_loop.get()) for _ in range(10)}
+
+    threads = [threading.Thread(target=lambda: results.append(asyncio.run(get_many()))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(len(ids) == 1 for ids in results)
+    assert len(created) == 8
+
+
+@pytest.mark.parametrize("provider", ["google", "openai", "anthropic"])
+def test_async_requests_work_across_event_loops(mock_llm, provider):
+    pytest.importorskip("google.generativeai" if provider == "google" else provider)
+    generator = create_generator(provider)
+
+    # Cada asyncio.run es un bucle nuevo: el cliente del primero ya está cerrado
+    for _ in range(2):
+        questions = asyncio.run(generator.generate_questions_async(TEXT, 3))
+        assert len(questions) == 3
+
+
+class _Slow(QuestionGenerator):
+    provider = "prueba"
+    model_name = "lento"
+
+    def __init__(self):
+        self.started = 0
+        self.cancelled = 0
+
+    def generate_questions(self, text, num_questions=5):
+        raise NotImplementedError
+
+    async def generate_questions_async(self, text, num_questions=5):
+        self.started += 1
+        if text == "falla":
+            raise ValueError("fallo")
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return []
+
+
+def test_generate_many_async_cancels_pending_requests_on_error():
+    generator = _Slow()
+    with pytest.raises(ValueError):
+        asyncio.run(generate_many_async(generator, ["a", "falla", "b", "c"], max_concurrency=3))
+    # Las que llegaron a empezar, salvo la que falló, se cancelaron
+    assert generator.started >= 3
+    assert generator.cancelled == generator.started - 1
+
+
+def test_generate_many_async_returns_exceptions_in_order():
+    class Echo(_Slow):
+        async def generate_questions_async(self, text, num_questions=5):
+            if text == "falla":
+                raise ValueError("fallo")
+            return [text]
+
+    results = asyncio.run(generate_many_async(Echo(), ["a", "falla", "b"], return_exceptions=True))
+    assert results[0] == ["a"] and results[2] == ["b"]
+    assert isinstance(results[1], ValueError)
@@ -0,0 +1,139 @@
+"""Pruebas del modelo Question y del contenedor QuestionSet: validación, serialización y archivos dañados"""
+
+import struct
+
+import pytest
+
+from question_model import Question, QuestionSet
+
+
+def _raw(i, **changes):
+    raw = {
+        "pregunta": f"¿Pregunta {i} con tildes y ñ?",
+        "opciones": [f"opción {i}.{j}" for j in range(2 + i % 3)],
+        "respuesta_correcta": i % 2,
+        "explicacion": f"Explicación {i} 🧬" if i % 4 else "",
+    }
+    raw.update(changes)
+    return raw
+
+
+@pytest.fixture
+def questions():
+    return QuestionSet(_raw(i) for i in range(50))
+
+
+def test_from_dict_accepts_letters_and_numeric_strings():
+    assert Question.from_dict(_raw(0, respuesta_correcta="B")).respuesta_correcta == 1
+    assert Question.from_dict(_raw(0, respuesta_correcta=" 1 ")).respuesta_correcta == 1
+    assert Question.from_dict(_raw(0, extra="se ignora")).to_dict() == _raw(0)
+
+
+@pytest.mark.parametrize("changes", [
+    {"pregunta": "  "},
+    {"pregunta": None},
+    {"opciones": ["solo una"]},
+    {"opciones": "a, b"},
+    {"opciones": ["a", None]},
+    {"respuesta_correcta": 2},
+    {"respuesta_correcta": True},
+    {"respuesta_correcta": "Z"},
+])
+def test_from_dict_rejects_invalid_questions(changes):
+    with pytest.raises(ValueError):
+        Question.from_dict(_raw(0, **changes))
+
+
+def test_question_is_immutable():
+    question = Question.from_dict(_raw(0))
+    with pytest.raises(AttributeError):
+        question.pregunta = "otra"
+
+
+def test_set_rejects_invalid_dicts():
+    with pytest.raises(ValueError):
+        QuestionSet([_raw(0), _raw(1, opciones=[])])
+
+
+def test_indexing_matches_input(questions):
+    assert len(questions) == 50
+    assert questions[7] == Question.from_dict(_raw(7))
+    assert questions[-1] == Question.from_dict(_raw(49))
+    assert list(questions.answers) == [i % 2 for i in range(50)]
+    with pytest.raises(IndexError):
+        questions[50]
+
+
+def test_binary_round_trip(questions):
+    loaded = QuestionSet.from_bytes(questions.to_bytes())
+    assert loaded.to_dicts() == questions.to_dicts()
+    assert QuestionSet.from_bytes(QuestionSet().to_bytes()).to_dicts() == []
+
+
+@pytest.mark.parametrize("suffix", [".qset", ".jsonl"])
+def test_save_and_load_round_trip(tmp_path, questions, suffix):
+    path = tmp_path / f"preguntas{suffix}"
+    questions.save(path)
+    assert QuestionSet.load(path).to_dicts() == questions.to_dicts()
+
+
+def test_jsonl_reports_the_bad_line(tmp_path):
+    path = tmp_path / "preguntas.jsonl"
+    path.write_text('{"pregunta": "a", "opciones": ["x", "y"]}\n\n{"pregunta": ""}\n', encoding="utf-8")
+    with pytest.raises(ValueError, match="Línea 3"):
+        QuestionSet.read_jsonl(path)
+
+
+def test_truncated_data_is_rejected(questions):
+    data = questions.to_bytes()
+    for size in (0, 10, len(data) - 1):
+        with pytest.raises(ValueError):
+            QuestionSet.from_bytes(data[:size])
+    with pytest.raises(ValueError):
+        QuestionSet.from_bytes(data + b"\0")
+
+
+def test_unknown_format_is_rejected(questions):
+    data = bytearray(questions.to_bytes())
+    data[:4] = b"XSET"
+    with pytest.raises(ValueError, match="desconocido"):
+        QuestionSet.from_bytes(bytes(data))
+    data[:4] = b"QSET"
+    data[4] = 99
+    with pytest.raises(ValueError, match="desconocido"):
+        QuestionSet.from_bytes(bytes(data))
+
+
+def _tables(questions):
+    """Desplazamientos de cada tabla dentro de los datos binarios"""
+    header = struct.calcsize("<4sBxxxIIQ")
+    strings = len(questions._ends)
+    ends = header
+    first = ends + 8 * strings
+    answers = first + 4 * (len(questions) + 1)
+    return ends, first, answers
+
+
+def test_corrupt_answer_is_rejected(questions):
+    data = bytearray(questions.to_bytes())
+    _, _, answers = _tables(questions)
+    # La pregunta 0 tiene 2 opciones: la respuesta 5 no existe
+    data[answers] = 5
+    with pytest.raises(ValueError, match="pregunta 0"):
+        QuestionSet.from_bytes(bytes(data))
+
+
+def test_corrupt_offsets_are_rejected(questions):
+    data = bytearray(questions.to_bytes())
+    ends, first, _ = _tables(questions)
+
+    unordered = bytearray(data)
+    unordered[ends:ends + 8] = struct.pack("<Q", 10 ** 6)
+    with pytest.raises(ValueError, match="desordenados"):
+        QuestionSet.from_bytes(bytes(unordered))
+
+    # Pregunta 0 con un solo texto en lugar de enunciado, explicación y opciones
+    few_texts = bytearray(data)
+    few_texts[first + 4:first + 8] = struct.pack("<I", 1)
+    with pytest.raises(ValueError, match="pregunta 0"):
+        QuestionSet.from_bytes(bytes(few_texts))
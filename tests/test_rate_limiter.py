@@ -0,0 +1,233 @@
+"""Pruebas de la cubeta de tokens, de Retry-After y de los reintentos"""
+
+import asyncio
+import email.utils
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import rate_limiter
+from question_generator import QuestionGenerator, request_quota
+from rate_limiter import ProviderLimiter, RateLimitedGenerator, TokenBucket, retry_after
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter.time, "monotonic", clock)
+    return clock
+
+
+def test_bucket_starts_full(clock):
+    bucket = TokenBucket(capacity=10, refill_per_second=1)
+    for _ in range(10):
+        assert bucket.reserve() == 0.0
+
+
+def test_bucket_reservations_queue_in_order(clock):
+    bucket = TokenBucket(capacity=2, refill_per_second=0.5)
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == pytest.approx(2.0)
+    assert bucket.reserve() == pytest.approx(4.0)
+
+
+def test_bucket_refills_up_to_capacity(clock):
+    bucket = TokenBucket(capacity=5, refill_per_second=1)
+    bucket.reserve(5)
+    clock.now += 3
+    assert bucket.reserve(3) == 0.0
+    assert bucket.reserve(1) == pytest.approx(1.0)
+
+    clock.now += 1000
+    assert bucket.reserve(5) == 0.0
+    assert bucket.reserve(1) == pytest.approx(1.0)
+
+
+def test_bucket_caps_requests_larger_than_capacity(clock):
+    bucket = TokenBucket(capacity=10, refill_per_second=1)
+    assert bucket.reserve(50) == 0.0
+    assert bucket.reserve(10) == pytest.approx(10.0)
+
+
+def _with_response(headers):
+    error = Exception("429")
+    error.response = SimpleNamespace(headers=headers)
+    return error
+
+
+def test_retry_after_seconds_and_milliseconds():
+    assert retry_after(_with_response({"retry-after": "7"})) == 7.0
+    assert retry_after(_with_response({"retry-after-ms": "1500", "retry-after": "7"})) == 1.5
+
+
+def test_retry_after_http_date():
+    value = email.utils.formatdate(time.time() + 30, usegmt=True)
+    assert retry_after(_with_response({"retry-after": value})) == pytest.approx(30, abs=2)
+
+
+def test_retry_after_date_in_the_past_is_zero():
+    value = email.utils.formatdate(time.time() - 30, usegmt=True)
+    assert retry_after(_with_response({"retry-after": value})) == 0.0
+
+
+@pytest.mark.parametrize("value", ["mañana", "Mon, 99 Foo 2024", "1.5s"])
+def test_retry_after_malformed_header(value):
+    assert retry_after(_with_response({"retry-after": value})) is None
+
+
+def test_retry_after_follows_the_cause_chain():
+    cause = _with_response({"retry-after": "3"})
+    try:
+        try:
+            raise cause
+        except Exception as e:
+            raise Exception("Error al generar preguntas") from e
+    except Exception as wrapped:
+        assert retry_after(wrapped) == 3.0
+
+
+def test_retry_after_without_response():
+    assert retry_after(Exception("sin respuesta")) is None
+
+
+class Saturated(Exception):
+    status_code = 429
+
+
+class FlakyGenerator:
+    provider = "prueba"
+    model_name = "prueba"
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+
+    def build_prompt(self, text, num_questions=5, avoid=None):
+        return text
+
+    def generate_questions(self, text, num_questions=5):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise Saturated()
+        return [{"pregunta": text}]
+
+
+class CountingLimiter(ProviderLimiter):
+    def __init__(self):
+        super().__init__(requests_per_minute=1000, tokens_per_minute=1_000_000)
+        self.acquired = 0
+
+    def acquire(self, tokens):
+        self.acquired += 1
+        super().acquire(tokens)
+
+    async def acquire_async(self, tokens):
+        self.acquired += 1
+        await super().acquire_async(tokens)
+
+
+def test_every_attempt_reserves_quota(monkeypatch):
+    monkeypatch.setattr(rate_limiter.time, "sleep", lambda seconds: None)
+    limiter = CountingLimiter()
+    inner = FlakyGenerator(failures=2)
+    generator = RateLimitedGenerator(inner, limiter=limiter, max_retries=3)
+
+    assert generator.generate_questions("texto", 1) == [{"pregunta": "texto"}]
+    assert inner.calls == 3
+    assert limiter.acquired == 3
+
+
+def test_gives_up_after_max_retries(monkeypatch):
+    monkeypatch.setattr(rate_limiter.time, "sleep", lambda seconds: None)
+    inner = FlakyGenerator(failures=10)
+    generator = RateLimitedGenerator(inner, limiter=CountingLimiter(), max_retries=2)
+
+    with pytest.raises(Saturated):
+        generator.generate_questions("texto", 1)
+    assert inner.calls == 3
+
+
+class ShortGenerator(QuestionGenerator):
+    """Proveedor que en la primera respuesta devuelve una pregunta menos de las pedidas"""
+
+    provider = "prueba"
+    model_name = "prueba"
+
+    def __init__(self):
+        self.requests = 0
+
+    def build_prompt(self, text, num_questions=5, avoid=None):
+        return text
+
+    def _answer(self, num_questions):
+        self.requests += 1
+        count = num_questions - 1 if self.requests == 1 else num_questions
+        return json.dumps({"questions": [{
+            "pregunta": f"Pregunta {self.requests}.{i}", "opciones": ["a", "b"],
+            "respuesta_correcta": 0, "explicacion": "",
+        } for i in range(count)]})
+
+    def _request(self, prompt, num_questions):
+        return self._answer(num_questions)
+
+    async def _request_async(self, prompt, num_questions):
+        return self._answer(num_questions)
+
+    def _request_stream(self, prompt, num_questions):
+        yield self._answer(num_questions)
+
+    def generate_questions(self, text, num_questions=5):
+        return self._complete(text, num_questions, self._request)
+
+    async def generate_questions_async(self, text, num_questions=5):
+        return await self._complete_async(text, num_questions, self._request_async)
+
+    def generate_questions_stream(self, text, num_questions=5):
+        yield from self._complete_stream(text, num_questions, self._request_stream, self._request)
+
+
+def test_follow_up_request_reserves_quota():
+    limiter = CountingLimiter()
+    inner = ShortGenerator()
+    generator = RateLimitedGenerator(inner, limiter=limiter)
+
+    assert len(generator.generate_questions("texto", 3)) == 3
+    assert inner.requests == 2
+    assert limiter.acquired == 2
+
+
+def test_follow_up_request_reserves_quota_async():
+    limiter = CountingLimiter()
+    generator = RateLimitedGenerator(ShortGenerator(), limiter=limiter)
+
+    assert len(asyncio.run(generator.generate_questions_async("texto", 3))) == 3
+    assert limiter.acquired == 2
+
+
+def test_follow_up_request_reserves_quota_stream():
+    limiter = CountingLimiter()
+    generator = RateLimitedGenerator(ShortGenerator(), limiter=limiter)
+
+    seen = []
+    for question in generator.generate_questions_stream("texto", 3):
+        # Quien consume las preguntas no está dentro del intento
+        seen.append(request_quota.get())
+    assert seen == [None] * 3
+    assert limiter.acquired == 2
+
+
+def test_unwrapped_generator_does_not_reserve():
+    inner = ShortGenerator()
+    assert len(inner.generate_questions("texto", 3)) == 3
+    assert request_quota.get() is None
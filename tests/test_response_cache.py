@@ -0,0 +1,145 @@
+"""Pruebas de la caché de respuestas: clave, caducidad, límite de entradas y force_refresh"""
+
+import asyncio
+
+import pytest
+
+import response_cache
+from question_generator import QuestionGenerator
+from response_cache import CachedQuestionGenerator, ResponseCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(response_cache.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResponseCache(tmp_path / "respuestas.sqlite3", ttl=60, max_entries=3)
+
+
+class _Counting(QuestionGenerator):
+    """Generador que numera sus respuestas; el prompt solo usa el principio del texto"""
+
+    provider = "prueba"
+    model_name = "contador"
+
+    def __init__(self, fail_stream=False):
+        self.calls = 0
+        self.fail_stream = fail_stream
+
+    def build_prompt(self, text, num_questions=5, avoid=None):
+        return text[:10]
+
+    def generate_questions(self, text, num_questions=5):
+        self.calls += 1
+        return [{"pregunta": f"{text} {self.calls}.{i}"} for i in range(num_questions)]
+
+    def generate_questions_stream(self, text, num_questions=5):
+        questions = self.generate_questions(text, num_questions)
+        yield questions[0]
+        if self.fail_stream:
+            raise ConnectionError("cortado")
+        yield from questions[1:]
+
+    async def generate_questions_async(self, text, num_questions=5):
+        return self.generate_questions(text, num_questions)
+
+
+def test_key_uses_the_full_text():
+    key = ResponseCache.make_key("prueba", "m", "mismo principio A", 5)
+    assert key == ResponseCache.make_key("prueba", "m", "mismo principio A", 5)
+    assert key != ResponseCache.make_key("prueba", "m", "mismo principio B", 5)
+    assert key != ResponseCache.make_key("otro", "m", "mismo principio A", 5)
+    assert key != ResponseCache.make_key("prueba", "otro", "mismo principio A", 5)
+    assert key != ResponseCache.make_key("prueba", "m", "mismo principio A", 6)
+
+
+def test_texts_with_the_same_prompt_do_not_share_answers(cache):
+    inner = _Counting()
+    generator = CachedQuestionGenerator(inner, cache)
+    # Mismo prompt (los 10 primeros caracteres), distinto documento
+    first = generator.generate_questions("mismo principio A", 1)
+    second = generator.generate_questions("mismo principio B", 1)
+    assert first != second
+    assert inner.calls == 2
+
+
+def test_hit_returns_the_stored_answer(cache):
+    inner = _Counting()
+    generator = CachedQuestionGenerator(inner, cache)
+    first = generator.generate_questions("texto", 2)
+    assert generator.generate_questions("texto", 2) == first
+    assert list(generator.generate_questions_stream("texto", 2)) == first
+    assert asyncio.run(generator.generate_questions_async("texto", 2)) == first
+    assert inner.calls == 1
+
+
+def test_entries_expire_after_ttl(cache, clock):
+    cache.put("clave", [{"pregunta": "a"}])
+    clock.now += 59
+    assert cache.get("clave") == [{"pregunta": "a"}]
+    clock.now += 2
+    assert cache.get("clave") is None
+
+
+def test_put_removes_expired_entries(cache, clock):
+    cache.put("vieja", [{"pregunta": "a"}])
+    clock.now += 61
+    cache.put("nueva", [{"pregunta": "b"}])
+    # Aunque se alargue la caducidad, la vieja ya no está
+    cache.ttl = 10 ** 6
+    assert cache.get("vieja") is None
+    assert cache.get("nueva") == [{"pregunta": "b"}]
+
+
+def test_max_entries_evicts_least_recently_used(cache, clock):
+    for key in ("a", "b", "c"):
+        cache.put(key, [{"pregunta": key}])
+        clock.now += 1
+    # "a" se usa y pasa a ser la más reciente
+    assert cache.get("a") is not None
+    clock.now += 1
+    cache.put("d", [{"pregunta": "d"}])
+
+    assert cache.get("b") is None
+    for key in ("a", "c", "d"):
+        assert cache.get(key) == [{"pregunta": key}]
+
+
+def test_force_refresh_bypasses_and_updates_the_cache(cache):
+    inner = _Counting()
+    generator = CachedQuestionGenerator(inner, cache)
+    first = generator.generate_questions("texto", 1)
+
+    fresh = generator.generate_questions("texto", 1, force_refresh=True)
+    assert fresh != first
+    assert generator.generate_questions("texto", 1) == fresh
+
+    streamed = list(generator.generate_questions_stream("texto", 1, force_refresh=True))
+    refreshed = asyncio.run(generator.generate_questions_async("texto", 1, force_refresh=True))
+    assert inner.calls == 4
+    assert streamed != refreshed
+    assert generator.generate_questions("texto", 1) == refreshed
+
+
+def test_interrupted_stream_is_not_stored(cache):
+    inner = _Counting(fail_stream=True)
+    generator = CachedQuestionGenerator(inner, cache)
+    with pytest.raises(ConnectionError):
+        list(generator.generate_questions_stream("texto", 3))
+
+    inner.fail_stream = False
+    assert len(generator.generate_questions("texto", 3)) == 3
+    assert inner.calls == 2
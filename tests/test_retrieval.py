@@ -0,0 +1,65 @@
+"""Pruebas del índice BM25 y de la selección de fragmentos por tema"""
+
+from retrieval import BM25Index, get_index, select_relevant_text, tokenize
+
+BIOLOGIA = ("La mitocondria es el orgánulo que produce la energía de la célula mediante "
+            "la respiración celular. Las mitocondrias tienen su propio ADN. ")
+HISTORIA = ("La Revolución Francesa comenzó en 1789 con la toma de la Bastilla y acabó "
+            "con la monarquía absoluta en Francia. ")
+QUIMICA = ("Los enlaces covalentes se forman cuando dos átomos comparten electrones; "
+           "el agua es un ejemplo de molécula covalente. ")
+
+
+def _document(repeat=10):
+    return "\n\n".join(part * repeat for part in (HISTORIA, BIOLOGIA, QUIMICA))
+
+
+def test_tokenize_removes_accents_stopwords_and_plurals():
+    assert tokenize("Las Células y los Orgánulos") == ["celula", "organulo"]
+
+
+def test_search_ranks_the_matching_chunk_first():
+    index = BM25Index([HISTORIA, BIOLOGIA, QUIMICA])
+    assert index.search("mitocondrias y energía")[0] == 1
+    assert index.search("bastilla")[0] == 0
+    assert index.search("astronomía") == []
+
+
+def test_search_top_k_is_ordered_by_score():
+    chunks = ["mitocondria", "mitocondria mitocondria célula", "célula", "átomo"]
+    index = BM25Index(chunks)
+    scores = index.scores("mitocondria célula")
+    ranked = index.search("mitocondria célula", top_k=2)
+    assert ranked[0] == 1
+    assert len(ranked) == 2
+    assert scores[ranked[0]] >= scores[ranked[1]]
+    assert 3 not in index.search("mitocondria célula", top_k=10)
+
+
+def test_select_relevant_text_keeps_only_the_topic():
+    text = _document()
+    selected = select_relevant_text(text, "la mitocondria", max_chars=1500, chunk_size=500)
+    assert "mitocondria" in selected
+    assert "Bastilla" not in selected
+    assert len(selected) <= 1500 + 2 * len("\n\n")
+
+
+def test_selected_chunks_keep_document_order():
+    text = _document()
+    selected = select_relevant_text(text, "bastilla covalente", max_chars=4000, chunk_size=500)
+    assert "Bastilla" in selected and "covalente" in selected
+    assert selected.index("Bastilla") < selected.index("covalente")
+
+
+def test_empty_or_unmatched_topic_returns_the_full_text():
+    text = _document()
+    assert select_relevant_text(text, "") is text
+    assert select_relevant_text(text, "   ") is text
+    assert select_relevant_text(text, None) is text
+    assert select_relevant_text(text, "astronomía") is text
+
+
+def test_index_is_reused_for_the_same_text():
+    text = _document(repeat=3)
+    assert get_index(text, 500) is get_index(text, 500)
+    assert get_index(text, 500) is not get_index(text, 400)
@@ -0,0 +1,150 @@
+"""Pruebas de la generación anticipada de app_tkinter, sin abrir ventanas"""
+
+import threading
+
+import pytest
+
+import app_tkinter
+from app_tkinter import AppTkinter, _Especulacion
+
+TEXT = "La mitocondria produce la energía de la célula. " * 20
+
+
+def _pregunta(i):
+    return {"pregunta": f"¿Pregunta {i}?", "opciones": ["a", "b"], "respuesta_correcta": 0,
+            "explicacion": ""}
+
+
+class _Generator:
+    """Genera preguntas numeradas; con endless no termina hasta que se cierra el flujo"""
+
+    def __init__(self, endless=False):
+        self.endless = endless
+        self.requests = []
+        self.closed = threading.Event()
+
+    def generate_questions_stream(self, text, num_questions=5):
+        self.requests.append(num_questions)
+        try:
+            i = 0
+            while self.endless or i < num_questions:
+                yield _pregunta(100 + i)
+                i += 1
+        finally:
+            self.closed.set()
+
+
+@pytest.fixture
+def app(monkeypatch):
+    """AppTkinter sin interfaz: solo el estado que usa la generación anticipada"""
+    app = AppTkinter.__new__(AppTkinter)
+    app.especulacion = None
+    app.pdf_hash = "hash"
+    app.contenido_pdf = TEXT
+    app.generator = _Generator()
+    monkeypatch.setattr(app, "_crear_generador", lambda registrar=True: (app.generator, None))
+    monkeypatch.setattr(app_tkinter, "select_relevant_text", lambda text, tema, max_chars: text)
+    return app
+
+
+def test_iteration_waits_for_questions_and_ends_when_finished():
+    especulacion = _Especulacion(("hash", "", 2))
+    recibidas = []
+    consumidor = threading.Thread(target=lambda: recibidas.extend(especulacion))
+    consumidor.start()
+
+    especulacion.agregar(_pregunta(0))
+    especulacion.agregar(_pregunta(1))
+    especulacion.terminar()
+    consumidor.join(5)
+    assert recibidas == [_pregunta(0), _pregunta(1)]
+
+
+def test_iteration_raises_the_error_after_the_delivered_questions():
+    especulacion = _Especulacion(("hash", "", 3))
+    especulacion.agregar(_pregunta(0))
+    especulacion.terminar(ConnectionError("sin red"))
+
+    iterador = iter(especulacion)
+    assert next(iterador) == _pregunta(0)
+    with pytest.raises(ConnectionError):
+        next(iterador)
+
+
+def test_cancelled_iteration_stops_waiting():
+    especulacion = _Especulacion(("hash", "", 3))
+    especulacion.agregar(_pregunta(0))
+    especulacion.cancelar()
+    assert list(especulacion) == [_pregunta(0)]
+
+
+def test_failed_speculation_is_not_used(app):
+    fallida = _Especulacion(("hash", "", 3))
+    fallida.terminar(RuntimeError("cuota"))
+    app.especulacion = fallida
+    assert app._tomar_especulacion("", 3) is None
+    assert fallida.cancelada and app.especulacion is None
+
+
+def test_speculation_for_another_request_is_cancelled(app):
+    otra = _Especulacion(("hash", "biología", 3))
+    app.especulacion = otra
+    assert app._tomar_especulacion("historia", 3) is None
+    assert otra.cancelada
+
+    buena = _Especulacion(("hash", "", 3))
+    app.especulacion = buena
+    assert app._tomar_especulacion("", 3) is buena
+    assert app.especulacion is None and not buena.cancelada
+
+
+def test_failure_mid_speculation_generates_the_missing_questions(app, capsys):
+    especulacion = _Especulacion(("hash", "", 3))
+    especulacion.agregar(_pregunta(0))
+    especulacion.terminar(RuntimeError("cortado"))
+
+    preguntas = list(app._desde_especulacion(especulacion, app.generator, None, TEXT, "", 3))
+    assert preguntas == [_pregunta(0), _pregunta(100), _pregunta(101)]
+    assert app.generator.requests == [2]
+    assert "Falló la generación anticipada" in capsys.readouterr().out
+
+
+def test_finished_speculation_needs_no_request(app):
+    especulacion = _Especulacion(("hash", "", 2))
+    especulacion.agregar(_pregunta(0))
+    especulacion.agregar(_pregunta(1))
+    especulacion.terminar()
+
+    assert len(list(app._desde_especulacion(especulacion, app.generator, None, TEXT, "", 2))) == 2
+    assert app.generator.requests == []
+
+
+def test_speculation_fills_in_the_background(app):
+    especulacion = _Especulacion(("hash", "", 3))
+    app._especular(especulacion, TEXT)
+    assert especulacion.terminada and especulacion.error is None
+    assert list(especulacion) == [_pregunta(100), _pregunta(101), _pregunta(102)]
+
+
+def test_error_while_speculating_is_kept(app, monkeypatch):
+    def falla(registrar=True):
+        raise RuntimeError("sin clave")
+
+    monkeypatch.setattr(app, "_crear_generador", falla)
+    especulacion = _Especulacion(("hash", "", 3))
+    app._especular(especulacion, TEXT)
+    assert isinstance(especulacion.error, RuntimeError)
+
+
+def test_cancelling_stops_the_provider_stream(app):
+    app.generator = _Generator(endless=True)
+    especulacion = _Especulacion(("hash", "", 3))
+    hilo = threading.Thread(target=app._especular, args=(especulacion, TEXT))
+    hilo.start()
+    for _ in especulacion:
+        especulacion.cancelar()
+
+    hilo.join(5)
+    assert not hilo.is_alive()
+    assert app.generator.closed.is_set()
+    assert not especulacion.terminada
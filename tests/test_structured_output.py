@@ -0,0 +1,73 @@
+"""Pruebas de la salida estructurada: esquemas por proveedor, análisis y petición de las que faltan"""
+
+import json
+
+import pytest
+
+from prompt_builder import QUESTIONS_SCHEMA, gemini_schema, strict_schema
+from question_generator import QuestionGenerator
+
+
+def _question(i, **overrides):
+    return {"pregunta": f"¿Pregunta {i}?", "opciones": ["a", "b", "c"], "respuesta_correcta": 1,
+            "explicacion": "", **overrides}
+
+
+def test_strict_schema_closes_every_object():
+    schema = strict_schema(QUESTIONS_SCHEMA)
+    assert schema["additionalProperties"] is False
+    assert schema["properties"]["questions"]["items"]["additionalProperties"] is False
+    assert "additionalProperties" not in QUESTIONS_SCHEMA
+
+
+def test_gemini_schema_drops_unsupported_fields():
+    schema = gemini_schema(strict_schema(QUESTIONS_SCHEMA))
+    assert "additionalProperties" not in json.dumps(schema)
+    assert schema["properties"]["questions"]["items"]["required"] == QUESTIONS_SCHEMA[
+        "properties"]["questions"]["items"]["required"]
+
+
+@pytest.mark.parametrize("content", [
+    {"questions": [_question(0), _question(1)]},
+    json.dumps({"questions": [_question(0), _question(1)]}),
+    "```json\n" + json.dumps([_question(0), _question(1)]) + "\n```",
+    # Respuesta cortada: se rescatan los objetos completos
+    json.dumps({"questions": [_question(0), _question(1), _question(2)]})[:-60],
+])
+def test_parse_accepts_decoded_text_fenced_and_truncated(content):
+    assert QuestionGenerator._parse_questions(content) == [_question(0), _question(1)]
+
+
+def test_parse_discards_malformed_questions():
+    content = {"questions": [_question(0), _question(1, opciones="a"), {"pregunta": "¿Sola?"},
+                             _question(2, respuesta_correcta=7)]}
+    assert QuestionGenerator._parse_questions(content) == [_question(0)]
+
+
+class _Partial(QuestionGenerator):
+    """La primera respuesta trae solo una pregunta válida"""
+
+    provider = "prueba"
+    model_name = "prueba"
+
+    def __init__(self):
+        self.prompts = []
+
+    def build_prompt(self, text, num_questions=5, avoid=None):
+        return json.dumps({"n": num_questions, "avoid": avoid or []})
+
+    def _request(self, prompt, num_questions):
+        self.prompts.append(json.loads(prompt))
+        if len(self.prompts) == 1:
+            return {"questions": [_question(0), _question(1, opciones=[])]}
+        return {"questions": [_question(10 + i) for i in range(num_questions + 1)]}
+
+    def generate_questions(self, text, num_questions=5):
+        return self._complete(text, num_questions, self._request)
+
+
+def test_missing_questions_are_requested_once():
+    generator = _Partial()
+    questions = generator.generate_questions("texto", 3)
+    assert questions == [_question(0), _question(10), _question(11)]
+    assert generator.prompts == [{"n": 3, "avoid": []}, {"n": 2, "avoid": ["¿Pregunta 0?"]}]
@@ -0,0 +1,105 @@
+"""Pruebas de la medición por etapas: anidamiento de spans, trazas JSONL y métricas"""
+
+import io
+import json
+
+import pytest
+
+import telemetry
+from benchmark_pipeline import write_sample_pdf
+from pdf_extractor import PDFExtractor
+from question_generator import QuestionGenerator
+
+
+@pytest.fixture
+def trace(tmp_path):
+    path = tmp_path / "trazas.jsonl"
+    telemetry.reset()
+    telemetry.enable(str(path))
+    yield path
+    telemetry.disable()
+    telemetry.reset()
+
+
+def _records(path):
+    telemetry.disable()
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+class _Fake(QuestionGenerator):
+    provider = "prueba"
+    model_name = "falso"
+
+    def _request(self, prompt, num_questions):
+        return json.dumps({"questions": [{
+            "pregunta": f"Pregunta {i}", "opciones": ["a", "b"],
+            "respuesta_correcta": 0, "explicacion": "",
+        } for i in range(num_questions)]})
+
+    def generate_questions(self, text, num_questions=5):
+        return self._complete(text, num_questions, self._request)
+
+
+def test_disabled_span_is_falsy_and_records_nothing():
+    assert not telemetry.is_enabled()
+    with telemetry.span("nada") as span:
+        assert not span
+        span.set(bytes=1)
+    assert 'span="nada"' not in telemetry.render_prometheus()
+
+
+def test_spans_nest_under_the_current_one(trace, tmp_path):
+    pdf = tmp_path / "apuntes.pdf"
+    write_sample_pdf(str(pdf), pages=2)
+    with telemetry.span("pipeline"):
+        text = PDFExtractor().extract_text(str(pdf))
+        _Fake().generate_questions(text, 2)
+    with telemetry.span("otra"):
+        pass
+
+    records = {r["name"]: r for r in _records(trace)}
+    root = records["pipeline"]
+    assert root["parent_id"] is None and root["trace_id"] == root["span_id"]
+    for name in ("pdf.extract", "prompt.build", "provider.call", "response.parse"):
+        assert records[name]["parent_id"] == root["span_id"]
+        assert records[name]["trace_id"] == root["trace_id"]
+    assert records["otra"]["trace_id"] != root["trace_id"]
+
+    assert records["pdf.extract"]["attributes"]["bytes"] == pdf.stat().st_size
+    assert records["pdf.extract"]["attributes"]["chars"] == len(text)
+    assert records["provider.call"]["attributes"]["provider"] == "prueba"
+    assert records["response.parse"]["attributes"]["questions"] == 2
+
+
+def test_file_object_span_has_no_size(trace, tmp_path):
+    pdf = tmp_path / "apuntes.pdf"
+    write_sample_pdf(str(pdf), pages=1)
+    PDFExtractor(parallel=True).extract_text(io.BytesIO(pdf.read_bytes()))
+
+    [record] = _records(trace)
+    assert "bytes" not in record["attributes"]
+    assert record["attributes"]["parallel"] is False
+
+
+def test_errors_are_recorded(trace):
+    with pytest.raises(ValueError):
+        with telemetry.span("falla"):
+            raise ValueError("roto")
+
+    [record] = _records(trace)
+    assert record["error"] == "ValueError: roto"
+    assert 'preguntas_span_errors_total{span="falla"} 1' in telemetry.render_prometheus()
+
+
+def test_prometheus_metrics(trace):
+    for tokens in (10, 32):
+        with telemetry.span("provider.call", provider="prueba") as span:
+            span.set(tokens_in=tokens, parallel=True)
+
+    metrics = telemetry.render_prometheus()
+    labels = 'span="provider.call",provider="prueba"'
+    assert f"preguntas_span_seconds_count{{{labels}}} 2" in metrics
+    assert f'preguntas_span_seconds_bucket{{{labels},le="+Inf"}} 2' in metrics
+    assert f'preguntas_span_attribute_total{{{labels},attribute="tokens_in"}} 42' in metrics
+    # Los booleanos no se suman
+    assert 'attribute="parallel"' not in metrics
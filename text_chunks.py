@@ -0,0 +1,76 @@
+"""
+Módulo para dividir el texto extraído en fragmentos
+"""
+
+import re
+from typing import List
+
+
+# Final de frase: signo de puntuación seguido de espacio o salto de línea
+_SENTENCE_END = re.compile(r"(?<=[.!?¡¿:;])\s+|\n{2,}")
+
+
+def split_sentences(text: str) -> List[str]:
+    """Divide el texto en frases no vacías"""
+    return [s.strip() for s in _SENTENCE_END.split(text) if s and s.strip()]
+
+
+def split_into_chunks(text: str, chunk_size: int = 3000, overlap: int = 200) -> List[str]:
+    """
+    Divide el texto en fragmentos de como máximo chunk_size caracteres
+
+    Los cortes se hacen en finales de frase siempre que es posible, y cada
+    fragmento repite las últimas frases del anterior (hasta overlap
+    caracteres) para no perder el contexto en la frontera.
+
+    Args:
+        text: Texto completo
+        chunk_size: Tamaño máximo de cada fragmento en caracteres
+        overlap: Caracteres del fragmento anterior que se repiten
+
+    Returns:
+        Lista de fragmentos en el orden del documento
+    """
+    chunks = []
+    current = []
+    length = 0
+
+    for sentence in split_sentences(text):
+        # Frases más largas que un fragmento se cortan en trozos fijos
+        while len(sentence) > chunk_size:
+            head, sentence = sentence[:chunk_size], sentence[chunk_size:]
+            if current:
+                chunks.append(" ".join(current))
+                current, length = [], 0
+            chunks.append(head)
+
+        if current and length + len(sentence) + 1 > chunk_size:
+            chunks.append(" ".join(current))
+
+            # Conservar las últimas frases como solapamiento
+            tail = []
+            tail_length = 0
+            for previous in reversed(current):
+                if tail_length + len(previous) + 1 > overlap:
+                    break
+                tail.insert(0, previous)
+                tail_length += len(previous) + 1
+            current, length = tail, tail_length
+
+        current.append(sentence)
+        length += len(sentence) + 1
+
+    if current:
+        chunks.append(" ".join(current))
+
+    return chunks
+
+
+def spread(items: list, k: int) -> list:
+    """Elige k elementos repartidos uniformemente, conservando el orden"""
+    if k >= len(items):
+        return list(items)
+    if k <= 0:
+        return []
+    step = len(items) / k
+    return [items[int(i * step + step / 2)] for i in range(k)]